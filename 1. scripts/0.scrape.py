@@ -13,6 +13,7 @@ Enhancements:
 
 from __future__ import annotations
 
+import os
 import sys
 import time
 import urllib.parse
@@ -25,10 +26,10 @@ from playwright.sync_api import sync_playwright, TimeoutError
 
 # ---------------- CONFIG ----------------
 
-INPUT_CSV = Path(
-    "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data/"
-    "IrishPlanningApplications_2359694955245257726.csv"
-)
+DATA_DIR = Path(__file__).resolve().parent.parent / "0. data"
+INPUT_CSV = DATA_DIR / "IrishPlanningApplications_2359694955245257726.csv"
+# Dublin City Council rows, typed, indexed by their row in the national CSV (4a.filter_dublin.py); used when present
+INPUT_PARQUET = DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.parquet"
 
 OUT_DIR = Path("downloads")
 OUT_DIR.mkdir(exist_ok=True)
@@ -39,10 +40,11 @@ OUT_CSV_DIR.mkdir(exist_ok=True)
 OUT_LOG_DIR = Path("logs")
 OUT_LOG_DIR.mkdir(exist_ok=True)
 
-BASE_URL = (
-    "https://webapps.dublincity.ie/PublicAccess_Live/"
-    "SearchResult/RunThirdPartySearch"
-)
+# PUBLICACCESS_BASE_URL points the scraper at another host, e.g. mock_publicaccess.py
+SITE_ROOT = os.environ.get(
+    "PUBLICACCESS_BASE_URL", "https://webapps.dublincity.ie/PublicAccess_Live"
+).rstrip("/")
+BASE_URL = SITE_ROOT + "/SearchResult/RunThirdPartySearch"
 
 RESULTS_LENGTH_SELECT = 'select[name="searchResult_length"]'
 OBS_ICON_SELECTOR = (
@@ -184,8 +186,11 @@ def append_record(record: dict) -> None:
 def main() -> None:
     log(f"[Worker {WORKER_ID}] Starting")
 
-    df = pd.read_csv(INPUT_CSV, low_memory=False)
-    df = df[df["Planning Authority"] == "Dublin City Council"]
+    if INPUT_PARQUET.exists():
+        df = pd.read_parquet(INPUT_PARQUET).set_index("row_index")
+    else:
+        df = pd.read_csv(INPUT_CSV, low_memory=False)
+        df = df[df["Planning Authority"] == "Dublin City Council"]
 
     total = len(df)
     chunk = total // N_WORKERS
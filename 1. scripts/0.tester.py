@@ -11,6 +11,7 @@ Tests two known application numbers:
 Uses the SAME logic as the full worker script.
 """
 
+import os
 import time
 import urllib.parse
 from pathlib import Path
@@ -21,10 +22,11 @@ from playwright.sync_api import sync_playwright, TimeoutError
 
 # ---------------- CONFIG ----------------
 
-BASE_URL = (
-    "https://webapps.dublincity.ie/PublicAccess_Live/"
-    "SearchResult/RunThirdPartySearch"
-)
+# PUBLICACCESS_BASE_URL points the scraper at another host, e.g. mock_publicaccess.py
+SITE_ROOT = os.environ.get(
+    "PUBLICACCESS_BASE_URL", "https://webapps.dublincity.ie/PublicAccess_Live"
+).rstrip("/")
+BASE_URL = SITE_ROOT + "/SearchResult/RunThirdPartySearch"
 
 RESULTS_LENGTH_SELECT = 'select[name="searchResult_length"]'
 OBS_ICON_SELECTOR = 'span[aria-label*="3rd Party Observation Letter"]'
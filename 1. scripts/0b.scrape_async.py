@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+scrape_observations_async.py
+
+Async scraper for Dublin City Council PublicAccess third-party observation
+letters. Replaces the 10 x `0.scrape.py` screen sessions started by
+launch.sh with a single process:
+
+- one Chromium browser and one shared, warmed context (cookies persisted in
+  outputs/publicaccess_state.json) with N pages working concurrently; images,
+  styles, fonts and third-party hosts are blocked, and pages are recycled
+  when their JS heap grows (publicaccess.open_scrape_context)
+- one global rate limit shared by every page, adapting to the server's
+  latency and error rate (AdaptiveRateLimiter; --fixed-rate to disable)
+- application numbers pulled from a shared work queue (no fixed chunks)
+- progress lives in a SQLite job store (scrape_store.py): workers claim
+  leased batches, so a crash or restart resumes without re-reading outputs
+- same per-row output columns as 0.scrape.py, exported to CSV at the end
+- listings are fetched and parsed over plain HTTP first; the browser is only
+  used when the HTTP parse fails (see observations.py)
+- documents are only resolved here and queued in the store;
+  0c.download_documents.py fetches them (--inline-downloads for the old way)
+- failed pages and downloads are retried by 2.retry_failures.py
+- live metrics (apps/min, failure rates, p95 page load, queue depth, ETA,
+  per-worker idle time) in outputs/scrape_metrics.json and on
+  http://127.0.0.1:8790/ (scrape_metrics.py)
+- delta mode (--since-days / --ttl-days) re-queues only applications received
+  or decided recently, then ones not scraped within the TTL; everything else
+  keeps its stored result
+- SCRAPE_LOG moves the log file (mock_publicaccess.py's benchmark keeps its
+  runs out of logs/)
+
+Usage:
+    python 0b.scrape_async.py --concurrency 8 --rate 4
+    python 0b.scrape_async.py --since-days 60 --ttl-days 90   # weekly refresh
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+from playwright.async_api import async_playwright
+
+from observations import scrape_application
+from publicaccess import DOWNLOAD_FAILED, open_scrape_context, recycle_if_heavy, save_storage_state
+from publicaccess_http import HttpListingClient
+from rate_limit import AdaptiveRateLimiter, TokenBucket
+from scrape_metrics import BufferedLog, ScrapeMetrics
+from scrape_store import ScrapeStore
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BASE_DIR = SCRIPTS_DIR.parent
+
+INPUT_CSV = BASE_DIR / "0. data" / "IrishPlanningApplications_2359694955245257726.csv"
+# the same rows pre-filtered and typed by 4a.filter_dublin.py; used when present
+INPUT_PARQUET = BASE_DIR / "0. data" / "IrishPlanningApplications_DublinCityCouncil.parquet"
+
+OUT_DIR = SCRIPTS_DIR / "downloads"
+OUT_CSV = SCRIPTS_DIR / "outputs" / "third_party_obs_async.csv"
+OUT_LOG = Path(os.environ.get("SCRAPE_LOG", SCRIPTS_DIR / "logs" / "third_party_obs_async.log"))
+STORE_DB = SCRIPTS_DIR / "outputs" / "scrape_jobs.sqlite"
+METRICS_JSON = SCRIPTS_DIR / "outputs" / "scrape_metrics.json"
+BROWSER_STATE = SCRIPTS_DIR / "outputs" / "publicaccess_state.json"
+
+CONCURRENCY = 6
+REQUESTS_PER_S = 3.0
+BURST = 3
+HEAP_CHECK_EVERY = 10
+CLAIM_BATCH = 10
+LEASE_S = 600
+METRICS_PORT = 8790
+METRICS_EVERY_S = 5
+
+# ---------------- HELPERS ----------------
+
+
+log = BufferedLog(OUT_LOG)
+
+
+def load_applications(path: Path) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        # row_index keeps the national-file positions the outputs are keyed on
+        return pd.read_parquet(path).set_index("row_index")
+    df = pd.read_csv(path, low_memory=False)
+    if "Planning Authority" in df.columns:
+        df = df[df["Planning Authority"] == "Dublin City Council"]
+    return df
+
+
+def _iso_dates(df: pd.DataFrame, col: str) -> list:
+    if col not in df.columns:
+        return [None] * len(df)
+    dates = pd.to_datetime(df[col], format="mixed", errors="coerce")
+    return [None if pd.isna(d) else d for d in dates.dt.strftime("%Y-%m-%d")]
+
+
+def seed_store(store: ScrapeStore, path: Path) -> int:
+    df = load_applications(path)
+    apps = df["Application Number"].astype(str).str.strip()
+    return store.seed(zip(df.index, apps, _iso_dates(df, "Received Date"), _iso_dates(df, "Decision Date")))
+
+
+# ---------------- WORKERS ----------------
+
+
+async def scrape_one(
+    page, app_no: str, row_index: int, slot: int, client: HttpListingClient | None, download: bool, out_dir: Path
+) -> dict:
+    record = {
+        "worker_id": slot,
+        "row_index": row_index,
+        "application_number": app_no,
+        "no_record_found": 0,
+        "has_third_party_observation": False,
+        "n_observation_letters": 0,
+        "observation_urls": "",
+        "error": "",
+        "source": "",
+        "listing_s": None,
+    }
+
+    try:
+        result, record["source"] = await scrape_application(page, app_no, out_dir, client, download=download)
+
+        urls = result["urls"]
+        record["listing_s"] = result["listing_s"]
+        record["no_record_found"] = result["no_record_found"]
+        record["n_observation_letters"] = len(urls)
+        record["has_third_party_observation"] = len(urls) > 0
+        record["observation_urls"] = ";".join(urls)
+
+    except Exception as e:
+        record["error"] = repr(e)
+
+    return record
+
+
+async def worker(
+    slot: int,
+    context,
+    store: ScrapeStore,
+    owner: str,
+    bucket: TokenBucket,
+    progress: dict,
+    metrics: ScrapeMetrics,
+    client: HttpListingClient | None,
+    args: argparse.Namespace,
+) -> None:
+    page = await context.new_page()
+    page_uses = 0
+    metrics.worker_started(slot)
+
+    try:
+        while True:
+            # The store is only touched from the event loop thread.
+            batch = store.claim(f"{owner}:{slot}", CLAIM_BATCH, lease_s=LEASE_S)
+            if not batch:
+                return
+
+            for row_index, app_no in batch:
+                await bucket.acquire()
+                record = await scrape_one(page, app_no, row_index, slot, client, args.inline_downloads, args.out_dir)
+                if isinstance(bucket, AdaptiveRateLimiter):
+                    bucket.record(record["listing_s"], ok=not record["error"])
+                if record["error"]:
+                    store.fail(app_no, record["error"])
+                else:
+                    store.complete(app_no, record, failed_marker=DOWNLOAD_FAILED, queued=not args.inline_downloads)
+                urls = record["observation_urls"].split(";") if record["observation_urls"] else []
+                metrics.record(
+                    slot,
+                    app_no,
+                    page_ok=not record["error"],
+                    n_docs=len(urls),
+                    n_doc_failed=urls.count(DOWNLOAD_FAILED),
+                    page_load_s=record["listing_s"],
+                )
+
+                progress["done"] += 1
+                if progress["done"] % 100 == 0:
+                    elapsed = time.monotonic() - progress["started"]
+                    rate = progress["done"] / elapsed * 60 if elapsed else 0.0
+                    log(f"Processed {progress['done']}/{progress['total']} ({rate:.1f} apps/min, limit {bucket.rate:.2f} req/s)")
+
+                page_uses += 1
+                if page_uses % HEAP_CHECK_EVERY == 0:
+                    page, page_uses = await recycle_if_heavy(context, page, page_uses)
+    finally:
+        store.release(f"{owner}:{slot}")
+        await page.close()
+
+
+# ---------------- MAIN ----------------
+
+
+async def run(args: argparse.Namespace) -> None:
+    store = ScrapeStore(args.store)
+    delta = args.since_days is not None or args.ttl_days is not None
+    if args.reseed or delta or sum(store.counts().values()) == 0:
+        added = seed_store(store, args.input)
+        log(f"Seeded {added} new applications from {args.input}")
+    if delta:
+        since = None
+        if args.since_days is not None:
+            since = (pd.Timestamp.now().normalize() - pd.Timedelta(days=args.since_days)).strftime("%Y-%m-%d")
+        ttl_s = args.ttl_days * 86400 if args.ttl_days is not None else None
+        requeued = store.requeue_delta(since, ttl_s)
+        log(f"Delta: re-queued {requeued['recent']} received/decided since {since}, {requeued['stale']} older than the TTL")
+
+    counts = store.counts()
+    total = counts["pending"] + counts["claimed"]
+    log(f"Starting: {total} applications, {args.concurrency} pages, {args.rate} req/s (store: {counts})")
+    if total == 0:
+        export(store, args.out_csv)
+        return
+
+    if args.fixed_rate:
+        bucket = TokenBucket(args.rate, burst=args.burst)
+    else:
+        bucket = AdaptiveRateLimiter(args.rate, burst=args.burst, max_rate=args.max_rate)
+    progress = {"done": 0, "total": total, "started": time.monotonic()}
+
+    metrics = ScrapeMetrics(queue_depth=lambda: store.counts()["pending"])
+    publisher = asyncio.create_task(metrics.run_publisher(args.metrics_file, METRICS_EVERY_S, on_publish=log.flush))
+    server = metrics.serve(port=args.metrics_port) if args.metrics_port else None
+    if server is not None:
+        log(f"Metrics on http://127.0.0.1:{args.metrics_port}/")
+
+    client = None if args.browser_only else HttpListingClient(pool_size=args.concurrency * 2)
+    owner = f"{os.uname().nodename}:{os.getpid()}"
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=not args.headed)
+        context = await open_scrape_context(browser, args.browser_state, block=not args.no_block)
+        try:
+            await asyncio.gather(
+                *(worker(slot, context, store, owner, bucket, progress, metrics, client, args) for slot in range(args.concurrency))
+            )
+        finally:
+            await save_storage_state(context, args.browser_state)
+            await browser.close()
+            if client is not None:
+                client.close()
+            publisher.cancel()
+            metrics.publish(args.metrics_file)
+            if server is not None:
+                server.shutdown()
+
+    log(f"Finished: {progress['done']} applications (store: {store.counts()})")
+    export(store, args.out_csv)
+
+
+def export(store: ScrapeStore, out_csv: Path) -> None:
+    # Downstream scripts still read the per-row CSV layout.
+    n = store.export_csv(out_csv)
+    log(f"Exported {n} rows → {out_csv}")
+    store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Async PublicAccess observation scraper")
+    parser.add_argument("--input", type=Path, default=INPUT_PARQUET if INPUT_PARQUET.exists() else INPUT_CSV,
+                        help="4a's Parquet, or the national CSV")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="concurrent pages in one browser")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_S, help="global searches per second (starting rate)")
+    parser.add_argument("--max-rate", type=float, help="ceiling for the adaptive rate (default 4x --rate)")
+    parser.add_argument("--fixed-rate", action="store_true", help="keep --rate constant instead of adapting")
+    parser.add_argument("--burst", type=int, default=BURST)
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--browser-only", action="store_true", help="skip the HTTP listing client")
+    parser.add_argument("--no-block", action="store_true", help="load images, styles and third-party hosts too")
+    parser.add_argument("--browser-state", type=Path, default=BROWSER_STATE, help="persisted cookies/storage")
+    parser.add_argument("--inline-downloads", action="store_true", help="download documents while crawling")
+    parser.add_argument("--store", type=Path, default=STORE_DB, help="SQLite job store")
+    parser.add_argument("--out-dir", type=Path, default=OUT_DIR, help="where inline downloads go")
+    parser.add_argument("--out-csv", type=Path, default=OUT_CSV)
+    parser.add_argument("--reseed", action="store_true", help="add any new applications from --input to the store")
+    parser.add_argument("--metrics-file", type=Path, default=METRICS_JSON)
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="0 disables the metrics endpoint")
+    parser.add_argument("--since-days", type=int, help="delta: re-scrape applications received or decided in this window")
+    parser.add_argument("--ttl-days", type=int, help="delta: re-scrape applications last scraped longer ago than this")
+    args = parser.parse_args()
+
+    for d in (args.out_dir, args.out_csv.parent, args.metrics_file.parent, OUT_LOG.parent):
+        d.mkdir(parents=True, exist_ok=True)
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+download_documents.py
+
+Download stage for observation letters, decoupled from page crawling.
+0b.scrape_async.py only resolves document URLs and queues them in the job
+store; this script fetches them:
+
+- bounded concurrency over one pooled requests Session
+- each body streamed to disk in chunks, resuming any .part file left by a
+  previous run
+- a URL that is already on disk is not fetched again, and a file whose
+  sha256 matches one already downloaded is dropped in favour of that copy
+- failed downloads mark the slot failed; 2.retry_failures.py re-resolves it
+
+Can run alongside the crawl (it polls for newly queued documents with
+--follow) or after it.
+
+Usage:
+    python 0c.download_documents.py --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from downloader import HTTP_TIMEOUT_S, make_session, stream_download
+from publicaccess import safe_app_name
+from scrape_metrics import BufferedLog
+from scrape_store import ScrapeStore
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+OUT_DIR = SCRIPTS_DIR / "downloads"
+OUT_LOG = SCRIPTS_DIR / "logs" / "download_documents.log"
+STORE_DB = SCRIPTS_DIR / "outputs" / "scrape_jobs.sqlite"
+
+CONCURRENCY = 8
+FOLLOW_POLL_S = 10
+
+# ---------------- HELPERS ----------------
+
+
+log = BufferedLog(OUT_LOG)
+
+
+def out_path_for(app_no: str, position: int) -> Path:
+    # same naming as the inline downloads in publicaccess.py
+    return OUT_DIR / f"{safe_app_name(app_no)}_obs_{position+1}.pdf"
+
+
+# ---------------- MAIN ----------------
+
+
+def run(args: argparse.Namespace) -> None:
+    store = ScrapeStore(args.store)
+    session = make_session(pool_size=args.concurrency)
+    stats = {"downloaded": 0, "reused": 0, "duplicate": 0, "failed": 0, "bytes": 0}
+    started = time.monotonic()
+
+    log(f"Starting downloads: {args.concurrency} connections (documents: {store.download_counts()})")
+
+    # The store is only touched from this thread; workers just move bytes.
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        in_flight = {}
+        while True:
+            if len(in_flight) < args.concurrency:
+                for app_no, pos, url in store.claim_downloads(args.concurrency * 2 - len(in_flight)):
+                    existing = store.downloaded_file(url=url)
+                    if existing and Path(existing[0]).exists():
+                        store.finish_download(app_no, pos, *existing)
+                        stats["reused"] += 1
+                        continue
+                    out_path = out_path_for(app_no, pos)
+                    fut = pool.submit(stream_download, session, url, out_path, args.timeout)
+                    in_flight[fut] = (app_no, pos, out_path)
+
+            if not in_flight:
+                if not args.follow:
+                    break
+                log.flush()
+                time.sleep(FOLLOW_POLL_S)
+                continue
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                app_no, pos, out_path = in_flight.pop(fut)
+                try:
+                    size, sha256 = fut.result()
+                except Exception as e:
+                    store.fail_download(app_no, pos, repr(e))
+                    stats["failed"] += 1
+                    continue
+
+                same = store.downloaded_file(sha256=sha256)
+                if same and same[0] != str(out_path) and Path(same[0]).exists():
+                    out_path.unlink(missing_ok=True)
+                    store.finish_download(app_no, pos, same[0], size, sha256)
+                    stats["duplicate"] += 1
+                else:
+                    store.finish_download(app_no, pos, str(out_path), size, sha256)
+                    stats["downloaded"] += 1
+                stats["bytes"] += size
+
+                n = stats["downloaded"] + stats["duplicate"]
+                if n and n % 200 == 0:
+                    elapsed = time.monotonic() - started
+                    mb_s = stats["bytes"] / elapsed / 1e6 if elapsed else 0.0
+                    log(f"Downloaded {n} documents ({mb_s:.2f} MB/s, {stats['failed']} failed)")
+
+    session.close()
+    log(f"Finished downloads: {stats} (documents: {store.download_counts()})")
+    store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Download queued observation documents")
+    parser.add_argument("--store", type=Path, default=STORE_DB)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="parallel downloads")
+    parser.add_argument("--timeout", type=float, default=HTTP_TIMEOUT_S)
+    parser.add_argument("--follow", action="store_true", help="keep polling for documents queued by a running crawl")
+    args = parser.parse_args()
+
+    for d in (OUT_DIR, OUT_LOG.parent):
+        d.mkdir(parents=True, exist_ok=True)
+
+    try:
+        run(args)
+    finally:
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
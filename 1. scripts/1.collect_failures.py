@@ -2,65 +2,95 @@
 """
 Collect and classify failures from completed worker outputs.
 
+Worker outputs are discovered by glob and streamed in chunks; rows are
+classified with vectorized string ops rather than row by row.
+
 Produces:
-1. rerun_page_failures.csv
-2. rerun_download_failures.csv
+1. rerun_page_failures.csv       (full rows, Page.goto errors)
+2. rerun_download_failures.csv   (one row per application, with its failed positions)
+
+Per-position retries do not need a file: 2.retry_failures.py claims failed
+document slots straight from the job store (scrape_store.py).
 """
 
+import argparse
 from pathlib import Path
+
 import pandas as pd
 
-OUT_DIR = Path(
-    "/Users/mikemcrae/Documents/GitHub/Planning applications/1. scripts/outputs"
-)
+SCRIPTS_DIR = Path(__file__).resolve().parent
+OUT_DIR = SCRIPTS_DIR / "outputs"
+
+WORKER_GLOB = "third_party_obs_worker_*.csv"
+CHUNK_ROWS = 100_000
+DOWNLOAD_FAILED = "DOWNLOAD_FAILED"
+
+PAGE_FAIL_NAME = "rerun_page_failures.csv"
+DOWNLOAD_FAIL_NAME = "rerun_download_failures.csv"
+
+
+def classify(chunk: pd.DataFrame):
+    """Split a chunk into (page failures, download failures)."""
+    error = chunk["error"].fillna("").astype(str).str.strip()
+    urls = chunk["observation_urls"].fillna("").astype(str).str.strip()
+
+    page = error.str.contains("Page.goto", regex=False)
+    download = ~page & urls.str.contains(DOWNLOAD_FAILED, regex=False)
+
+    slots = urls[download].str.split(";").explode()
+    position = slots.groupby(level=0).cumcount()
+    failed = position[slots == DOWNLOAD_FAILED]
 
-WORKER_FILES = [OUT_DIR / f"third_party_obs_worker_{i}.csv" for i in range(10)]
+    meta = chunk.loc[download, ["row_index", "application_number"]].assign(
+        worker_id=chunk.loc[download, "worker_id"] if "worker_id" in chunk else ""
+    )
 
-PAGE_FAIL_OUT = OUT_DIR / "rerun_page_failures.csv"
-DOWNLOAD_FAIL_OUT = OUT_DIR / "rerun_download_failures.csv"
+    downloads = meta.assign(
+        failed_positions=failed.astype(str).groupby(level=0).agg(",".join),
+        observation_urls=urls[download],
+    )[["row_index", "worker_id", "application_number", "failed_positions", "observation_urls"]]
 
-page_fail_rows = []
-download_fail_rows = []
+    return chunk[page], downloads
 
-for path in WORKER_FILES:
-    if not path.exists():
-        continue
 
-    df = pd.read_csv(path)
+def append(df: pd.DataFrame, path: Path, written: dict) -> None:
+    if df.empty:
+        return
+    df.to_csv(path, mode="a", header=path not in written, index=False)
+    written[path] = written.get(path, 0) + len(df)
 
-    for _, row in df.iterrows():
-        error = str(row.get("error", "")).strip()
-        urls = str(row.get("observation_urls", "")).strip()
 
-        # -------- PAGE-LEVEL FAILURE --------
-        if error and "Page.goto" in error:
-            page_fail_rows.append(row)
-            continue
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Classify page and download failures in worker outputs")
+    parser.add_argument("--outputs", type=Path, default=OUT_DIR)
+    parser.add_argument("--glob", default=WORKER_GLOB, help="worker output files to scan")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
 
-        # -------- DOWNLOAD-LEVEL FAILURE --------
-        if "DOWNLOAD_FAILED" in urls:
-            parts = urls.split(";")
-            failed_positions = [
-                i for i, p in enumerate(parts) if p == "DOWNLOAD_FAILED"
-            ]
+    page_out = args.outputs / PAGE_FAIL_NAME
+    download_out = args.outputs / DOWNLOAD_FAIL_NAME
+    for path in (page_out, download_out):
+        path.unlink(missing_ok=True)
 
-            download_fail_rows.append({
-                "row_index": row["row_index"],
-                "worker_id": row["worker_id"],
-                "application_number": row["application_number"],
-                "failed_positions": ",".join(map(str, failed_positions)),
-                "observation_urls": urls,
-            })
+    files = sorted(args.outputs.glob(args.glob))
+    written: dict = {}
+    scanned = 0
 
-# -------- WRITE OUTPUTS --------
+    for path in files:
+        for chunk in pd.read_csv(path, chunksize=args.chunk_rows, low_memory=False):
+            scanned += len(chunk)
+            page, downloads = classify(chunk)
+            append(page, page_out, written)
+            append(downloads, download_out, written)
 
-if page_fail_rows:
-    pd.DataFrame(page_fail_rows).to_csv(PAGE_FAIL_OUT, index=False)
-    print(f"Wrote {len(page_fail_rows)} page failures → {PAGE_FAIL_OUT}")
+    print(f"Scanned {scanned} rows in {len(files)} files")
+    if page_out in written:
+        print(f"Wrote {written[page_out]} page failures → {page_out}")
+    if download_out in written:
+        print(f"Wrote {written[download_out]} download failures → {download_out}")
+    if not written:
+        print("No failures detected 🎉")
 
-if download_fail_rows:
-    pd.DataFrame(download_fail_rows).to_csv(DOWNLOAD_FAIL_OUT, index=False)
-    print(f"Wrote {len(download_fail_rows)} download failures → {DOWNLOAD_FAIL_OUT}")
 
-if not page_fail_rows and not download_fail_rows:
-    print("No failures detected 🎉")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+retry_failures.py
+
+One retry scheduler for everything 0b.scrape_async.py left unfinished,
+replacing the 1 → 2a/2b → 3b/3c → 3e/3f rounds. Works straight off the
+SQLite job store (scrape_store.py), at two levels:
+
+- page failures: the whole application is scraped again
+- download failures: only the failed observation positions are re-fetched;
+  slots that already downloaded are never touched
+
+Documents fetched inline get their file path, size and sha256 recorded the
+same way 0c.download_documents.py records its downloads, so 3.merge_results.py
+and later 0c runs see them as on disk.
+
+Every failure is rescheduled with exponential backoff and jitter and given
+up after --max-attempts. The run keeps going, sleeping until the next retry
+is due, until nothing retryable is left, then exports the usual CSV.
+
+The older rerun scripts are kept as the record of how the first crawl was
+repaired; they are not needed for new runs.
+
+Usage:
+    python 2.retry_failures.py --concurrency 4 --max-attempts 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from downloader import file_digest
+from observations import retry_positions, scrape_application
+from publicaccess import DOWNLOAD_FAILED, open_scrape_context, safe_app_name, save_storage_state
+from publicaccess_http import HttpListingClient
+from rate_limit import TokenBucket
+from scrape_metrics import BufferedLog
+from scrape_store import MAX_ATTEMPTS, ScrapeStore
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+OUT_DIR = SCRIPTS_DIR / "downloads"
+OUT_CSV = SCRIPTS_DIR / "outputs" / "third_party_obs_async.csv"
+OUT_LOG = SCRIPTS_DIR / "logs" / "retry_failures.log"
+STORE_DB = SCRIPTS_DIR / "outputs" / "scrape_jobs.sqlite"
+BROWSER_STATE = SCRIPTS_DIR / "outputs" / "publicaccess_state.json"
+
+CONCURRENCY = 4
+REQUESTS_PER_S = 2.0
+BURST = 2
+CLAIM_BATCH = 5
+MAX_IDLE_SLEEP_S = 60
+
+# ---------------- HELPERS ----------------
+
+
+log = BufferedLog(OUT_LOG)
+
+
+def out_path_for(app_no: str, position: int) -> Path:
+    # same naming as the inline downloads in publicaccess.py and observations.py
+    return OUT_DIR / f"{safe_app_name(app_no)}_obs_{position+1}.pdf"
+
+
+async def record_files(store: ScrapeStore, app_no: str, positions) -> None:
+    """Record inline downloads like 0c does, dropping a file whose content is already on disk."""
+    for pos in positions:
+        out_path = out_path_for(app_no, pos)
+        if not out_path.exists():
+            continue
+        size, sha256 = await asyncio.to_thread(file_digest, out_path)
+        same = store.downloaded_file(sha256=sha256)
+        if same and same[0] != str(out_path) and Path(same[0]).exists():
+            out_path.unlink(missing_ok=True)
+            store.finish_download(app_no, pos, same[0], size, sha256)
+        else:
+            store.finish_download(app_no, pos, str(out_path), size, sha256)
+
+
+# ---------------- RETRIES ----------------
+
+
+async def retry_page(store: ScrapeStore, page, app_no: str, client: HttpListingClient | None) -> str:
+    try:
+        result, source = await scrape_application(page, app_no, OUT_DIR, client)
+    except Exception as e:
+        store.fail(app_no, repr(e))
+        return "page_failed"
+
+    urls = result["urls"]
+    record = {
+        "no_record_found": result["no_record_found"],
+        "n_observation_letters": len(urls),
+        "observation_urls": ";".join(urls),
+        "source": source,
+    }
+    state = store.complete(app_no, record, failed_marker=DOWNLOAD_FAILED)
+    await record_files(store, app_no, [pos for pos, url in enumerate(urls) if url != DOWNLOAD_FAILED])
+    return state
+
+
+async def retry_documents(
+    store: ScrapeStore, page, app_no: str, positions: list, client: HttpListingClient | None
+) -> str:
+    try:
+        fetched = await retry_positions(page, app_no, positions, OUT_DIR, client)
+        results = {pos: (None if url == DOWNLOAD_FAILED else url) for pos, url in fetched.items()}
+        errors = {}
+    except Exception as e:
+        results = {pos: None for pos in positions}
+        errors = {pos: repr(e) for pos in positions}
+    state = store.complete_documents(app_no, results, errors)
+    await record_files(store, app_no, [pos for pos, url in results.items() if url is not None])
+    return state
+
+
+async def worker(
+    slot: int,
+    context,
+    store: ScrapeStore,
+    owner: str,
+    bucket: TokenBucket,
+    client: HttpListingClient | None,
+    args: argparse.Namespace,
+    tally: dict,
+) -> None:
+    page = await context.new_page()
+    me = f"{owner}:{slot}"
+
+    try:
+        while True:
+            pages = store.claim_page_retries(me, CLAIM_BATCH, max_attempts=args.max_attempts)
+            for _, app_no in pages:
+                await bucket.acquire()
+                state = await retry_page(store, page, app_no, client)
+                tally[state] = tally.get(state, 0) + 1
+                log(f"[{slot}] page retry {app_no} → {state}")
+
+            docs = store.claim_document_retries(me, CLAIM_BATCH, max_attempts=args.max_attempts)
+            for app_no, positions in docs:
+                await bucket.acquire()
+                state = await retry_documents(store, page, app_no, positions, client)
+                tally[state] = tally.get(state, 0) + 1
+                log(f"[{slot}] document retry {app_no} positions={positions} → {state}")
+
+            if pages or docs:
+                continue
+
+            due = store.next_retry_at(max_attempts=args.max_attempts)
+            if due is None:
+                return
+            log.flush()
+            await asyncio.sleep(min(MAX_IDLE_SLEEP_S, max(1.0, due - time.time())))
+    finally:
+        store.release(me)
+        await page.close()
+
+
+# ---------------- MAIN ----------------
+
+
+async def run(args: argparse.Namespace) -> None:
+    store = ScrapeStore(args.store)
+    log(f"Starting retries: {args.concurrency} pages, max {args.max_attempts} attempts (store: {store.counts()})")
+
+    bucket = TokenBucket(args.rate, burst=args.burst)
+    client = None if args.browser_only else HttpListingClient(pool_size=args.concurrency * 2)
+    owner = f"retry:{os.uname().nodename}:{os.getpid()}"
+    tally: dict = {}
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=not args.headed)
+        context = await open_scrape_context(browser, BROWSER_STATE)
+        try:
+            await asyncio.gather(
+                *(worker(slot, context, store, owner, bucket, client, args, tally) for slot in range(args.concurrency))
+            )
+        finally:
+            await save_storage_state(context, BROWSER_STATE)
+            await browser.close()
+            if client is not None:
+                client.close()
+
+    log(f"Finished retries: {tally} (store: {store.counts()})")
+    n = store.export_csv(OUT_CSV)
+    log(f"Exported {n} rows → {OUT_CSV}")
+    store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Retry failed pages and downloads from the scrape job store")
+    parser.add_argument("--store", type=Path, default=STORE_DB)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_S, help="global searches per second")
+    parser.add_argument("--burst", type=int, default=BURST)
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="per page and per document")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--browser-only", action="store_true", help="skip the HTTP listing client")
+    args = parser.parse_args()
+
+    for d in (OUT_DIR, OUT_CSV.parent, OUT_LOG.parent):
+        d.mkdir(parents=True, exist_ok=True)
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
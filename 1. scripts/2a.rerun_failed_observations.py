@@ -12,6 +12,7 @@ scraping logic:
 
 from __future__ import annotations
 
+import os
 import time
 import urllib.parse
 from pathlib import Path
@@ -37,10 +38,11 @@ OUT_LOG = BASE_DIR / "outputs" / "rerun_page_failures_results.log"
 # SITE CONFIG
 # ---------------------------------------------------------------------
 
-BASE_URL = (
-    "https://webapps.dublincity.ie/PublicAccess_Live/"
-    "SearchResult/RunThirdPartySearch"
-)
+# PUBLICACCESS_BASE_URL points the scraper at another host, e.g. mock_publicaccess.py
+SITE_ROOT = os.environ.get(
+    "PUBLICACCESS_BASE_URL", "https://webapps.dublincity.ie/PublicAccess_Live"
+).rstrip("/")
+BASE_URL = SITE_ROOT + "/SearchResult/RunThirdPartySearch"
 
 RESULTS_LENGTH_SELECT = 'select[name="searchResult_length"]'
 OBS_ICON_SELECTOR = (
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+merge_results.py
+
+Single merge stage for the observation scrape, replacing 3a/3d and the
+merged → _v2 → ... chain. Every source is a patch layer, applied in the
+order of LAYERS (later layers win):
+
+- full layers replace the whole row for each row_index they contain
+- column layers (e.g. the download reruns) only replace the listed columns,
+  and only where they rank above the layer that supplied the row
+
+Each column is resolved in one keyed pass (stack all candidates, keep the
+highest-priority one per row_index), so the cost does not depend on how
+many patch files there are. Provenance is kept per row: `source_layer` for
+the row and `<column>_source` for each patched column.
+
+Output is one Parquet file (needs pyarrow); --csv also writes the legacy
+CSV layout. Next to it goes the normalized documents table, one row per
+observation slot (row_index, application_number, position, url, status,
+file_path, size, sha256), so letter counts and failure lookups are group-bys
+instead of string parsing. File details come from the job store where it has
+them, otherwise from the conventional download name if that file exists.
+--import-store also loads the merged legacy rows into the job store, so the
+retry and download stages can work on them.
+
+Usage:
+    python 3.merge_results.py
+    python 3.merge_results.py --csv outputs/third_party_obs_merged_v2.csv
+    python 3.merge_results.py --import-store
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import pandas as pd
+
+from scrape_store import DOC_OK, ScrapeStore, explode_documents
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+OUTPUTS = SCRIPTS_DIR / "outputs"
+OUT_PARQUET = OUTPUTS / "third_party_obs_merged.parquet"
+OUT_DOCUMENTS = OUTPUTS / "third_party_obs_documents.parquet"
+STORE_DB = OUTPUTS / "scrape_jobs.sqlite"
+DOWNLOADS = SCRIPTS_DIR / "downloads"
+
+DOWNLOAD_FAILED = "DOWNLOAD_FAILED"
+KEY = "row_index"
+
+
+@dataclass(frozen=True)
+class Layer:
+    name: str
+    pattern: str
+    columns: Tuple[str, ...] | None = None  # None = full row override
+    keep: str = "last"  # which duplicate row_index wins inside the layer
+
+
+# Lowest priority first, i.e. the order the old scripts applied them in.
+LAYERS: Sequence[Layer] = (
+    Layer("workers", "third_party_obs_worker_*.csv", keep="first"),
+    Layer("page_rerun", "rerun_page_failures_results.csv"),
+    Layer("download_rerun", "rerun_download_failures_results.csv", columns=("observation_urls",)),
+    Layer("download_rerun_round2", "rerun_download_failures_round2_worker_*.csv", columns=("observation_urls",)),
+    Layer("download_rerun_round3", "rerun_download_failures_round3_worker_*.csv", columns=("observation_urls",)),
+    Layer("job_store", "third_party_obs_async.csv"),
+)
+
+# ---------------- LOAD ----------------
+
+
+def load_layer(outputs: Path, layer: Layer) -> pd.DataFrame | None:
+    files = sorted(outputs.glob(layer.pattern))
+    frames = [pd.read_csv(f, low_memory=False, dtype={"observation_urls": "string"}) for f in files]
+    frames = [f for f in frames if KEY in f.columns and not f.empty]
+    if not frames:
+        return None
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df[pd.to_numeric(df[KEY], errors="coerce").notna()]
+    df[KEY] = df[KEY].astype("int64")
+    if layer.columns is not None:
+        df = df[[KEY, *layer.columns]]
+    return df.drop_duplicates(KEY, keep=layer.keep)
+
+
+# ---------------- MERGE ----------------
+
+
+def merge_layers(layers: List[Tuple[int, Layer, pd.DataFrame]]) -> pd.DataFrame:
+    full = [(p, layer, df) for p, layer, df in layers if layer.columns is None]
+    if not full:
+        raise ValueError("no full-row layer found; nothing to patch")
+
+    # Rows: the highest-priority full layer that has each row_index.
+    stacked = pd.concat(
+        [df.assign(_priority=p, source_layer=layer.name) for p, layer, df in full],
+        ignore_index=True,
+    )
+    merged = (
+        stacked.sort_values("_priority", kind="stable")
+        .drop_duplicates(KEY, keep="last")
+        .set_index(KEY)
+        .sort_index()
+    )
+
+    # Columns: patches only count where they outrank the layer that supplied the row.
+    patched = sorted({c for _, layer, _ in layers if layer.columns for c in layer.columns})
+    for col in patched:
+        own = pd.DataFrame(
+            {KEY: merged.index, "_priority": merged["_priority"].to_numpy(), col: merged[col].to_numpy(),
+             "_layer": merged["source_layer"].to_numpy()}
+        )
+        patches = [
+            df[[KEY, col]].assign(_priority=p, _layer=layer.name)
+            for p, layer, df in layers
+            if layer.columns and col in layer.columns
+        ]
+        candidates = pd.concat([own, *patches], ignore_index=True)
+        candidates = candidates[candidates[KEY].isin(merged.index)]
+        best = (
+            candidates.sort_values("_priority", kind="stable")
+            .drop_duplicates(KEY, keep="last")
+            .set_index(KEY)
+            .reindex(merged.index)
+        )
+        merged[col] = best[col]
+        merged[f"{col}_source"] = best["_layer"]
+
+    return merged.drop(columns="_priority").reset_index()
+
+
+def finalize(df: pd.DataFrame) -> pd.DataFrame:
+    urls = df["observation_urls"].fillna("").astype(str)
+    df["observation_urls"] = urls
+    df["n_download_failed"] = urls.str.count(DOWNLOAD_FAILED).astype("int32")
+    for col in ("no_record_found", "n_observation_letters"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int32")
+    if "has_third_party_observation" in df.columns:
+        df["has_third_party_observation"] = df["n_observation_letters"] > 0
+    for col in ("source_layer", "observation_urls_source"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    # mixed NaN/str columns (error, source, ...) need one type for Parquet
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype("string")
+    return df
+
+
+def documents_table(merged: pd.DataFrame, store: ScrapeStore | None, downloads: Path) -> pd.DataFrame:
+    docs = explode_documents(merged)
+    key = ["application_number", "position"]
+
+    if store is not None:
+        known = store.documents_frame()[[*key, "url", "status", "file_path", "size", "sha256"]]
+        docs = docs.merge(known, on=key, how="left", suffixes=("", "_store"))
+        same = docs["url"].eq(docs["url_store"]).fillna(False) | (docs["url"].isna() & docs["url_store"].isna())
+        same &= docs["status_store"].notna()
+        docs["status"] = docs["status"].where(~same, docs["status_store"])
+        for col in ("file_path", "size", "sha256"):
+            docs[col] = docs[col].where(same)
+        docs = docs.drop(columns=["url_store", "status_store"])
+    else:
+        docs = docs.assign(file_path=pd.NA, size=pd.NA, sha256=pd.NA)
+
+    # legacy downloads: same naming as publicaccess.py, kept only if the file is there
+    on_disk = {p.name for p in downloads.glob("*.pdf")} if downloads.is_dir() else set()
+    safe_app = docs["application_number"].astype(str).str.replace("/", "_", regex=False)
+    names = safe_app + "_obs_" + (docs["position"] + 1).astype(str) + ".pdf"
+    found = docs["file_path"].isna() & docs["status"].eq(DOC_OK) & names.isin(on_disk)
+    docs.loc[found, "file_path"] = str(downloads) + "/" + names[found]
+
+    return docs.astype({"file_path": "string", "sha256": "string", "size": "Int64"})
+
+
+# ---------------- MAIN ----------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge scrape outputs and retry patches into one file")
+    parser.add_argument("--outputs", type=Path, default=OUTPUTS, help="directory holding the layer files")
+    parser.add_argument("--out", type=Path, default=OUT_PARQUET)
+    parser.add_argument("--csv", type=Path, help="also write the legacy CSV layout here")
+    parser.add_argument("--documents", type=Path, default=OUT_DOCUMENTS, help="per-document Parquet output")
+    parser.add_argument("--downloads", type=Path, default=DOWNLOADS)
+    parser.add_argument("--store", type=Path, default=STORE_DB)
+    parser.add_argument("--import-store", action="store_true", help="load merged rows the job store has not scraped")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    layers = []
+    for priority, layer in enumerate(LAYERS):
+        df = load_layer(args.outputs, layer)
+        if df is None:
+            print(f"  {layer.name:<24} (no files)")
+            continue
+        print(f"  {layer.name:<24} {len(df):>8} rows")
+        layers.append((priority, layer, df))
+
+    merged = finalize(merge_layers(layers))
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    merged.to_parquet(args.out, index=False)
+    if args.csv is not None:
+        merged.to_csv(args.csv, index=False)
+
+    store = ScrapeStore(args.store) if args.import_store or args.store.exists() else None
+    if args.import_store:
+        print(f"Imported {store.import_results(merged)} legacy rows into {args.store}")
+    docs = documents_table(merged, store, args.downloads)
+    docs.to_parquet(args.documents, index=False)
+    if store is not None:
+        store.close()
+
+    print(f"✅ Merged {len(merged)} rows from {len(layers)} layers in {time.monotonic() - started:.1f}s → {args.out}")
+    print(f"   {len(docs)} documents → {args.documents}")
+    print(docs["status"].value_counts().to_string())
+    print(merged["source_layer"].value_counts().to_string())
+    if "observation_urls_source" in merged.columns:
+        print(merged["observation_urls_source"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ Each worker:
 
 from __future__ import annotations
 
+import os
 import sys
 import time
 import urllib.parse
@@ -43,10 +44,11 @@ DOWNLOAD_DIR.mkdir(exist_ok=True)
 
 # ---------------- SITE CONFIG ----------------
 
-BASE_URL = (
-    "https://webapps.dublincity.ie/PublicAccess_Live/"
-    "SearchResult/RunThirdPartySearch"
-)
+# PUBLICACCESS_BASE_URL points the scraper at another host, e.g. mock_publicaccess.py
+SITE_ROOT = os.environ.get(
+    "PUBLICACCESS_BASE_URL", "https://webapps.dublincity.ie/PublicAccess_Live"
+).rstrip("/")
+BASE_URL = SITE_ROOT + "/SearchResult/RunThirdPartySearch"
 
 OBS_SELECTOR = (
     'span[aria-label*="3rd Party Observation"], '
@@ -4,6 +4,7 @@ Round-3 parallel retry of remaining DOWNLOAD_FAILED entries.
 """
 
 from __future__ import annotations
+import os
 import sys
 import time
 import urllib.parse
@@ -25,10 +26,11 @@ INPUT = BASE / "rerun_download_failures_round3.csv"
 OUT = BASE / f"rerun_download_failures_round3_worker_{WORKER_ID}.csv"
 DOWNLOAD_DIR = BASE / "downloads"
 
-BASE_URL = (
-    "https://webapps.dublincity.ie/PublicAccess_Live/"
-    "SearchResult/RunThirdPartySearch"
-)
+# PUBLICACCESS_BASE_URL points the scraper at another host, e.g. mock_publicaccess.py
+SITE_ROOT = os.environ.get(
+    "PUBLICACCESS_BASE_URL", "https://webapps.dublincity.ie/PublicAccess_Live"
+).rstrip("/")
+BASE_URL = SITE_ROOT + "/SearchResult/RunThirdPartySearch"
 
 OBS_SELECTOR = (
     'span[aria-label*="3rd Party Observation"], '
@@ -1,38 +1,252 @@
+#!/usr/bin/env python3
+"""
+Stream the national planning applications CSV and keep Dublin City Council.
+
+The file is read in blocks by pyarrow's streaming CSV reader:
+- every column is read as a string, so nothing is type-inferred
+- the planning authority filter is applied to each block as it arrives
+- lines with too many fields are written to a quarantine CSV instead of
+  being silently skipped (pandas cannot hand back the raw text of a bad
+  line without its slow python engine)
+- lines with too few fields are kept and padded with nulls, as pandas does
+
+pyarrow hands both kinds of line to the invalid row handler, numbered by
+record, so row_index is rebuilt to be the index pandas' read_csv gives the
+row: short lines count, overlong lines do not. With no overlong lines that
+is exactly the index the C engine produced (it stops with a ParserError on
+them); otherwise it matches on_bad_lines="skip". Quoted newlines are
+handled the same way by both.
+
+Outputs:
+1. IrishPlanningApplications_DublinCityCouncil.parquet  the COLUMNS later steps read, typed,
+   with row_index (the row's position in the national file, which the scrape
+   outputs key on)
+2. IrishPlanningApplications_DublinCityCouncil.csv      same rows, every national column, as read
+3. IrishPlanningApplications_quarantine.csv             overlong lines, if any
+"""
+
+import argparse
+import csv
+import io
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "0. data"
 
-INPUT_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data/IrishPlanningApplications_2359694955245257726.csv"
-OUTPUT_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data/IrishPlanningApplications_DublinCityCouncil.csv"
+INPUT_PATH = DATA_DIR / "IrishPlanningApplications_2359694955245257726.csv"
+OUTPUT_PATH = DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.csv"
+OUTPUT_PARQUET = DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.parquet"
+QUARANTINE_PATH = DATA_DIR / "IrishPlanningApplications_quarantine.csv"
 
-# -------------------------
-# LOAD SAFELY (robust parser)
-# -------------------------
+AUTHORITY = "Dublin City Council"
+BLOCK_BYTES = 16 << 20
 
-apps = pd.read_csv(
-    INPUT_PATH,
-    sep=",",
-    engine="python",          # tolerant parser
-    on_bad_lines="skip"       # skip malformed rows
+# every column a later step reads, and the type it is stored as
+COLUMNS = {
+    "Application Number": "string",
+    "Planning Authority": "category",
+    "Application Type": "category",
+    "Development Description": "string",
+    "Development Address": "string",
+    "Received Date": "datetime",
+    "Decision Date": "datetime",
+    "Decision": "category",
+    "Appeal Status": "category",
+    "Appeal Decision": "category",
+    "Appeal Reference Number": "string",
+    "Number of Residential Units": "float",
+    "Site Area": "float",
+    "Floor Area": "float",
+    "One-Off House": "category",
+    "Link Application Details": "string",
+    "ITM Easting": "float",
+    "ITM Northing": "float",
+}
+
+SCHEMA = pa.schema(
+    [("row_index", pa.int64())]
+    + [
+        (
+            name,
+            {
+                "string": pa.string(),
+                "category": pa.dictionary(pa.int32(), pa.string()),
+                "datetime": pa.timestamp("ns"),
+                "float": pa.float64(),
+            }[kind],
+        )
+        for name, kind in COLUMNS.items()
+    ]
 )
 
-print("Total rows loaded:", len(apps))
-print("Columns detected:")
-print(apps.columns.tolist())
 
-# -------------------------
-# FILTER
-# -------------------------
+class Quarantine:
+    """
+    invalid_row_handler for pyarrow. Every invalid row is skipped by the
+    reader; overlong ones are kept as raw lines for the quarantine file, short
+    ones are parsed here and padded so filter_applications can put them back.
+    """
+
+    def __init__(self, path: Path, header: list) -> None:
+        self.path = path
+        self.header = header
+        self.rows = []
+        self.short = []  # (record, {column: value})
+        self.invalid = []  # record numbers of every skipped row
+        self.long = []  # record numbers of the quarantined rows
+        self.assigned = 0  # records before this already have a row_index
+        self.late = 0
+
+    def __call__(self, row) -> str:
+        record = row.number - 2  # 1-based, counting the header
+        if record < self.assigned:
+            self.late += 1
+        self.invalid.append(record)
+        if row.actual_columns > row.expected_columns:
+            self.long.append(record)
+            self.rows.append((row.number, row.expected_columns, row.actual_columns, row.text))
+        else:
+            fields = next(csv.reader(io.StringIO(row.text)), [])
+            # empty fields as nulls, like strings_can_be_null in the reader
+            self.short.append((record, {name: value or None for name, value in zip(self.header, fields)}))
+        return "skip"
+
+    def write(self) -> None:
+        self.path.unlink(missing_ok=True)
+        if not self.rows:
+            return
+        with open(self.path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["line_number", "expected_columns", "actual_columns", "text"])
+            writer.writerows(self.rows)
+
+
+def read_header(src: Path) -> list:
+    with open(src, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f))
+
+
+def record_numbers(start: int, n: int, invalid: np.ndarray) -> np.ndarray:
+    """Record numbers of the next n valid rows, from `start`, skipping invalid records."""
+    skipped = invalid[invalid >= start]
+    span = np.arange(start, start + n + len(skipped))
+    return span[~np.isin(span, skipped)][:n]
+
+
+def typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Raw string columns → the types in COLUMNS."""
+    out = df.copy()
+    for name, kind in COLUMNS.items():
+        if kind == "datetime":
+            out[name] = pd.to_datetime(out[name], format="mixed", errors="coerce")
+        elif kind == "float":
+            out[name] = pd.to_numeric(out[name], errors="coerce")
+        elif kind == "category":
+            out[name] = out[name].astype("category")
+    return out
+
+
+def filter_applications(src: Path, csv_out: Path, parquet_out: Path, quarantine_path: Path, block_bytes: int) -> dict:
+    quarantine = Quarantine(quarantine_path, read_header(src))
+    header = quarantine.header
+    reader = pacsv.open_csv(
+        src,
+        read_options=pacsv.ReadOptions(block_size=block_bytes),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True, invalid_row_handler=quarantine),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            strings_can_be_null=True,
+        ),
+    )
+
+    csv_out.unlink(missing_ok=True)
+    kept = 0
+    next_record = 0  # record number of the next valid row
+    short_done = 0  # short rows already placed
+
+    def pandas_index(records: np.ndarray) -> np.ndarray:
+        # pandas drops overlong lines from its index and keeps everything else
+        return records - np.searchsorted(np.sort(np.array(quarantine.long, dtype=np.int64)), records)
+
+    def short_rows(upto: float) -> pd.DataFrame:
+        """Dublin rows among the padded short rows before record `upto` (reported in record order)."""
+        nonlocal short_done
+        ready = []
+        while short_done < len(quarantine.short) and quarantine.short[short_done][0] < upto:
+            ready.append(quarantine.short[short_done])
+            short_done += 1
+        dublin = [(r, values) for r, values in ready if (values.get("Planning Authority") or "").strip() == AUTHORITY]
+        df = pd.DataFrame([values for _, values in dublin], columns=header)
+        df.insert(0, "row_index", pandas_index(np.array([r for r, _ in dublin], dtype=np.int64)))
+        return df
+
+    with pq.ParquetWriter(parquet_out, SCHEMA) as writer:
+
+        def write(raw: pd.DataFrame) -> None:
+            nonlocal kept
+            if not len(raw):
+                return
+            raw = raw.sort_values("row_index")
+            raw.drop(columns="row_index").to_csv(csv_out, mode="a", header=kept == 0, index=False)
+            table = raw.reindex(columns=["row_index", *COLUMNS])
+            writer.write_table(pa.Table.from_pandas(typed(table), schema=SCHEMA, preserve_index=False))
+            kept += len(raw)
+
+        for batch in reader:
+            records = record_numbers(next_record, batch.num_rows, np.array(quarantine.invalid, dtype=np.int64))
+            if len(records):
+                next_record = int(records[-1]) + 1
+            quarantine.assigned = next_record
+
+            authority = pc.utf8_trim_whitespace(batch.column("Planning Authority"))
+            mask = pc.fill_null(pc.equal(authority, AUTHORITY), False)
+            raw = batch.filter(mask).to_pandas()
+            raw.insert(0, "row_index", pandas_index(records[pc.indices_nonzero(mask).to_numpy()]))
+            short = short_rows(next_record)
+            write(pd.concat([raw, short], ignore_index=True) if len(short) else raw)
+
+        write(short_rows(float("inf")))
+
+    if quarantine.late:
+        raise RuntimeError(f"{quarantine.late} invalid rows were reported after their block; row_index is unreliable")
+
+    quarantine.write()
+    n_records = max([next_record, *(r + 1 for r in quarantine.invalid)])
+    return {
+        "scanned": n_records - len(quarantine.long),
+        "kept": kept,
+        "quarantined": len(quarantine.rows),
+        "padded": len(quarantine.short),
+    }
+
 
-apps_dcc = apps[
-    apps["Planning Authority"].astype(str).str.strip() == "Dublin City Council"
-].copy()
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Filter the national planning CSV to Dublin City Council")
+    parser.add_argument("--input", type=Path, default=INPUT_PATH)
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH, help="filtered CSV")
+    parser.add_argument("--parquet", type=Path, default=OUTPUT_PARQUET, help="filtered, typed Parquet")
+    parser.add_argument("--quarantine", type=Path, default=QUARANTINE_PATH, help="malformed lines")
+    parser.add_argument("--block-mb", type=int, default=BLOCK_BYTES >> 20, help="read block size")
+    args = parser.parse_args()
 
-print("Dublin City Council rows:", len(apps_dcc))
+    stats = filter_applications(args.input, args.output, args.parquet, args.quarantine, args.block_mb << 20)
 
-# -------------------------
-# SAVE CLEAN FILE
-# -------------------------
+    print("Total rows read:", stats["scanned"])
+    print(f"{AUTHORITY} rows:", stats["kept"])
+    if stats["padded"]:
+        print(f"Padded {stats['padded']} short lines with nulls")
+    if stats["quarantined"]:
+        print(f"Quarantined {stats['quarantined']} overlong lines → {args.quarantine}")
+    print("\nFiltered files saved to:")
+    print(args.output)
+    print(args.parquet)
 
-apps_dcc.to_csv(OUTPUT_PATH, index=False)
 
-print("\nFiltered file saved to:")
-print(OUTPUT_PATH)
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ import requests
 import os
 import time
 from datetime import datetime
+from pathlib import Path
+
+from geocode_store import FAILED, NO_RESULT, OK, GeocodeStore
 
 # =====================================================
 # CONFIG
@@ -16,6 +19,9 @@ OBS_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/1. scripts/o
 EXISTING_GEO_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data/DCC_all_applications_geocoded.csv"
 OUTPUT_PATH = EXISTING_GEO_PATH
 
+# results are committed here; the CSV above is written once at the end
+STORE_DB = Path(__file__).resolve().parent / "outputs" / "geocodes.sqlite"
+
 REQUESTS_PER_MIN = 1400
 DELAY = 60 / REQUESTS_PER_MIN   # ~0.043 sec
 
@@ -54,21 +60,16 @@ df_all["full_address"] = (
 # LOAD EXISTING (IF ANY)
 # =====================================================
 
-if os.path.exists(EXISTING_GEO_PATH):
-    existing = pd.read_csv(EXISTING_GEO_PATH)
-    existing["application_number"] = existing["application_number"].astype(str)
-    print("Resuming from existing file.")
-else:
-    existing = pd.DataFrame(columns=["application_number", "latitude", "longitude"])
-    print("No existing file found. Starting fresh.")
+store = GeocodeStore(STORE_DB)
 
-already_done = set(existing["application_number"])
+if sum(store.counts().values()) == 0 and os.path.exists(EXISTING_GEO_PATH):
+    existing = pd.read_csv(EXISTING_GEO_PATH, dtype={"application_number": str})
+    print("Imported from existing file:", store.import_existing(existing))
 
-print("Already geocoded:", len(already_done))
+store.seed(zip(df_all["application_number"], df_all["full_address"]))
+print("Resuming from store:", store.counts())
 
-df_to_geocode = df_all[
-    ~df_all["application_number"].isin(already_done)
-].copy()
+df_to_geocode = pd.DataFrame(store.todo(), columns=["application_number", "full_address"])
 
 print("Remaining to geocode:", len(df_to_geocode))
 
@@ -83,20 +84,27 @@ def geocode_address(address):
         "key": API_KEY
     }
 
-    response = requests.get(url, params=params)
-    data = response.json()
+    try:
+        response = requests.get(url, params=params)
+        data = response.json()
+    except Exception as e:
+        return {"status": FAILED, "error": f"{type(e).__name__}: {e}"}
 
     if data["status"] == "OK":
         loc = data["results"][0]["geometry"]["location"]
-        return loc["lat"], loc["lng"]
+        return {"status": OK, "latitude": loc["lat"], "longitude": loc["lng"]}
 
     elif data["status"] == "OVER_QUERY_LIMIT":
         print("Rate limit hit — sleeping 10 seconds...")
         time.sleep(10)
         return geocode_address(address)
 
+    elif data["status"] == "ZERO_RESULTS":
+        return {"status": NO_RESULT}
+
     else:
-        return None, None
+        # REQUEST_DENIED, UNKNOWN_ERROR, ...: left failed so the next run retries
+        return {"status": FAILED, "error": data["status"]}
 
 # =====================================================
 # GEOCODING LOOP (RESUMABLE + PACED)
@@ -104,22 +112,18 @@ def geocode_address(address):
 
 start_time = time.time()
 new_rows = []
+processed = 0
 
 for idx, row in df_to_geocode.iterrows():
 
-    lat, lon = geocode_address(row["full_address"])
-
-    new_rows.append({
-        "application_number": row["application_number"],
-        "latitude": lat,
-        "longitude": lon
-    })
+    result = geocode_address(row["full_address"])
+    new_rows.append({"application_number": row["application_number"], **result})
 
     # pacing
     time.sleep(DELAY)
 
     # progress reporting
-    processed = len(new_rows)
+    processed += 1
     remaining = len(df_to_geocode) - processed
 
     if processed % 100 == 0:
@@ -133,22 +137,21 @@ for idx, row in df_to_geocode.iterrows():
             f"ETA: {int(eta/60)} min"
         )
 
-    # periodic save
+    # periodic save: commit just this batch
     if processed % SAVE_INTERVAL == 0:
-        temp_df = pd.DataFrame(new_rows)
-        combined = pd.concat([existing, temp_df], ignore_index=True)
-        combined.to_csv(OUTPUT_PATH, index=False)
+        store.record(new_rows)
+        new_rows = []
         print("Progress saved.")
 
 # =====================================================
 # FINAL SAVE
 # =====================================================
 
-temp_df = pd.DataFrame(new_rows)
-combined = pd.concat([existing, temp_df], ignore_index=True)
-combined = combined.drop_duplicates(subset="application_number")
+store.record(new_rows)
 
+combined = store.results_frame()
 combined.to_csv(OUTPUT_PATH, index=False)
+store.close()
 
 total_time = (time.time() - start_time) / 60
 
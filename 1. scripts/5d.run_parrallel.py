@@ -3,7 +3,10 @@ import requests
 import os
 import time
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import zlib
+from pathlib import Path
+
+from geocode_store import FAILED, NO_RESULT, OK, GeocodeStore
 
 API_KEY = os.environ.get("GOOGLE_GEOCODING_API_KEY")
 
@@ -11,46 +14,57 @@ APPS_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data/Iri
 OBS_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/1. scripts/outputs/third_party_obs_merged.csv"
 EXISTING_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data/DCC_all_applications_geocoded.csv"
 
-OUTPUT_TEMPLATE = "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data/temp_worker_{worker}.csv"
+# all workers commit to one SQLite store (WAL mode, so concurrent writers just queue)
+STORE_DB = Path(__file__).resolve().parent / "outputs" / "geocodes.sqlite"
+SAVE_INTERVAL = 200
 
-# Worker arguments
-WORKER_ID = int(sys.argv[1])
-N_WORKERS = int(sys.argv[2])
+# Worker arguments: "<worker_id> <n_workers>", or "seed" once before the workers start
+SEED_ONLY = sys.argv[1] == "seed"
+WORKER_ID = 0 if SEED_ONLY else int(sys.argv[1])
+N_WORKERS = 1 if SEED_ONLY else int(sys.argv[2])
 
 # Safe per-worker rate
 REQUESTS_PER_SECOND = 2
 DELAY = 1 / REQUESTS_PER_SECOND
 
+store = GeocodeStore(STORE_DB)
+
 # =====================================================
-# LOAD DATA
+# SEED (once, from run.sh, before any worker starts)
 # =====================================================
 
-apps = pd.read_csv(APPS_PATH)
-obs = pd.read_csv(OBS_PATH)
+if SEED_ONLY:
+    apps = pd.read_csv(APPS_PATH)
+    obs = pd.read_csv(OBS_PATH)
+
+    apps["Application Number"] = apps["Application Number"].astype(str).str.strip()
+    obs["application_number"] = obs["application_number"].astype(str).str.strip()
 
-apps["Application Number"] = apps["Application Number"].astype(str).str.strip()
-obs["application_number"] = obs["application_number"].astype(str).str.strip()
+    df = obs.merge(
+        apps,
+        left_on="application_number",
+        right_on="Application Number",
+        how="inner"
+    )
 
-df = obs.merge(
-    apps,
-    left_on="application_number",
-    right_on="Application Number",
-    how="inner"
-)
+    df["full_address"] = df["Development Address"].astype(str) + ", Dublin, Ireland"
 
-df["full_address"] = df["Development Address"].astype(str) + ", Dublin, Ireland"
+    if sum(store.counts().values()) == 0 and os.path.exists(EXISTING_PATH):
+        store.import_existing(pd.read_csv(EXISTING_PATH, dtype={"application_number": str}))
 
-# Remove already completed
-if os.path.exists(EXISTING_PATH):
-    existing = pd.read_csv(EXISTING_PATH)
-    done = set(existing["application_number"].astype(str))
-else:
-    done = set()
+    store.seed(zip(df["application_number"], df["full_address"]))
+    print("Seeded store:", store.counts())
+    store.close()
+    sys.exit(0)
 
-df = df[~df["application_number"].isin(done)]
+# =====================================================
+# THIS WORKER'S SHARE
+# =====================================================
 
-# Split work by modulo
-df = df.iloc[WORKER_ID::N_WORKERS].copy()
+# Assignment depends only on the application number, not on what the other
+# workers have already committed, so nothing is skipped or done twice.
+df = pd.DataFrame(store.todo(), columns=["application_number", "full_address"])
+df = df[[zlib.crc32(app_no.encode()) % N_WORKERS == WORKER_ID for app_no in df["application_number"]]]
 
 print(f"Worker {WORKER_ID} processing {len(df)} rows.")
 
@@ -58,40 +72,39 @@ def geocode(address):
     url = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {"address": address, "key": API_KEY}
 
-    response = requests.get(url, params=params)
-    data = response.json()
+    try:
+        response = requests.get(url, params=params)
+        data = response.json()
+    except Exception as e:
+        return {"status": FAILED, "error": f"{type(e).__name__}: {e}"}
 
     if data["status"] == "OK":
         loc = data["results"][0]["geometry"]["location"]
-        return loc["lat"], loc["lng"]
+        return {"status": OK, "latitude": loc["lat"], "longitude": loc["lng"]}
+    elif data["status"] == "ZERO_RESULTS":
+        return {"status": NO_RESULT}
     else:
-        return None, None
+        # OVER_QUERY_LIMIT, REQUEST_DENIED, ...: left failed so the next run retries
+        return {"status": FAILED, "error": data["status"]}
 
 results = []
+saved = 0
 
 for i, row in df.iterrows():
 
-    lat, lon = geocode(row["full_address"])
-
-    results.append({
-        "application_number": row["application_number"],
-        "latitude": lat,
-        "longitude": lon
-    })
+    result = geocode(row["full_address"])
+    results.append({"application_number": row["application_number"], **result})
+    saved += 1
 
     time.sleep(DELAY)
 
-    if len(results) % 200 == 0:
-        pd.DataFrame(results).to_csv(
-            OUTPUT_TEMPLATE.format(worker=WORKER_ID),
-            index=False
-        )
-        print(f"Worker {WORKER_ID}: saved {len(results)}")
+    if saved % SAVE_INTERVAL == 0:
+        store.record(results)
+        results = []
+        print(f"Worker {WORKER_ID}: saved {saved}")
 
 # Final save
-pd.DataFrame(results).to_csv(
-    OUTPUT_TEMPLATE.format(worker=WORKER_ID),
-    index=False
-)
+store.record(results)
+store.close()
 
 print(f"Worker {WORKER_ID} finished.")
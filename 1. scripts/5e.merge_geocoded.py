@@ -1,6 +1,20 @@
-import pandas as pd
+"""
+Fold legacy per-worker geocode CSVs into the geocode store, compact it and
+export DCC_all_applications_geocoded.csv for the scripts that still read it.
+
+5c/5d now commit straight into outputs/geocodes.sqlite, so this only has
+temp_worker files to import when older runs left some behind. Runs without
+prompting: pass --delete-temp to remove the imported files.
+"""
+
+import argparse
 import glob
 import os
+from pathlib import Path
+
+import pandas as pd
+
+from geocode_store import GeocodeStore
 
 # =====================================================
 # PATHS
@@ -11,78 +25,69 @@ BASE_DIR = "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data"
 EXISTING_PATH = f"{BASE_DIR}/DCC_all_applications_geocoded.csv"
 TEMP_PATTERN = f"{BASE_DIR}/temp_worker_*.csv"
 FINAL_OUTPUT = EXISTING_PATH
+STORE_DB = Path(__file__).resolve().parent / "outputs" / "geocodes.sqlite"
+
+parser = argparse.ArgumentParser(description="Merge geocode results into the store and export the CSV")
+parser.add_argument("--store", type=Path, default=STORE_DB)
+parser.add_argument("--temp-pattern", default=TEMP_PATTERN)
+parser.add_argument("--output", default=FINAL_OUTPUT)
+parser.add_argument("--delete-temp", action="store_true", help="remove temp_worker files once imported")
+args = parser.parse_args()
+
+store = GeocodeStore(args.store)
 
 # =====================================================
 # LOAD EXISTING
 # =====================================================
 
-if os.path.exists(EXISTING_PATH):
-    existing = pd.read_csv(EXISTING_PATH)
-    print("Loaded existing:", len(existing))
-else:
-    existing = pd.DataFrame(columns=["application_number", "latitude", "longitude"])
-    print("No existing file found.")
-
-existing["application_number"] = existing["application_number"].astype(str)
+if sum(store.counts().values()) == 0 and os.path.exists(EXISTING_PATH):
+    existing = pd.read_csv(EXISTING_PATH, dtype={"application_number": str})
+    print("Imported existing:", store.import_existing(existing))
 
 # =====================================================
 # LOAD WORKER FILES
 # =====================================================
 
-worker_files = glob.glob(TEMP_PATTERN)
+worker_files = sorted(glob.glob(args.temp_pattern))
 
 print("Worker files found:", len(worker_files))
 
-worker_dfs = []
+imported = []
 
 for f in worker_files:
     try:
-        df = pd.read_csv(f)
-        print(f"Loaded {f} ({len(df)} rows)")
-        worker_dfs.append(df)
+        df = pd.read_csv(f, dtype={"application_number": str}).dropna(subset=["application_number"])
     except Exception as e:
         print(f"Error reading {f}: {e}")
+        continue
+    # worker data overrides old results
+    store.import_existing(df, replace=True)
+    print(f"Imported {f} ({len(df)} rows)")
+    imported.append(f)
 
-if worker_dfs:
-    workers_combined = pd.concat(worker_dfs, ignore_index=True)
-else:
-    workers_combined = pd.DataFrame(columns=["application_number", "latitude", "longitude"])
-
-workers_combined["application_number"] = workers_combined["application_number"].astype(str)
-
-print("Total worker rows:", len(workers_combined))
+print("Store:", store.counts())
 
 # =====================================================
-# COMBINE EXISTING + WORKERS
+# COMPACT + EXPORT
 # =====================================================
 
-combined = pd.concat([existing, workers_combined], ignore_index=True)
+sizes = store.compact()
+print(f"Compacted store: {sizes['before'] / 1e6:.1f} MB → {sizes['after'] / 1e6:.1f} MB")
 
-# Remove completely empty lat/lon rows
-combined = combined.dropna(subset=["application_number"])
-
-# Keep the last occurrence (so new worker data overrides old)
-combined = combined.drop_duplicates(subset="application_number", keep="last")
+combined = store.results_frame()
+combined.to_csv(args.output, index=False)
+store.close()
 
 print("Total unique applications:", len(combined))
-
-# =====================================================
-# SAVE FINAL
-# =====================================================
-
-combined.to_csv(FINAL_OUTPUT, index=False)
-
 print("\nFinal merged file saved to:")
-print(FINAL_OUTPUT)
+print(args.output)
 
 # =====================================================
 # OPTIONAL: CLEAN UP TEMP FILES
 # =====================================================
 
-delete_temp = input("\nDelete temp_worker files? (y/n): ")
-
-if delete_temp.lower() == "y":
-    for f in worker_files:
+if args.delete_temp:
+    for f in imported:
         os.remove(f)
     print("Temp files deleted.")
 else:
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+geocode_async.py
+
+One async geocoder replacing 5c (serial, sleep-paced) and 5d (N screen
+processes, each with its own 2 req/s budget):
+
+- N requests in flight over one pooled httpx.AsyncClient
+- a single TokenBucket shared by all of them, so the rate is global
+- OVER_QUERY_LIMIT, 429/5xx and network errors are retried in a loop with
+  exponential backoff and jitter, never by recursion; what still fails is
+  left in the store for the next run
+- results are committed to a SQLite store (geocode_store.py) in small
+  batches, so a run can be stopped and resumed at any point
+- addresses are normalized first (normalize_address) and looked up in the
+  store's address cache; each distinct address is sent once, and the
+  answer is shared by every application at that address. Cache hits and
+  in-run duplicates are reported
+- with --offline-fallback, whatever the provider could not place is
+  matched against a local gazetteer (gazetteer.py) built from earlier
+  results and any --gazetteer-csv datasets, and stored as `approximate`;
+  --offline-only skips the provider altogether
+
+The provider URL comes from GEOCODE_BASE_URL (or --base-url), so the run can
+be pointed at mock_geocoder.py to benchmark offline; GEOCODE_LOG moves the
+log file. The result is written
+back to DCC_all_applications_geocoded.csv in the layout 5c produced.
+
+Usage:
+    python 5f.geocode_async.py --concurrency 16 --rate 20
+    GEOCODE_BASE_URL=http://127.0.0.1:8766/geocode/json python 5f.geocode_async.py
+    python 5f.geocode_async.py --offline-only --gazetteer-csv addresses.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from gazetteer import Gazetteer
+from geocode_store import FAILED, MAX_ATTEMPTS, NO_RESULT, OK, GeocodeStore, normalize_address
+from rate_limit import TokenBucket
+from scrape_metrics import BufferedLog
+from scrape_store import backoff_delay
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DATA_DIR = SCRIPTS_DIR.parent / "0. data"
+
+API_KEY = os.environ.get("GOOGLE_GEOCODING_API_KEY")
+BASE_URL = os.environ.get("GEOCODE_BASE_URL", "https://maps.googleapis.com/maps/api/geocode/json")
+
+APPS_PATH = DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.csv"
+# the same rows typed by 4a.filter_dublin.py; used when present
+APPS_PARQUET = DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.parquet"
+OBS_PATH = SCRIPTS_DIR / "outputs" / "third_party_obs_merged.parquet"
+OUTPUT_PATH = DATA_DIR / "DCC_all_applications_geocoded.csv"
+STORE_DB = SCRIPTS_DIR / "outputs" / "geocodes.sqlite"
+OUT_LOG = Path(os.environ.get("GEOCODE_LOG", SCRIPTS_DIR / "logs" / "geocode_async.log"))
+
+CONCURRENCY = 16
+REQUESTS_PER_S = 20.0
+BURST = 5
+TRIES = 4  # per address per run
+RETRY_BASE_S = 2
+RETRY_CAP_S = 60
+HTTP_TIMEOUT_S = 20
+COMMIT_EVERY = 100
+PROGRESS_EVERY = 500
+
+# provider statuses worth another try; anything else unexpected is a failure
+RETRY_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
+log = BufferedLog(OUT_LOG)
+
+# ---------------- INPUT ----------------
+
+
+def load_addresses(apps_path: Path, obs_path: Path | None) -> pd.DataFrame:
+    """application_number + full_address, limited to applications in the observation results (as 5c)."""
+    if apps_path.suffix == ".parquet":
+        apps = pd.read_parquet(apps_path, columns=["Application Number", "Development Address"])
+        apps = apps.astype(object).where(apps.notna(), np.nan)  # missing as NaN, as in the CSV read
+    else:
+        apps = pd.read_csv(apps_path, usecols=["Application Number", "Development Address"], dtype=str)
+    apps["application_number"] = apps["Application Number"].str.strip()
+    if obs_path is not None:
+        if obs_path.suffix == ".parquet":
+            obs = pd.read_parquet(obs_path, columns=["application_number"])
+        else:
+            obs = pd.read_csv(obs_path, usecols=["application_number"], dtype=str)
+        apps = apps[apps["application_number"].isin(obs["application_number"].astype(str).str.strip())]
+    apps["full_address"] = apps["Development Address"].astype(str) + ", Dublin, Ireland"
+    return apps.drop_duplicates("application_number")[["application_number", "full_address"]]
+
+
+# ---------------- GEOCODING ----------------
+
+
+async def geocode_one(client: httpx.AsyncClient, bucket: TokenBucket, address: str,
+                      args: argparse.Namespace, stats: dict) -> dict:
+    error = ""
+    for attempt in range(1, args.tries + 1):
+        await bucket.acquire()
+        stats["requests"] += 1
+        try:
+            response = await client.get(args.base_url, params={"address": address, "key": API_KEY})
+            if response.status_code == 429 or response.status_code >= 500:
+                raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            error = repr(e)
+        else:
+            status = data.get("status")
+            if status == "OK":
+                result = data["results"][0]["geometry"]
+                return {
+                    "status": OK,
+                    "latitude": result["location"]["lat"],
+                    "longitude": result["location"]["lng"],
+                    "location_type": result.get("location_type"),
+                }
+            if status == "ZERO_RESULTS":
+                return {"status": NO_RESULT}
+            error = f"{status}: {data.get('error_message', '')}".strip(": ")
+            if status not in RETRY_STATUSES:
+                break
+
+        stats["retries"] += 1
+        if attempt < args.tries:
+            await asyncio.sleep(backoff_delay(attempt, RETRY_BASE_S, RETRY_CAP_S))
+
+    return {"status": FAILED, "error": error}
+
+
+def flush(store: GeocodeStore, pending: dict) -> None:
+    results, cache = pending["results"][:], dict(pending["cache"])
+    pending["results"].clear()
+    pending["cache"].clear()
+    store.record(results, cache)
+
+
+async def worker(queue: asyncio.Queue, client: httpx.AsyncClient, bucket: TokenBucket, store: GeocodeStore,
+                 pending: dict, args: argparse.Namespace, stats: dict) -> None:
+    while True:
+        try:
+            key, address, apps = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        result = await geocode_one(client, bucket, address, args, stats)
+        stats[result["status"]] += len(apps)
+        stats["done"] += 1
+        pending["results"].extend({**result, "application_number": app_no} for app_no in apps)
+        pending["cache"][key] = result
+        if result["status"] == FAILED:
+            log(f"{', '.join(apps)} failed: {result['error']}")
+
+        # all workers share one event loop thread, so this is not racy
+        if len(pending["results"]) >= COMMIT_EVERY:
+            flush(store, pending)
+
+        if stats["done"] % PROGRESS_EVERY == 0:
+            elapsed = time.monotonic() - stats["started"]
+            rate = stats["done"] / elapsed
+            remaining = stats["total"] - stats["done"]
+            log(
+                f"Processed: {stats['done']} addresses | Remaining: {remaining} | {rate:.1f}/s | "
+                f"ETA: {int(remaining / rate / 60) if rate else 0} min | "
+                f"ok {stats[OK]} no_result {stats[NO_RESULT]} failed {stats[FAILED]} retries {stats['retries']}"
+            )
+
+
+# ---------------- MAIN ----------------
+
+
+def write_output(store: GeocodeStore, output: Path) -> None:
+    """Rows from the store replace the same applications in the existing output; other rows are kept."""
+    fresh = store.results_frame()
+    if output.exists():
+        existing = pd.read_csv(output, low_memory=False)
+        existing["application_number"] = existing["application_number"].astype(str)
+        fresh = pd.concat([existing[~existing["application_number"].isin(fresh["application_number"])], fresh],
+                          ignore_index=True)
+    fresh.to_csv(output, index=False)
+    log(f"Wrote {len(fresh)} rows → {output}")
+
+
+async def geocode_online(store: GeocodeStore, args: argparse.Namespace) -> None:
+    warmed = store.warm_cache()
+    if warmed:
+        log(f"Cached {warmed} addresses from earlier results")
+
+    # one request per distinct normalized address; the cache answers the rest
+    todo = store.todo(max_attempts=args.max_attempts)
+    groups: dict = {}
+    for app_no, address in todo:
+        groups.setdefault(normalize_address(address), (address, []))[1].append(app_no)
+    cached = store.cache_lookup(groups)
+    hits = {key: len(groups[key][1]) for key in cached}
+    store.record([{**cached[key], "application_number": app_no} for key in cached for app_no in groups[key][1]])
+    store.count_hits(hits)
+
+    work = [(key, address, apps) for key, (address, apps) in groups.items() if key not in cached]
+    if args.limit:
+        work = work[: args.limit]
+    n_hits = sum(hits.values())
+    n_shared = sum(len(apps) - 1 for _, _, apps in work)
+    log(
+        f"{len(todo)} applications to geocode: {n_hits} answered from the cache, {n_shared} share an address "
+        f"with another in this run, {len(work)} distinct addresses to send "
+        f"(cache hit rate {(n_hits + n_shared) / len(todo) if todo else 0:.1%})"
+    )
+    log(f"Starting: {len(work)} addresses, {args.concurrency} in flight, {args.rate} req/s → {args.base_url}")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in work:
+        queue.put_nowait(item)
+
+    bucket = TokenBucket(args.rate, burst=args.burst)
+    stats = {
+        OK: 0, NO_RESULT: 0, FAILED: 0, "requests": 0, "retries": 0, "done": 0, "total": len(work),
+        "started": time.monotonic(),
+    }
+    pending: dict = {"results": [], "cache": {}}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=HTTP_TIMEOUT_S) as client:
+        try:
+            await asyncio.gather(
+                *(worker(queue, client, bucket, store, pending, args, stats) for _ in range(args.concurrency))
+            )
+        finally:
+            flush(store, pending)
+
+    elapsed = time.monotonic() - stats["started"]
+    log(
+        f"Finished {stats['done']} addresses in {elapsed / 60:.1f} min with {stats['requests']} requests: "
+        f"applications ok {stats[OK]}, no_result {stats[NO_RESULT]}, failed {stats[FAILED]}, "
+        f"retries {stats['retries']} (store: {store.counts()}, cache: {store.cache_stats()})"
+    )
+
+
+def geocode_offline(store: GeocodeStore, args: argparse.Namespace) -> None:
+    rows = store.unresolved(max_attempts=args.max_attempts, include_retryable=args.offline_only)
+    if not rows:
+        return
+    started = time.monotonic()
+    gazetteer = Gazetteer.from_sources(store, args.gazetteer_csv)
+    results = gazetteer.match_many(rows)
+    store.record(results)
+    by_type: dict = {}
+    for r in results:
+        by_type[r["location_type"]] = by_type.get(r["location_type"], 0) + 1
+    log(
+        f"Offline tier: {len(gazetteer)} gazetteer addresses, {len(gazetteer.streets)} streets; "
+        f"placed {len(results)} of {len(rows)} unresolved in {time.monotonic() - started:.1f}s {by_type}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    store = GeocodeStore(args.store)
+    if sum(store.counts().values()) == 0 and args.output.exists():
+        existing = pd.read_csv(args.output, usecols=["application_number", "latitude", "longitude"], dtype={"application_number": str})
+        log(f"Imported {store.import_existing(existing)} already geocoded rows from {args.output}")
+
+    addresses = load_addresses(args.input, None if args.all else args.obs)
+    added = store.seed(zip(addresses["application_number"], addresses["full_address"]))
+    log(f"Seeded {added} new or changed addresses (store: {store.counts()})")
+
+    if not args.offline_only:
+        await geocode_online(store, args)
+    if args.offline_fallback or args.offline_only:
+        geocode_offline(store, args)
+
+    log(f"Store: {store.counts()}")
+    write_output(store, args.output)
+    store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Async geocoder with a global rate limit and a resumable store")
+    parser.add_argument("--input", type=Path, default=APPS_PARQUET if APPS_PARQUET.exists() else APPS_PATH,
+                        help="4a's Parquet, or the applications CSV")
+    parser.add_argument("--obs", type=Path, default=OBS_PATH, help="observation results limiting which applications to geocode")
+    parser.add_argument("--all", action="store_true", help="geocode every application in --input")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    parser.add_argument("--store", type=Path, default=STORE_DB)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_S, help="global requests per second")
+    parser.add_argument("--burst", type=int, default=BURST)
+    parser.add_argument("--tries", type=int, default=TRIES, help="attempts per address within this run")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="runs after which a failed address is given up")
+    parser.add_argument("--limit", type=int, help="only send this many distinct addresses")
+    parser.add_argument("--offline-fallback", action="store_true", help="place unresolved addresses with the local gazetteer")
+    parser.add_argument("--offline-only", action="store_true", help="no provider requests; gazetteer only")
+    parser.add_argument("--gazetteer-csv", type=Path, nargs="*", default=[],
+                        help="extra local address datasets (address, latitude, longitude)")
+    args = parser.parse_args()
+
+    OUT_LOG.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        asyncio.run(run(args))
+    finally:
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
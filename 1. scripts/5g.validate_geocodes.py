@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+validate_geocodes.py
+
+Check every placed geocode in the store (geocode_store.py) against the
+Dublin City boundary and record a quality flag per application:
+
+    trusted           inside the boundary, precise enough
+    outside_bbox      outside the boundary's bounding box
+    outside_boundary  inside the box but more than BOUNDARY_TOLERANCE from any small area
+    low_precision     provider APPROXIMATE answers and street-level gazetteer matches
+    stacked           one coordinate shared by STACK_LIMIT or more distinct addresses
+                      (the provider falling back to a district or city centroid)
+
+The checks are vectorized. The bbox test is four array comparisons, and
+only the points inside the box are tested against the prepared boundary
+polygon (shapely.contains_xy). The tolerance covers the slivers between
+small-area polygons (roads, the river). The backend snaps points there to the
+nearest small area.
+
+Flagged provider results with attempts left go back to pending, and their
+cached answer is dropped, so the next 5f run asks again. Everything else
+keeps its flag. The backend only ingests trusted (or not yet checked)
+points.
+
+Usage:
+    python 5g.validate_geocodes.py
+    python 5g.validate_geocodes.py --no-requeue --stack-limit 50
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from geocode_store import MAX_ATTEMPTS, OK, GeocodeStore, normalize_address
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+STORE_DB = SCRIPTS_DIR / "outputs" / "geocodes.sqlite"
+FLAGGED_PATH = SCRIPTS_DIR / "outputs" / "geocode_flags.csv"
+BOUNDARY_PATHS = (
+    SCRIPTS_DIR.parent / "data" / "dublin_small_areas.geojson",
+    SCRIPTS_DIR.parent / "0. data" / "dublin_small_areas.geojson",
+)
+
+TRUSTED = "trusted"
+LOW_PRECISION = {"APPROXIMATE", "GAZETTEER_STREET"}
+STACK_LIMIT = 20
+STACK_DECIMALS = 5  # about a metre
+BOUNDARY_TOLERANCE = 0.0005  # degrees, roughly 35-55 m
+
+
+# ---------------- CHECKS ----------------
+
+
+def load_boundary(path: Path):
+    """Union of the small areas, prepared for repeated point-in-polygon tests."""
+    areas = gpd.read_file(path)
+    if areas.crs is not None:
+        areas = areas.to_crs("EPSG:4326")
+    boundary = shapely.union_all(shapely.make_valid(areas.geometry.values))
+    shapely.prepare(boundary)
+    return boundary
+
+
+def validate(df: pd.DataFrame, boundary, stack_limit: int = STACK_LIMIT) -> pd.Series:
+    """Quality flag per row of a placed_frame(), first failing check wins."""
+    lat = df["latitude"].to_numpy(dtype=float)
+    lon = df["longitude"].to_numpy(dtype=float)
+
+    min_lon, min_lat, max_lon, max_lat = boundary.bounds
+    tol = BOUNDARY_TOLERANCE
+    in_box = (lon >= min_lon - tol) & (lon <= max_lon + tol) & (lat >= min_lat - tol) & (lat <= max_lat + tol)
+    in_area = in_box.copy()
+    in_area[in_box] = shapely.contains_xy(boundary, lon[in_box], lat[in_box])
+    edge = in_box & ~in_area
+    in_area[edge] = shapely.dwithin(boundary, shapely.points(lon[edge], lat[edge]), tol)
+
+    site = df["address"].map(normalize_address, na_action="ignore").fillna(df["application_number"])
+    point = [df["latitude"].round(STACK_DECIMALS), df["longitude"].round(STACK_DECIMALS)]
+    sites_here = site.groupby(point).transform("nunique").to_numpy()
+
+    quality = np.select(
+        [~in_box, ~in_area, df["location_type"].isin(LOW_PRECISION).to_numpy(), sites_here >= stack_limit],
+        ["outside_bbox", "outside_boundary", "low_precision", "stacked"],
+        TRUSTED,
+    )
+    return pd.Series(quality, index=df.index, name="quality")
+
+
+# ---------------- MAIN ----------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Flag geocodes outside Dublin City or too imprecise to trust")
+    parser.add_argument("--store", type=Path, default=STORE_DB)
+    parser.add_argument("--boundary", type=Path, default=next((p for p in BOUNDARY_PATHS if p.exists()), BOUNDARY_PATHS[0]))
+    parser.add_argument("--flagged", type=Path, default=FLAGGED_PATH, help="CSV of the flagged rows")
+    parser.add_argument("--stack-limit", type=int, default=STACK_LIMIT)
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="only re-queue rows tried fewer times")
+    parser.add_argument("--no-requeue", action="store_true", help="flag only, do not send anything back to pending")
+    args = parser.parse_args()
+
+    store = GeocodeStore(args.store)
+    placed = store.placed_frame()
+    boundary = load_boundary(args.boundary)
+
+    placed["quality"] = validate(placed, boundary, args.stack_limit)
+    flagged = placed[placed["quality"] != TRUSTED]
+
+    requeue = []
+    if not args.no_requeue:
+        retry = (flagged["status"] == OK) & (flagged["attempts"] < args.max_attempts) & flagged["address"].notna()
+        requeue = flagged.loc[retry, "application_number"].tolist()
+    requeued = store.set_quality(dict(zip(placed["application_number"], placed["quality"])), requeue)
+
+    args.flagged.parent.mkdir(parents=True, exist_ok=True)
+    flagged.drop(columns=["attempts"]).to_csv(args.flagged, index=False)
+
+    print(f"Checked {len(placed)} placed geocodes against {args.boundary.name}")
+    for quality, n in placed["quality"].value_counts().items():
+        print(f"  {quality:<18} {n}")
+    print(f"Re-queued for geocoding: {requeued}")
+    print(f"Flagged rows → {args.flagged}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
+from pathlib import Path
+
 import pandas as pd
 
 # =====================================================
 # FILE PATHS
 # =====================================================
 
-ALL_APPS_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/0. data/DCC_all_applications_geocoded.csv"
-OBS_MERGED_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/1. scripts/outputs/third_party_obs_merged_v2.csv"
-OUTPUT_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/1. scripts/outputs/applications_master_with_obs.csv"
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+ALL_APPS_PATH = SCRIPTS_DIR.parent / "0. data" / "DCC_all_applications_geocoded.csv"
+# one row per observation document (written by 3.merge_results.py)
+OBS_DOCUMENTS_PATH = SCRIPTS_DIR / "outputs" / "third_party_obs_documents.parquet"
+OUTPUT_PATH = SCRIPTS_DIR / "outputs" / "applications_master_with_obs.csv"
 
 # =====================================================
 # LOAD DATA
@@ -15,29 +20,26 @@ OUTPUT_PATH = "/Users/mikemcrae/Documents/GitHub/Planning applications/1. script
 print("Loading all applications...")
 df_apps = pd.read_csv(ALL_APPS_PATH)
 
-print("Loading merged observation file...")
-df_obs = pd.read_csv(OBS_MERGED_PATH)
+print("Loading observation documents...")
+df_docs = pd.read_parquet(OBS_DOCUMENTS_PATH, columns=["application_number", "status"])
 
 print("Applications:", len(df_apps))
-print("Observation file rows:", len(df_obs))
+print("Observation documents:", len(df_docs))
+print(df_docs["status"].value_counts().to_string())
 
 # =====================================================
-# KEEP ONLY REQUIRED OBS COLUMNS
+# COUNT LETTERS PER APPLICATION
 # =====================================================
 
-# We only need:
-# application_number + n_observation_letters
-
-if "application_number" not in df_obs.columns:
-    raise ValueError("application_number not found in observation file.")
-
-if "n_observation_letters" not in df_obs.columns:
-    raise ValueError("n_observation_letters not found in observation file.")
+# Every listed observation counts, downloaded or not. The documents table is
+# exploded from the same URL lists the scrapers count n_observation_letters
+# from, so its slots are the letter count.
 
 df_obs_clean = (
-    df_obs[["application_number", "n_observation_letters"]]
-    .groupby("application_number", as_index=False)
-    .sum()
+    df_docs.groupby("application_number", observed=True)
+    .size()
+    .rename("n_observation_letters")
+    .reset_index()
 )
 
 print("Unique applications in observation file:", len(df_obs_clean))
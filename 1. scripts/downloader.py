@@ -0,0 +1,85 @@
+"""
+Pooled, streaming document downloads.
+
+- one requests Session with a sized connection pool, shared by all threads
+- bodies are streamed to `<name>.part` in chunks and renamed when complete
+- an existing .part file is resumed with a Range request when the server
+  supports it (206), otherwise the download starts over
+- the sha256 is computed while streaming so callers can deduplicate by content
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CHUNK_SIZE = 256 * 1024
+HTTP_TIMEOUT_S = 60
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _hash_existing(path: Path, digest) -> int:
+    size = 0
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return size
+
+
+def file_digest(path: Path) -> Tuple[int, str]:
+    """(size in bytes, sha256 hex) of a file already on disk, e.g. an inline download."""
+    digest = hashlib.sha256()
+    size = _hash_existing(Path(path), digest)
+    return size, digest.hexdigest()
+
+
+def stream_download(
+    session: requests.Session,
+    url: str,
+    out_path: Path,
+    timeout_s: float = HTTP_TIMEOUT_S,
+    chunk_size: int = CHUNK_SIZE,
+) -> Tuple[int, str]:
+    """Download `url` to `out_path`; returns (size in bytes, sha256 hex)."""
+    out_path = Path(out_path)
+    part = out_path.with_name(out_path.name + ".part")
+    digest = hashlib.sha256()
+
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout_s) as r:
+        if offset and r.status_code == 416:
+            # nothing left past the offset: the .part already holds the whole file
+            size = _hash_existing(part, digest)
+        else:
+            r.raise_for_status()
+            if offset and r.status_code == 206:
+                mode = "ab"
+                _hash_existing(part, digest)
+            else:
+                mode = "wb"
+                offset = 0
+
+            size = offset
+            with part.open(mode) as f:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+
+    part.replace(out_path)
+    return size, digest.hexdigest()
@@ -0,0 +1,194 @@
+"""
+Offline geocoding tier: a local gazetteer with fuzzy street matching.
+
+The gazetteer is built from addresses that already have coordinates: the
+rows of the geocode store's geocodes table the provider placed (status ok,
+not flagged by validation), plus any local address datasets (CSV with
+address, latitude, longitude). Every entry is
+keyed by normalize_address() and split into house number, street and
+postal district.
+
+Streets are indexed by character trigrams in memory (one array of street
+ids per trigram, so scoring every candidate is a single bincount). A lookup
+tries, in order of precision:
+
+    GAZETTEER_EXACT         the same normalized address
+    GAZETTEER_HOUSE         same house number on the best matching street
+    GAZETTEER_INTERPOLATED  between the nearest known numbers on that street
+    GAZETTEER_STREET        the median of the street's known points
+
+Street matches below `min_score` (Dice coefficient on trigrams), or in a
+different postal district, are rejected. Nothing touches the network.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from geocode_store import APPROXIMATE, GeocodeStore, normalize_address
+
+MIN_SCORE = 0.6
+
+_DISTRICT_PART = re.compile(r"d\d{1,2}w?")
+_NUMBERED = re.compile(r"(?:^|\s)(\d+)[a-z]?(?:-\d+[a-z]?)?\s+([a-z][a-z ]*)$")
+UNIT_WORDS = {"apartment", "flat", "unit", "block", "site", "house", "floor"}
+STREET_WORDS = {
+    "street", "road", "avenue", "square", "terrace", "park", "place", "court", "crescent", "drive",
+    "gardens", "grove", "lane", "quay", "way", "close", "green", "hill", "row", "parade", "mews",
+    "walk", "view", "lawn", "lawns", "rise", "heights", "villas", "cottages", "bridge", "estate",
+}
+
+
+def parse_key(key: str) -> Tuple[int | None, str | None, str | None]:
+    """(house number, street, district) from a normalize_address() key."""
+    parts = [p for p in key.split(", ") if p]
+    district = next((p for p in parts if _DISTRICT_PART.fullmatch(p)), None)
+    parts = [p for p in parts if p != district]
+
+    for part in parts:
+        m = _NUMBERED.search(part)
+        if m and m.group(2).split()[0] not in UNIT_WORDS:
+            return int(m.group(1)), m.group(2).strip(), district
+    for part in parts:
+        words = part.split()
+        if words and words[-1] in STREET_WORDS and words[0] not in UNIT_WORDS:
+            return None, part, district
+    return None, None, district
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class Street:
+    name: str
+    district: str | None
+    numbers: List[int] = field(default_factory=list)
+    points: List[Tuple[float, float]] = field(default_factory=list)  # (lat, lon), aligned with numbers
+    unnumbered: List[Tuple[float, float]] = field(default_factory=list)
+    centroid: Tuple[float, float] | None = None
+
+    def freeze(self) -> None:
+        """Turn the collected points into arrays once the gazetteer is built."""
+        self.centroid = tuple(np.median(np.asarray(self.points + self.unnumbered), axis=0))
+        self.numbers = np.asarray(self.numbers, dtype=np.int64)
+        self.points = np.asarray(self.points, dtype=np.float64).reshape(-1, 2)
+
+
+class Gazetteer:
+    def __init__(self, entries: Iterable[Tuple[str, float, float]], min_score: float = MIN_SCORE) -> None:
+        """entries: (address, latitude, longitude); the address is normalized here."""
+        self.min_score = min_score
+        self.exact: Dict[str, Tuple[float, float]] = {}
+        streets: Dict[Tuple[str, str | None], Street] = {}
+
+        for address, lat, lon in entries:
+            key = normalize_address(address)
+            if not key or key in self.exact:
+                continue
+            self.exact[key] = (lat, lon)
+            number, street, district = parse_key(key)
+            if street is None:
+                continue
+            s = streets.setdefault((street, district), Street(street, district))
+            if number is None:
+                s.unnumbered.append((lat, lon))
+            else:
+                s.numbers.append(number)
+                s.points.append((lat, lon))
+
+        self.streets: List[Street] = list(streets.values())
+        for street in self.streets:
+            street.freeze()
+        grams = [trigrams(s.name) for s in self.streets]
+        index: Dict[str, List[int]] = {}
+        for i, street_grams in enumerate(grams):
+            for g in street_grams:
+                index.setdefault(g, []).append(i)
+        self._index = {g: np.asarray(ids, dtype=np.int32) for g, ids in index.items()}
+        self._n_grams = np.asarray([len(g) for g in grams], dtype=np.float64)
+        self._districts = np.asarray([s.district or "" for s in self.streets], dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    @classmethod
+    def from_sources(cls, store: GeocodeStore | None, csv_paths: Sequence[Path] = (), min_score: float = MIN_SCORE):
+        frames = []
+        if store is not None:
+            frames.append(store.gazetteer_entries())
+        for path in csv_paths:
+            df = pd.read_csv(path, usecols=["address", "latitude", "longitude"], dtype={"address": str})
+            frames.append(df)
+        if not frames:
+            return cls([], min_score)
+        df = pd.concat(frames, ignore_index=True).dropna()
+        return cls(zip(df["address"], df["latitude"].astype(float), df["longitude"].astype(float)), min_score)
+
+    # ---------------- LOOKUP ----------------
+
+    def best_street(self, name: str, district: str | None) -> Tuple[Street, float] | None:
+        grams = trigrams(name)
+        postings = [self._index[g] for g in grams if g in self._index]
+        if not postings:
+            return None
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.streets))
+        score = 2 * shared / (len(grams) + self._n_grams)
+        if district:
+            score[(self._districts != district) & (self._districts != "")] = 0
+        i = int(score.argmax())
+        if score[i] < self.min_score:
+            return None
+        return self.streets[i], float(score[i])
+
+    def match(self, address: str) -> dict | None:
+        """Approximate location as a geocode_store result (no application_number), or None."""
+        key = normalize_address(address)
+        if key in self.exact:
+            lat, lon = self.exact[key]
+            return _result(lat, lon, "GAZETTEER_EXACT")
+
+        number, name, district = parse_key(key)
+        if name is None:
+            return None
+        found = self.best_street(name, district)
+        if found is None:
+            return None
+        street, _ = found
+
+        if number is not None and len(street.numbers):
+            numbers, points = street.numbers, street.points
+            same = numbers == number
+            if same.any():
+                lat, lon = points[same].mean(axis=0)
+                return _result(lat, lon, "GAZETTEER_HOUSE")
+            below, above = numbers < number, numbers > number
+            if below.any() and above.any():
+                lo = np.flatnonzero(below)[numbers[below].argmax()]
+                hi = np.flatnonzero(above)[numbers[above].argmin()]
+                t = (number - numbers[lo]) / (numbers[hi] - numbers[lo])
+                lat, lon = points[lo] + t * (points[hi] - points[lo])
+                return _result(lat, lon, "GAZETTEER_INTERPOLATED")
+
+        return _result(*street.centroid, "GAZETTEER_STREET")
+
+    def match_many(self, rows: Iterable[Tuple[str, str]]) -> List[dict]:
+        """geocode_store results for the (application_number, address) rows that matched."""
+        out = []
+        for app_no, address in rows:
+            result = self.match(address)
+            if result is not None:
+                out.append({**result, "application_number": app_no})
+        return out
+
+
+def _result(lat: float, lon: float, location_type: str) -> dict:
+    return {"status": APPROXIMATE, "latitude": float(lat), "longitude": float(lon), "location_type": location_type}
@@ -0,0 +1,471 @@
+"""
+SQLite-backed, resumable store for geocoding results.
+
+One row per application number with the address that was sent, the result
+and its status:
+
+    pending -> ok | no_result | failed
+    no_result | given-up failed -> approximate   (offline tier, gazetteer.py)
+
+`ok` and `no_result` (the provider answered but found nothing) are final.
+`failed` rows carry `next_attempt_at`, set with exponential backoff and
+jitter, and are picked up again by the next run until `max_attempts`.
+`approximate` rows were placed by the local gazetteer; their location_type
+says how (GAZETTEER_EXACT/HOUSE/INTERPOLATED/STREET).
+
+Results are written in small batches as they arrive, so an interrupted run
+loses at most one batch and simply resumes with what is left.
+
+This store is the system of record for coordinates: every commit is
+O(batch), nothing rewrites a whole file. compact() folds the WAL back into
+the database and reclaims space; the backend reads the geocodes table
+directly, and the CSV export is only kept for older scripts.
+
+`quality` is set by 5g.validate_geocodes.py: 'trusted', or the reason a
+point was flagged (outside_bbox, outside_boundary, low_precision, stacked).
+It is cleared whenever a new result is written, so every answer is checked
+once. Flagged provider results are put back to pending for another try.
+
+address_cache holds one answer per normalized address (normalize_address),
+so repeat and amended applications for the same site reuse it instead of
+going back to the provider. It is filled alongside geocodes and can be
+warmed from results that predate it.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from scrape_store import backoff_delay
+
+PENDING = "pending"
+OK = "ok"
+NO_RESULT = "no_result"
+FAILED = "failed"
+APPROXIMATE = "approximate"
+STATUSES = (PENDING, OK, NO_RESULT, FAILED, APPROXIMATE)
+
+MAX_ATTEMPTS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    application_number TEXT PRIMARY KEY,
+    address TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    latitude REAL,
+    longitude REAL,
+    location_type TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL,
+    last_error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS geocodes_status ON geocodes (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS address_cache (
+    address_key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    location_type TEXT,
+    hits INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+"""
+
+# ---------------- ADDRESS NORMALIZATION ----------------
+
+ABBREVIATIONS = {
+    "rd": "road",
+    "ave": "avenue",
+    "av": "avenue",
+    "sq": "square",
+    "tce": "terrace",
+    "pk": "park",
+    "pl": "place",
+    "ct": "court",
+    "cres": "crescent",
+    "dr": "drive",
+    "gdns": "gardens",
+    "grv": "grove",
+    "lwr": "lower",
+    "upr": "upper",
+    "nth": "north",
+    "sth": "south",
+    "apt": "apartment",
+}
+# parts that say nothing beyond "somewhere in Dublin"
+NOISE_PARTS = {"", "dublin", "ireland", "co dublin", "county dublin", "dublin city", "eire"}
+
+_DISTRICT = re.compile(r"\b(?:dublin|d)\s*0*(\d{1,2})\s*(w?)\b")
+_NUMBER_WORD = re.compile(r"\b(?:no|number|nos|numbers)\s+(?=\d)")
+_RANGE = re.compile(r"\b(\d+)\s*(?:-|to|/)\s*(\d+)\b")
+_UNIT = re.compile(r"\b0*(\d+)\s+([a-z])\b(?!\s*\d)")
+_PUNCT = re.compile(r"[^\w\s,-]")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Cache key for an address: lower case, punctuation and extra whitespace
+    dropped, "Dublin 6W"/"D6w"/"Dublin 06w" → "d6w", "No. 12"/"12 A"/"12 - 14"
+    → "12"/"12a"/"12-14", common street abbreviations spelled out, and the
+    ", Dublin, Ireland" parts removed.
+    """
+    text = address.lower().replace("&", " and ").replace("\u2013", "-")
+    text = re.sub(r"['\u2019]", "", text)
+    text = _RANGE.sub(lambda m: f"{int(m.group(1))}-{int(m.group(2))}", text)
+    text = _PUNCT.sub(" ", text)
+    text = _DISTRICT.sub(lambda m: f" d{m.group(1)}{m.group(2)} ", text)
+    text = _NUMBER_WORD.sub("", text)
+    text = _UNIT.sub(lambda m: f"{int(m.group(1))}{m.group(2)}", text)
+    parts = []
+    for part in text.split(","):
+        words = [ABBREVIATIONS.get(w, w) for w in part.replace("-", " - ").split()]
+        # "st" after a name is Street ("Main St", "O'Connell St Upper"); leading a name it is Saint
+        words = [
+            ("saint" if i == 0 or words[i - 1][0].isdigit() else "street") if w == "st" else w
+            for i, w in enumerate(words)
+        ]
+        part = " ".join(words).replace(" - ", "-")
+        part = re.sub(r"\b0+(\d)", r"\1", part)
+        if part not in NOISE_PARTS and part not in parts:
+            parts.append(part)
+    return ", ".join(parts)
+
+
+class GeocodeStore:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        cols = {row[1] for row in self.conn.execute("PRAGMA table_info(geocodes)")}
+        if "quality" not in cols:
+            self.conn.execute("ALTER TABLE geocodes ADD COLUMN quality TEXT")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ---------------- SEEDING ----------------
+
+    def seed(self, rows: Iterable[Tuple[str, str]]) -> int:
+        """
+        Add (application_number, address) rows. Known applications keep their
+        result unless the address changed, in which case they go back to pending.
+        Returns the number of rows that are new or re-queued.
+        """
+        rows = list(rows)
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            cur = self.conn.executemany(
+                """
+                INSERT INTO geocodes (application_number, address, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (application_number) DO UPDATE SET
+                    address = excluded.address, status = 'pending', latitude = NULL, longitude = NULL,
+                    location_type = NULL, attempts = 0, next_attempt_at = NULL, last_error = NULL,
+                    quality = NULL, updated_at = excluded.updated_at
+                WHERE geocodes.address IS NOT NULL AND geocodes.address != excluded.address
+                """,
+                ((app_no, address, now) for app_no, address in rows),
+            )
+            changed = cur.rowcount
+            # imported results have no address yet; fill it in without re-queueing
+            self.conn.executemany(
+                "UPDATE geocodes SET address = ? WHERE application_number = ? AND address IS NULL",
+                ((address, app_no) for app_no, address in rows),
+            )
+        return changed
+
+    def import_existing(self, df: pd.DataFrame, replace: bool = False) -> int:
+        """
+        Mark rows from a legacy geocoded CSV (application_number, latitude, longitude)
+        as done. replace=True lets them override results already in the store.
+        """
+        df = df.drop_duplicates("application_number", keep="last")
+        lat = pd.to_numeric(df["latitude"], errors="coerce")
+        lon = pd.to_numeric(df["longitude"], errors="coerce")
+        found = lat.notna() & lon.notna()
+        on_conflict = (
+            """UPDATE SET status = excluded.status, latitude = excluded.latitude, longitude = excluded.longitude,
+                    location_type = NULL, last_error = NULL, next_attempt_at = NULL, quality = NULL,
+                    updated_at = excluded.updated_at"""
+            if replace
+            else "NOTHING"
+        )
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            cur = self.conn.executemany(
+                f"""
+                INSERT INTO geocodes (application_number, status, latitude, longitude, attempts, updated_at)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (application_number) DO {on_conflict}
+                """,
+                (
+                    (str(app_no), OK if hit else NO_RESULT, y if hit else None, x if hit else None, now)
+                    for app_no, y, x, hit in zip(df["application_number"], lat, lon, found)
+                ),
+            )
+        return cur.rowcount
+
+    # ---------------- WORK ----------------
+
+    def todo(self, max_attempts: int = MAX_ATTEMPTS) -> List[Tuple[str, str]]:
+        """(application_number, address) still to geocode: pending, or failed and due again."""
+        return self.conn.execute(
+            """
+            SELECT application_number, address FROM geocodes
+            WHERE address IS NOT NULL
+              AND (status = ? OR (status = ? AND attempts < ? AND COALESCE(next_attempt_at, 0) <= ?))
+            ORDER BY application_number
+            """,
+            (PENDING, FAILED, max_attempts, time.time()),
+        ).fetchall()
+
+    def unresolved(self, max_attempts: int = MAX_ATTEMPTS, include_retryable: bool = False) -> List[Tuple[str, str]]:
+        """
+        (application_number, address) the provider could not place: no_result, or
+        failed and out of attempts. include_retryable adds pending and failed rows
+        that are still due a retry (for offline-only runs).
+        """
+        extra = " OR status = 'pending' OR status = 'failed'" if include_retryable else ""
+        return self.conn.execute(
+            f"""
+            SELECT application_number, address FROM geocodes
+            WHERE address IS NOT NULL
+              AND (status = ? OR (status = ? AND attempts >= ?){extra})
+            ORDER BY application_number
+            """,
+            (NO_RESULT, FAILED, max_attempts),
+        ).fetchall()
+
+    def record(self, results: List[dict], cache: Dict[str, dict] | None = None) -> None:
+        """
+        Commit a batch of results. Each is a dict with application_number,
+        status and either latitude/longitude/location_type or error. `cache`
+        maps normalized addresses to the provider answers in this batch; they
+        are stored in the same transaction (failures are never cached).
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                """
+                INSERT OR REPLACE INTO address_cache (address_key, status, latitude, longitude, location_type, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    (key, r["status"], r.get("latitude"), r.get("longitude"), r.get("location_type"), now)
+                    for key, r in (cache or {}).items()
+                    if r["status"] != FAILED
+                ),
+            )
+            for r in results:
+                if r["status"] == FAILED:
+                    row = self.conn.execute(
+                        "SELECT attempts FROM geocodes WHERE application_number = ?", (r["application_number"],)
+                    ).fetchone()
+                    if row is None:
+                        continue  # not seeded; nothing to reschedule
+                    (attempts,) = row
+                    self.conn.execute(
+                        """
+                        UPDATE geocodes SET status = ?, attempts = attempts + 1, next_attempt_at = ?,
+                            last_error = ?, updated_at = ?
+                        WHERE application_number = ?
+                        """,
+                        (FAILED, now + backoff_delay(attempts + 1), r.get("error"), now, r["application_number"]),
+                    )
+                else:
+                    self.conn.execute(
+                        """
+                        UPDATE geocodes SET status = ?, latitude = ?, longitude = ?, location_type = ?,
+                            attempts = attempts + 1, next_attempt_at = NULL, last_error = NULL, quality = NULL,
+                            updated_at = ?
+                        WHERE application_number = ?
+                        """,
+                        (
+                            r["status"],
+                            r.get("latitude"),
+                            r.get("longitude"),
+                            r.get("location_type"),
+                            now,
+                            r["application_number"],
+                        ),
+                    )
+
+    # ---------------- CACHE ----------------
+
+    def cache_lookup(self, keys: Iterable[str]) -> Dict[str, dict]:
+        """Cached answers for these normalized addresses, as record() results without application_number."""
+        keys = list(keys)
+        out = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            rows = self.conn.execute(
+                f"""
+                SELECT address_key, status, latitude, longitude, location_type FROM address_cache
+                WHERE address_key IN ({",".join("?" * len(chunk))})
+                """,
+                chunk,
+            )
+            for key, status, lat, lon, location_type in rows:
+                out[key] = {"status": status, "latitude": lat, "longitude": lon, "location_type": location_type}
+        return out
+
+    def count_hits(self, hits: Dict[str, int]) -> None:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "UPDATE address_cache SET hits = hits + ? WHERE address_key = ?", ((n, key) for key, n in hits.items())
+            )
+
+    def warm_cache(self) -> int:
+        """Cache every finished geocode whose address is known. Returns the number of new cache entries."""
+        rows = self.conn.execute(
+            """
+            SELECT address, status, latitude, longitude, location_type FROM geocodes
+            WHERE status IN (?, ?) AND address IS NOT NULL
+            ORDER BY updated_at
+            """,
+            (OK, NO_RESULT),
+        ).fetchall()
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            (before,) = self.conn.execute("SELECT COUNT(*) FROM address_cache").fetchone()
+            self.conn.executemany(
+                """
+                INSERT INTO address_cache (address_key, status, latitude, longitude, location_type, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (address_key) DO NOTHING
+                """,
+                ((normalize_address(address), *rest, now) for address, *rest in rows),
+            )
+            (after,) = self.conn.execute("SELECT COUNT(*) FROM address_cache").fetchone()
+        return after - before
+
+    def gazetteer_entries(self) -> pd.DataFrame:
+        """
+        Provider-placed addresses (address, latitude, longitude) to build the
+        offline gazetteer from. Points 5g.validate_geocodes.py flagged are left
+        out, so a bad coordinate is not spread to neighbouring addresses.
+        """
+        return pd.read_sql_query(
+            """
+            SELECT address, latitude, longitude FROM geocodes
+            WHERE status = 'ok' AND (quality IS NULL OR quality = 'trusted')
+              AND address IS NOT NULL AND latitude IS NOT NULL AND longitude IS NOT NULL
+            """,
+            self.conn,
+        )
+
+    def cache_stats(self) -> Dict[str, int]:
+        entries, hits = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM address_cache").fetchone()
+        return {"entries": entries, "hits": hits}
+
+    # ---------------- VALIDATION ----------------
+
+    def placed_frame(self) -> pd.DataFrame:
+        """Every row with coordinates (ok or approximate), for validation."""
+        return pd.read_sql_query(
+            """
+            SELECT application_number, address, status, latitude, longitude, location_type, attempts, quality
+            FROM geocodes
+            WHERE status IN ('ok', 'approximate') AND latitude IS NOT NULL AND longitude IS NOT NULL
+            """,
+            self.conn,
+        )
+
+    def set_quality(self, quality: Dict[str, str], requeue: Iterable[str] = ()) -> int:
+        """
+        Store the validation outcome per application number. Applications in
+        `requeue` go back to pending and their cached answer is dropped, so the
+        next run asks the provider again instead of reusing it. Returns the
+        number re-queued.
+        """
+        requeue = list(requeue)
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "UPDATE geocodes SET quality = ? WHERE application_number = ? AND quality IS NOT ?",
+                ((q, app_no, q) for app_no, q in quality.items()),
+            )
+            addresses = []
+            for i in range(0, len(requeue), 500):
+                chunk = requeue[i : i + 500]
+                addresses += self.conn.execute(
+                    f"""
+                    SELECT address FROM geocodes
+                    WHERE address IS NOT NULL AND application_number IN ({",".join("?" * len(chunk))})
+                    """,
+                    chunk,
+                ).fetchall()
+            self.conn.executemany(
+                "DELETE FROM address_cache WHERE address_key = ?", ((normalize_address(a),) for (a,) in addresses)
+            )
+            cur = self.conn.executemany(
+                """
+                UPDATE geocodes SET status = 'pending', next_attempt_at = NULL,
+                    last_error = 'flagged: ' || quality, updated_at = ?
+                WHERE application_number = ? AND address IS NOT NULL
+                """,
+                ((now, app_no) for app_no in requeue),
+            )
+        return cur.rowcount
+
+    def quality_counts(self) -> Dict[str, int]:
+        return dict(
+            self.conn.execute(
+                """
+                SELECT COALESCE(quality, 'unchecked'), COUNT(*) FROM geocodes
+                WHERE status IN ('ok', 'approximate') GROUP BY 1
+                """
+            ).fetchall()
+        )
+
+    # ---------------- MAINTENANCE ----------------
+
+    def compact(self) -> Dict[str, int]:
+        """Checkpoint the WAL into the main file and VACUUM. Returns file sizes in bytes before/after."""
+        wal = self.path.with_name(self.path.name + "-wal")
+        before = self.path.stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        after = self.path.stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+        return {"before": before, "after": after}
+
+    # ---------------- REPORTING ----------------
+
+    def counts(self) -> Dict[str, int]:
+        out = {status: 0 for status in STATUSES}
+        for status, n in self.conn.execute("SELECT status, COUNT(*) FROM geocodes GROUP BY status"):
+            out[status] = n
+        return out
+
+    def results_frame(self) -> pd.DataFrame:
+        """
+        Finished rows in the application_number/latitude/longitude layout the later
+        scripts read, plus location_type so approximate points can be told apart.
+        """
+        return pd.read_sql_query(
+            """
+            SELECT application_number, latitude, longitude, location_type FROM geocodes
+            WHERE status IN ('ok', 'no_result', 'approximate')
+            ORDER BY application_number
+            """,
+            self.conn,
+        )
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+mock_geocoder.py
+
+Local stand-in for the Google Geocoding API, for testing and benchmarking
+5f.geocode_async.py offline. Stdlib only.
+
+GET /geocode/json?address=...&key=... answers in the Google layout. The
+coordinates are derived from the address, so runs are reproducible. Like
+the real service it enforces a request budget: above --qps it answers
+OVER_QUERY_LIMIT. Latency, ZERO_RESULTS and 5xx rates can be injected.
+
+Usage:
+    python mock_geocoder.py --port 8766 --latency-ms 80 --qps 50
+    GEOCODE_BASE_URL=http://127.0.0.1:8766/geocode/json python 5f.geocode_async.py ...
+
+    # benchmark 5f.geocode_async.py against the mock (extra args go to 5f)
+    python mock_geocoder.py --benchmark 2000 --latency-ms 80 --qps 50 -- --concurrency 16 --rate 45
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+GEOCODE_PATH = "/geocode/json"
+
+# roughly the Dublin City Council area
+LAT_RANGE = (53.30, 53.41)
+LON_RANGE = (-6.38, -6.11)
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    qps: float = 0  # 0 = no budget
+    zero_results_rate: float = 0.02
+    error_rate: float = 0.0
+
+
+def location_for(address: str) -> tuple:
+    digest = hashlib.sha256(address.strip().lower().encode()).digest()
+    u = int.from_bytes(digest[:4], "big") / 2**32
+    v = int.from_bytes(digest[4:8], "big") / 2**32
+    return (
+        round(LAT_RANGE[0] + u * (LAT_RANGE[1] - LAT_RANGE[0]), 7),
+        round(LON_RANGE[0] + v * (LON_RANGE[1] - LON_RANGE[0]), 7),
+    )
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    cfg = MockConfig()
+    stats: dict = {}
+    recent: deque = deque()
+    lock = threading.Lock()
+
+    def log_message(self, fmt, *args) -> None:
+        pass
+
+    def _count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _over_budget(self) -> bool:
+        if not self.cfg.qps:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and self.recent[0] < now - 1:
+                self.recent.popleft()
+            if len(self.recent) >= self.cfg.qps:
+                return True
+            self.recent.append(now)
+            return False
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/__stats":
+            with self.lock:
+                return self._send_json(200, dict(self.stats))
+        if url.path != GEOCODE_PATH:
+            self._count("404")
+            return self._send_json(404, {"status": "NOT_FOUND"})
+
+        address = urllib.parse.parse_qs(url.query).get("address", [""])[0]
+        if self.cfg.latency_ms or self.cfg.jitter_ms:
+            time.sleep(max(0.0, self.cfg.latency_ms + random.uniform(-1, 1) * self.cfg.jitter_ms) / 1000)
+
+        self._count("requests")
+        if self._over_budget():
+            self._count("OVER_QUERY_LIMIT")
+            return self._send_json(200, {"status": "OVER_QUERY_LIMIT", "results": []})
+        if not address:
+            self._count("INVALID_REQUEST")
+            return self._send_json(200, {"status": "INVALID_REQUEST", "results": []})
+        if random.random() < self.cfg.error_rate:
+            self._count("500")
+            return self._send_json(500, {"status": "UNKNOWN_ERROR"})
+
+        # ZERO_RESULTS is a property of the address, so retries do not change it
+        if int(hashlib.md5(address.encode()).hexdigest()[:8], 16) / 2**32 < self.cfg.zero_results_rate:
+            self._count("ZERO_RESULTS")
+            return self._send_json(200, {"status": "ZERO_RESULTS", "results": []})
+
+        lat, lng = location_for(address)
+        self._count("OK")
+        self._send_json(
+            200,
+            {
+                "status": "OK",
+                "results": [
+                    {
+                        "formatted_address": address,
+                        "geometry": {"location": {"lat": lat, "lng": lng}, "location_type": "ROOFTOP"},
+                    }
+                ],
+            },
+        )
+
+
+def serve(cfg: MockConfig, host: str = "127.0.0.1", port: int = 8766) -> ThreadingHTTPServer:
+    handler = type("Handler", (MockHandler,), {"cfg": cfg, "stats": {}, "recent": deque(), "lock": threading.Lock()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def benchmark(cfg: MockConfig, n_addresses: int, geocoder_args: List[str]) -> dict:
+    """Run 5f.geocode_async.py over n synthetic applications against an in-process mock."""
+    server = serve(cfg, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}{GEOCODE_PATH}"
+
+    with tempfile.TemporaryDirectory(prefix="mock_geocoder_") as tmp:
+        tmp = Path(tmp)
+        input_csv = tmp / "applications.csv"
+        # every fifth application is a repeat of the previous site, written differently
+        lines = ["Application Number,Development Address"]
+        for i in range(n_addresses):
+            site = i - 1 if i % 5 == 4 else i
+            district = 1 + site % 24
+            if site == i:
+                address = f"{site + 1} Mock Street, Dublin {district}"
+            else:
+                address = f"No. {site + 1} Mock St., D{district:02d}"
+            lines.append(f'{1000 + i}/24,"{address}"')
+        input_csv.write_text("\n".join(lines) + "\n")
+
+        cmd = [
+            sys.executable,
+            str(SCRIPTS_DIR / "5f.geocode_async.py"),
+            "--input", str(input_csv),
+            "--all",
+            "--store", str(tmp / "geocodes.sqlite"),
+            "--output", str(tmp / "geocoded.csv"),
+            *geocoder_args,
+        ]
+        env = {**os.environ, "GEOCODE_BASE_URL": base_url, "GEOCODE_LOG": str(tmp / "geocode_async.log")}
+        started = time.monotonic()
+        subprocess.run(cmd, env=env, check=True, cwd=tmp)
+        elapsed = time.monotonic() - started
+
+        conn = sqlite3.connect(tmp / "geocodes.sqlite")
+        statuses = dict(conn.execute("SELECT status, COUNT(*) FROM geocodes GROUP BY status").fetchall())
+        conn.close()
+
+    server.shutdown()
+    return {
+        "applications": n_addresses,
+        "elapsed_s": round(elapsed, 1),
+        "applications_per_s": round(n_addresses / elapsed, 1),
+        "statuses": statuses,
+        "server": dict(server.RequestHandlerClass.stats),
+    }
+
+
+# ---------------- MAIN ----------------
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    geocoder_args: List[str] = []
+    if "--" in argv:
+        cut = argv.index("--")
+        argv, geocoder_args = argv[:cut], argv[cut + 1:]
+
+    parser = argparse.ArgumentParser(description="Local mock of the Google Geocoding API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--qps", type=float, default=0, help="answer OVER_QUERY_LIMIT above this rate (0 = unlimited)")
+    parser.add_argument("--zero-results-rate", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--benchmark", type=int, metavar="N_APPS", help="run 5f.geocode_async.py against the mock and report")
+    args = parser.parse_args(argv)
+
+    cfg = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        qps=args.qps,
+        zero_results_rate=args.zero_results_rate,
+        error_rate=args.error_rate,
+    )
+
+    if args.benchmark:
+        print(json.dumps(benchmark(cfg, args.benchmark, geocoder_args), indent=2))
+        return
+
+    server = serve(cfg, args.host, args.port)
+    print(f"Mock geocoder on http://{args.host}:{args.port}{GEOCODE_PATH}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+mock_publicaccess.py
+
+Local stand-in for the Dublin City Council PublicAccess third-party search,
+for testing and benchmarking the scrapers offline. Stdlib only.
+
+It reproduces what the scrapers rely on:
+- /PublicAccess_Live/SearchResult/RunThirdPartySearch?FileSystemId=PL&Folder1_Ref=<app>
+  renders a #searchResult table that a small script paginates client-side
+  like DataTables: the searchResult_length select, the "Showing x to y of z
+  entries" #searchResult_info line and the #searchResult_next button
+- "3rd Party Observation" / "Third Party Observation" icons that open the
+  document in a popup, trigger a download, or (to exercise the browser
+  fallback) only resolve through script
+- documents served with Range support
+
+Each application's listing is derived from its number and --seed, so runs
+are reproducible. Latency, redraw time and error rates can be injected.
+
+Usage:
+    python mock_publicaccess.py --port 8765 --latency-ms 300 --error-rate 0.02
+    PUBLICACCESS_BASE_URL=http://127.0.0.1:8765/PublicAccess_Live python 0b.scrape_async.py ...
+
+    # benchmark 0b.scrape_async.py against the mock (extra args go to 0b)
+    python mock_publicaccess.py --benchmark 200 --latency-ms 300 -- --concurrency 6
+
+    # no browser available: time the HTTP route alone, fixed vs adaptive rate
+    python mock_publicaccess.py --benchmark-http 400 --latency-ms 300 --jitter-ms 100 --error-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Tuple
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+SITE_PREFIX = "/PublicAccess_Live"
+SEARCH_PATH = SITE_PREFIX + "/SearchResult/RunThirdPartySearch"
+VIEW_PATH = SITE_PREFIX + "/Document/ViewDocument"
+DOWNLOAD_PATH = SITE_PREFIX + "/Document/Download"
+
+OTHER_DOC_TYPES = (
+    "Application Form",
+    "Site Location Map",
+    "Drawings",
+    "Planning Report",
+    "Decision Notice",
+    "Newspaper Notice",
+    "Site Notice",
+)
+OBS_LABELS = ("3rd Party Observation", "Third Party Observation")
+
+
+@dataclass
+class MockConfig:
+    seed: int = 0
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0.0
+    doc_latency_ms: float = 0
+    doc_error_rate: float = 0.0
+    draw_ms: float = 150
+    doc_bytes: int = 40_000
+    no_record_share: float = 0.1
+    mean_observations: float = 3.0
+    max_observations: int = 150
+    download_share: float = 0.2
+    script_link_share: float = 0.1
+
+
+# ---------------- FAKE LISTINGS ----------------
+
+
+def _rng(cfg: MockConfig, *parts) -> random.Random:
+    key = ":".join(str(p) for p in (cfg.seed, *parts))
+    return random.Random(int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big"))
+
+
+def listing_for(cfg: MockConfig, app_no: str) -> List[Tuple[str, str, str]]:
+    """Rows of (doc_id, doc_type, icon_mode) for an application; empty means no record."""
+    rng = _rng(cfg, app_no)
+    if rng.random() < cfg.no_record_share:
+        return []
+
+    n_obs = min(cfg.max_observations, int(rng.expovariate(1 / cfg.mean_observations))) if cfg.mean_observations else 0
+    rows = [("", rng.choice(OTHER_DOC_TYPES), "") for _ in range(rng.randint(3, 25))]
+    for _ in range(n_obs):
+        r = rng.random()
+        if r < cfg.script_link_share:
+            mode = "script"
+        elif r < cfg.script_link_share + cfg.download_share:
+            mode = "download"
+        else:
+            mode = "popup"
+        rows.append(("", rng.choice(OBS_LABELS), mode))
+    rng.shuffle(rows)
+
+    safe = app_no.replace("/", "_")
+    return [(f"{safe}-{i}", doc_type, mode) for i, (_, doc_type, mode) in enumerate(rows)]
+
+
+def document_bytes(cfg: MockConfig, doc_id: str) -> bytes:
+    rng = _rng(cfg, "doc", doc_id)
+    size = max(200, int(rng.gauss(cfg.doc_bytes, cfg.doc_bytes / 4)))
+    header = f"%PDF-1.4\n% mock document {doc_id}\n".encode()
+    return header + rng.randbytes(max(0, size - len(header))) + b"\n%%EOF\n"
+
+
+_PAGE_SCRIPT = """
+(function () {
+  var DRAW_MS = %(draw_ms)d;
+  var table = document.getElementById("searchResult");
+  var tbody = table.tBodies[0];
+  var rows = Array.prototype.slice.call(tbody.rows);
+  var empty = rows.length === 1 && rows[0].querySelector(".dataTables_empty");
+  var total = empty ? 0 : rows.length;
+  var length = 10, start = 0, info, next;
+
+  function draw() {
+    // like DataTables, rows outside the current page are detached, not hidden
+    while (tbody.firstChild) tbody.removeChild(tbody.firstChild);
+    var shown = empty ? rows : rows.slice(start, start + length);
+    shown.forEach(function (r) { tbody.appendChild(r); });
+    var last = Math.min(start + length, total);
+    info.textContent = "Showing " + (total ? start + 1 : 0) + " to " + last + " of " + total + " entries";
+    next.className = "paginate_button next" + (last >= total ? " disabled" : "");
+  }
+
+  function later(fn) { setTimeout(fn, DRAW_MS); }
+
+  setTimeout(function () {
+    info = document.createElement("div");
+    info.id = "searchResult_info";
+    info.className = "dataTables_info";
+    next = document.createElement("a");
+    next.id = "searchResult_next";
+    next.textContent = "Next";
+    next.href = "#";
+    table.parentNode.appendChild(info);
+    table.parentNode.appendChild(next);
+
+    document.querySelector('select[name="searchResult_length"]').addEventListener("change", function (e) {
+      length = parseInt(e.target.value, 10);
+      start = 0;
+      later(draw);
+    });
+    next.addEventListener("click", function (e) {
+      e.preventDefault();
+      if (start + length < total) { start += length; later(draw); }
+    });
+    draw();
+  }, DRAW_MS);
+})();
+
+function openDoc(el) {
+  window.open("%(view_path)s?id=" + el.getAttribute("data-doc"), "_blank");
+}
+"""
+
+
+def render_listing(cfg: MockConfig, app_no: str) -> str:
+    rows = listing_for(cfg, app_no)
+    body = []
+    for doc_id, doc_type, mode in rows:
+        label = html.escape(doc_type)
+        if mode in ("", "popup"):
+            view = f'<a href="{VIEW_PATH}?id={doc_id}" target="_blank"><span class="doc-icon" aria-label="{label}"></span></a>'
+        elif mode == "download":
+            view = f'<a href="{DOWNLOAD_PATH}?id={doc_id}" download><span class="doc-icon" aria-label="{label}"></span></a>'
+        else:
+            view = f'<span class="doc-icon" aria-label="{label}" data-doc="{doc_id}" onclick="openDoc(this)"></span>'
+        body.append(f"<tr><td>{doc_id}</td><td>{label}</td><td>{view}</td></tr>")
+    if not body:
+        body.append('<tr class="odd"><td valign="top" colspan="3" class="dataTables_empty">No data available in table</td></tr>')
+
+    script = _PAGE_SCRIPT % {"draw_ms": cfg.draw_ms, "view_path": VIEW_PATH}
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Search Results - {html.escape(app_no)}</title></head>
+<body>
+<h1>Third Party Search: {html.escape(app_no)}</h1>
+<div id="searchResult_wrapper">
+<label>Show <select name="searchResult_length">
+<option value="10">10</option><option value="25">25</option><option value="50">50</option><option value="100">100</option>
+</select> entries</label>
+<table id="searchResult"><thead><tr><th>Document</th><th>Type</th><th>View</th></tr></thead>
+<tbody>
+{chr(10).join(body)}
+</tbody></table>
+</div>
+<script>{script}</script>
+</body></html>
+"""
+
+
+# ---------------- SERVER ----------------
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockPublicAccess/1.0"
+    cfg: MockConfig = MockConfig()
+    stats: dict = {}
+    stats_lock = threading.Lock()
+
+    def log_message(self, fmt, *args) -> None:
+        pass
+
+    def _count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _delay(self, base_ms: float) -> None:
+        ms = base_ms + (random.uniform(-self.cfg.jitter_ms, self.cfg.jitter_ms) if self.cfg.jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+
+        if url.path == "/__stats":
+            with self.stats_lock:
+                body = json.dumps(self.stats).encode()
+            return self._send(200, body, "application/json")
+
+        if url.path == SEARCH_PATH:
+            self._count("search")
+            self._delay(self.cfg.latency_ms)
+            if random.random() < self.cfg.error_rate:
+                self._count("search_error")
+                return self._send(503, b"Service Unavailable", "text/plain")
+            body = render_listing(self.cfg, query.get("Folder1_Ref", "").strip()).encode()
+            return self._send(200, body, "text/html; charset=utf-8")
+
+        if url.path in (VIEW_PATH, DOWNLOAD_PATH):
+            self._count("document")
+            self._delay(self.cfg.doc_latency_ms)
+            if random.random() < self.cfg.doc_error_rate:
+                self._count("document_error")
+                return self._send(500, b"Internal Server Error", "text/plain")
+            return self._send_document(query.get("id", ""), attachment=url.path == DOWNLOAD_PATH)
+
+        self._send(404, b"Not Found", "text/plain")
+
+    def _send_document(self, doc_id: str, attachment: bool) -> None:
+        data = document_bytes(self.cfg, doc_id)
+        disposition = "attachment" if attachment else "inline"
+        headers = {"Accept-Ranges": "bytes", "Content-Disposition": f'{disposition}; filename="{doc_id}.pdf"'}
+
+        rng = self.headers.get("Range", "")
+        if rng.startswith("bytes="):
+            start = int(rng[len("bytes="):].split("-")[0] or 0)
+            if start >= len(data):
+                return self._send(416, b"", "text/plain", {"Content-Range": f"bytes */{len(data)}"})
+            headers["Content-Range"] = f"bytes {start}-{len(data) - 1}/{len(data)}"
+            return self._send(206, data[start:], "application/pdf", headers)
+        self._send(200, data, "application/pdf", headers)
+
+
+def serve(cfg: MockConfig, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"cfg": cfg, "stats": {}})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# ---------------- BENCHMARK ----------------
+
+
+def benchmark(cfg: MockConfig, n_apps: int, scraper_args: List[str]) -> dict:
+    """Run 0b.scrape_async.py over n_apps synthetic applications against an in-process mock."""
+    server = serve(cfg, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}{SITE_PREFIX}"
+
+    with tempfile.TemporaryDirectory(prefix="mock_publicaccess_") as tmp:
+        tmp = Path(tmp)
+        input_csv = tmp / "applications.csv"
+        lines = ["Application Number,Planning Authority,Received Date,Decision Date"]
+        lines += [f"{1000 + i}/{24 - i % 5},Dublin City Council,2024-01-01,2024-03-01" for i in range(n_apps)]
+        input_csv.write_text("\n".join(lines) + "\n")
+
+        cmd = [
+            sys.executable,
+            str(SCRIPTS_DIR / "0b.scrape_async.py"),
+            "--input", str(input_csv),
+            "--store", str(tmp / "jobs.sqlite"),
+            "--out-dir", str(tmp / "downloads"),
+            "--out-csv", str(tmp / "results.csv"),
+            "--metrics-file", str(tmp / "scrape_metrics.json"),
+            "--metrics-port", "0",
+            "--browser-state", str(tmp / "publicaccess_state.json"),
+            *scraper_args,
+        ]
+        env = {**os.environ, "PUBLICACCESS_BASE_URL": base_url, "SCRAPE_LOG": str(tmp / "scrape.log")}
+        started = time.monotonic()
+        subprocess.run(cmd, env=env, check=True, cwd=tmp)
+        elapsed = time.monotonic() - started
+
+        conn = sqlite3.connect(tmp / "jobs.sqlite")
+        states = dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        sources = dict(conn.execute("SELECT COALESCE(source, ''), COUNT(*) FROM jobs GROUP BY 1").fetchall())
+        conn.close()
+
+    server.shutdown()
+    return {
+        "applications": n_apps,
+        "elapsed_s": round(elapsed, 1),
+        "apps_per_min": round(n_apps / elapsed * 60, 1),
+        "s_per_app": round(elapsed / n_apps, 3),
+        "states": states,
+        "sources": sources,
+        "server": dict(server.RequestHandlerClass.stats),
+    }
+
+
+class _BrowserNeeded(Exception):
+    pass
+
+
+class _NoBrowser:
+    """Stands in for the Playwright page; the HTTP benchmark counts fallbacks instead of running them."""
+
+    def __getattr__(self, name):
+        raise _BrowserNeeded(name)
+
+
+def benchmark_http(cfg: MockConfig, n_apps: int, concurrency: int = 6, rate: float = 3.0, burst: int = 3) -> List[dict]:
+    """
+    Run observations.scrape_application's HTTP route in-process, once with a
+    fixed TokenBucket and once with the AdaptiveRateLimiter 0b uses by
+    default. Applications that would need the browser are counted, not
+    scraped, so the times cover the HTTP route only.
+    """
+    import asyncio
+
+    server = serve(cfg, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # publicaccess reads the base URL at import
+    os.environ["PUBLICACCESS_BASE_URL"] = f"http://127.0.0.1:{server.server_port}{SITE_PREFIX}"
+    from observations import scrape_application
+    from publicaccess_http import HttpListingClient
+    from rate_limit import AdaptiveRateLimiter, TokenBucket
+
+    async def run(adaptive: bool) -> dict:
+        bucket = AdaptiveRateLimiter(rate, burst=burst) if adaptive else TokenBucket(rate, burst=burst)
+        client = HttpListingClient(pool_size=concurrency * 2)
+        todo = [f"{1000 + i}/{24 - i % 5}" for i in range(n_apps)]
+        tally = {"http": 0, "needs_browser": 0}
+
+        async def worker() -> None:
+            while todo:
+                app_no = todo.pop()
+                await bucket.acquire()
+                try:
+                    record, _ = await scrape_application(_NoBrowser(), app_no, None, client, download=False)
+                except _BrowserNeeded:
+                    tally["needs_browser"] += 1
+                    continue
+                tally["http"] += 1
+                if adaptive:
+                    bucket.record(record["listing_s"], ok=True)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+        client.close()
+        return {
+            "limiter": "adaptive" if adaptive else "fixed",
+            "elapsed_s": round(elapsed, 1),
+            "apps_per_min": round(n_apps / elapsed * 60, 1),
+            "s_per_app": round(elapsed / n_apps, 3),
+            "final_rate": round(bucket.rate, 2),
+            **tally,
+        }
+
+    results = [asyncio.run(run(adaptive)) for adaptive in (False, True)]
+    server.shutdown()
+    return results
+
+
+# ---------------- MAIN ----------------
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    scraper_args: List[str] = []
+    if "--" in argv:
+        cut = argv.index("--")
+        argv, scraper_args = argv[:cut], argv[cut + 1:]
+
+    parser = argparse.ArgumentParser(description="Local mock of the PublicAccess third-party search")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every search page")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of searches answered with 503")
+    parser.add_argument("--doc-latency-ms", type=float, default=0)
+    parser.add_argument("--doc-error-rate", type=float, default=0.0, help="share of documents answered with 500")
+    parser.add_argument("--draw-ms", type=float, default=150, help="client-side table init/redraw time")
+    parser.add_argument("--no-record-share", type=float, default=0.1)
+    parser.add_argument("--mean-observations", type=float, default=3.0)
+    parser.add_argument("--download-share", type=float, default=0.2, help="icons that download instead of popup")
+    parser.add_argument("--script-link-share", type=float, default=0.1, help="icons only resolvable in a browser")
+    parser.add_argument("--benchmark", type=int, metavar="N_APPS", help="run 0b.scrape_async.py against the mock and report")
+    parser.add_argument("--benchmark-http", type=int, metavar="N_APPS", help="time the HTTP route alone, fixed vs adaptive rate")
+    args = parser.parse_args(argv)
+
+    cfg = MockConfig(
+        seed=args.seed,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        doc_latency_ms=args.doc_latency_ms,
+        doc_error_rate=args.doc_error_rate,
+        draw_ms=args.draw_ms,
+        no_record_share=args.no_record_share,
+        mean_observations=args.mean_observations,
+        download_share=args.download_share,
+        script_link_share=args.script_link_share,
+    )
+
+    if args.benchmark_http:
+        print(json.dumps(benchmark_http(cfg, args.benchmark_http), indent=2))
+        return
+
+    if args.benchmark:
+        print(json.dumps(benchmark(cfg, args.benchmark, scraper_args), indent=2))
+        return
+
+    server = serve(cfg, args.host, args.port)
+    print(f"Mock PublicAccess on http://{args.host}:{args.port}{SITE_PREFIX}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
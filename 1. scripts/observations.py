@@ -0,0 +1,95 @@
+"""
+Scrape one application's third-party observations, HTTP first.
+
+Shared by 0b.scrape_async.py and 2.retry_failures.py. The listing is parsed
+over plain HTTP when possible (publicaccess_http.py) and the Playwright page
+is only driven when that parse fails. With download=False only document URLs
+are collected and 0c.download_documents.py fetches them later.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import requests
+
+from publicaccess import (
+    DOWNLOAD_FAILED,
+    extract_all_pages_observations,
+    open_search,
+    page_has_no_records,
+    redownload_positions,
+    safe_app_name,
+)
+from publicaccess_http import HttpListingClient, ListingParseError
+
+
+async def _http_listing(client: HttpListingClient | None, app_no: str):
+    if client is None:
+        return None
+    try:
+        return await asyncio.to_thread(client.fetch_listing, app_no)
+    except (ListingParseError, requests.RequestException):
+        return None
+
+
+async def _http_download(client: HttpListingClient, doc_url: str, out_file: Path) -> str:
+    try:
+        await asyncio.to_thread(client.download, doc_url, out_file)
+        return doc_url
+    except Exception:
+        return DOWNLOAD_FAILED
+
+
+async def scrape_application(
+    page, app_no: str, out_dir: Path, client: HttpListingClient | None = None, download: bool = True
+) -> Tuple[dict, str]:
+    """
+    Returns ({"no_record_found", "urls", "listing_s"}, source) where source is "http"
+    or "browser" and listing_s is how long the search listing took to load.
+    """
+    started = time.monotonic()
+    listing = await _http_listing(client, app_no)
+    if listing is not None:
+        listing_s = time.monotonic() - started
+        if listing.no_record:
+            return {"no_record_found": 1, "urls": [], "listing_s": listing_s}, "http"
+        if not download:
+            return {"no_record_found": 0, "urls": list(listing.document_urls), "listing_s": listing_s}, "http"
+        safe_app = safe_app_name(app_no)
+        urls: List[str] = []
+        for i, doc_url in enumerate(listing.document_urls):
+            urls.append(await _http_download(client, doc_url, out_dir / f"{safe_app}_obs_{i+1}.pdf"))
+        return {"no_record_found": 0, "urls": urls, "listing_s": listing_s}, "http"
+
+    started = time.monotonic()
+    await open_search(page, app_no)
+    listing_s = time.monotonic() - started
+    if await page_has_no_records(page):
+        return {"no_record_found": 1, "urls": [], "listing_s": listing_s}, "browser"
+    urls = await extract_all_pages_observations(page, app_no, out_dir, download=download)
+    return {"no_record_found": 0, "urls": urls, "listing_s": listing_s}, "browser"
+
+
+async def retry_positions(
+    page, app_no: str, positions: Iterable[int], out_dir: Path, client: HttpListingClient | None = None
+) -> Dict[int, str]:
+    """Re-download only the given 0-based positions; DOWNLOAD_FAILED marks a slot that failed again."""
+    positions = sorted(positions)
+    listing = await _http_listing(client, app_no)
+    if listing is not None and not listing.no_record:
+        safe_app = safe_app_name(app_no)
+        results: Dict[int, str] = {}
+        for pos in positions:
+            if pos >= len(listing.document_urls):
+                results[pos] = DOWNLOAD_FAILED
+                continue
+            out_file = out_dir / f"{safe_app}_obs_{pos+1}.pdf"
+            results[pos] = await _http_download(client, listing.document_urls[pos], out_file)
+        return results
+
+    await open_search(page, app_no)
+    return await redownload_positions(page, app_no, positions, out_dir)
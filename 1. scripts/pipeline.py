@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+pipeline.py
+
+One runner for the whole data pipeline, in place of running the numbered
+scripts by hand:
+
+    filter → scrape → download → retry → merge → geocode → validate → master
+    boundaries (independent; validate needs its output)
+
+Every stage declares the files it reads and writes. The dependencies follow
+from that: a stage waits for any earlier stage that writes one of its inputs
+or outputs. Stages whose dependencies are done run in parallel (--jobs).
+
+A stage is skipped when its outputs exist and the fingerprint of its inputs
+matches the one recorded after its last successful run. The script itself
+and the shared modules it imports count as inputs. Fingerprints are content
+hashes:
+
+- plain files: sha256 of the bytes, cached by (size, mtime), so unchanged
+  files are not read again
+- SQLite stores: a hash of the table contents rather than the file, leaving
+  out bookkeeping columns (VOLATILE_COLUMNS: timestamps, attempt counters,
+  leases, cache hits, validation flags). A run that only touches those does
+  not trigger the stages after it, so geocode → validate settles once
+  validation stops re-queueing rows
+- directories (downloads/): the listing of names, sizes and mtimes
+- glob patterns: the matched names plus each file's hash
+
+An upstream stage that reruns but produces identical outputs therefore
+does not trigger anything downstream. Stages that read and write the
+same store (retry, validate) are stamped with its state after they finish.
+
+State lives in outputs/pipeline_state.json, stage output in logs/pipeline/.
+
+Usage:
+    python pipeline.py                     # run whatever is out of date
+    python pipeline.py --dry-run           # show what would run
+    python pipeline.py geocode master      # these stages (and what they need)
+    python pipeline.py --force merge       # rerun merge even if up to date
+    python pipeline.py --jobs 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Set, Tuple
+
+# ---------------- CONFIG ----------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BASE_DIR = SCRIPTS_DIR.parent
+
+STATE_PATH = SCRIPTS_DIR / "outputs" / "pipeline_state.json"
+LOG_DIR = SCRIPTS_DIR / "logs" / "pipeline"
+JOBS = 2
+HASH_CHUNK = 1 << 20
+
+# store columns that change on every pass without changing the data
+VOLATILE_COLUMNS = {
+    "updated_at", "attempts", "next_attempt_at", "last_error", "last_scraped_at",
+    "lease_expires", "hits", "quality",
+}
+
+RAW_APPS = "0. data/IrishPlanningApplications_2359694955245257726.csv"
+DCC_APPS = "0. data/IrishPlanningApplications_DublinCityCouncil.csv"
+DCC_PARQUET = "0. data/IrishPlanningApplications_DublinCityCouncil.parquet"
+GEOCODED = "0. data/DCC_all_applications_geocoded.csv"
+SA_SHP = "0. data/Small_Area_National_Statistical_Boundaries_2022_Ungeneralised_view_2205995009404967982/SMALL_AREA_2022.shp"
+SCRAPE_DB = "1. scripts/outputs/scrape_jobs.sqlite"
+GEOCODE_DB = "1. scripts/outputs/geocodes.sqlite"
+OBS_CSV = "1. scripts/outputs/third_party_obs_async.csv"
+MERGED = "1. scripts/outputs/third_party_obs_merged.parquet"
+DOCUMENTS = "1. scripts/outputs/third_party_obs_documents.parquet"
+DOWNLOADS = "1. scripts/downloads"
+SMALL_AREAS = "data/dublin_small_areas.geojson"
+ELECTORAL_DIVISIONS = "data/dublin_electoral_divisions.geojson"
+
+SCRAPE_CODE = (
+    "1. scripts/publicaccess.py",
+    "1. scripts/publicaccess_http.py",
+    "1. scripts/observations.py",
+    "1. scripts/rate_limit.py",
+    "1. scripts/scrape_store.py",
+)
+GEOCODE_CODE = ("1. scripts/geocode_store.py", "1. scripts/gazetteer.py", "1. scripts/rate_limit.py")
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    script: str
+    inputs: Tuple[str, ...]  # paths relative to BASE_DIR; may be globs
+    outputs: Tuple[str, ...]
+    args: Tuple[str, ...] = ()
+
+
+STAGES: Sequence[Stage] = (
+    Stage("filter", "4a.filter_dublin.py", (RAW_APPS,), (DCC_APPS, DCC_PARQUET)),
+    Stage(
+        "scrape",
+        "0b.scrape_async.py",
+        (DCC_PARQUET, *SCRAPE_CODE),
+        (SCRAPE_DB, OBS_CSV),
+        # --reseed: seeding is idempotent, and it is how new applications reach an existing store
+        ("--input", str(BASE_DIR / DCC_PARQUET), "--reseed"),
+    ),
+    Stage("download", "0c.download_documents.py", (SCRAPE_DB, "1. scripts/downloader.py"), (SCRAPE_DB, DOWNLOADS)),
+    Stage("retry", "2.retry_failures.py", (SCRAPE_DB, *SCRAPE_CODE), (SCRAPE_DB, OBS_CSV, DOWNLOADS)),
+    Stage(
+        "merge",
+        "3.merge_results.py",
+        ("1. scripts/outputs/third_party_obs_*.csv", "1. scripts/outputs/rerun_*.csv", SCRAPE_DB, DOWNLOADS),
+        (MERGED, DOCUMENTS),
+    ),
+    Stage("boundaries", "9.convert_boundaries.py", (SA_SHP,), (SMALL_AREAS, ELECTORAL_DIVISIONS)),
+    Stage("geocode", "5f.geocode_async.py", (DCC_APPS, DCC_PARQUET, MERGED, GEOCODE_DB, *GEOCODE_CODE), (GEOCODE_DB, GEOCODED)),
+    Stage("validate", "5g.validate_geocodes.py", (GEOCODE_DB, SMALL_AREAS), (GEOCODE_DB,)),
+    Stage("master", "8.create_master.py", (GEOCODED, DOCUMENTS), ("1. scripts/outputs/applications_master_with_obs.csv",)),
+)
+
+
+# ---------------- FINGERPRINTS ----------------
+
+
+class Hasher:
+    """Content hashes of pipeline paths, with a (size, mtime) cache carried between runs."""
+
+    def __init__(self, cache: Dict[str, list]) -> None:
+        self.cache = cache
+
+    def path(self, rel: str) -> str:
+        if any(c in rel for c in "*?["):
+            h = hashlib.sha256()
+            for p in sorted(BASE_DIR.glob(rel)):
+                h.update(f"{p.relative_to(BASE_DIR)}\0{self.path(str(p.relative_to(BASE_DIR)))}\n".encode())
+            return h.hexdigest()
+        p = BASE_DIR / rel
+        if p.is_dir():
+            return self._listing(p)
+        if not p.exists():
+            return "missing"
+        if p.suffix == ".sqlite":
+            return self._cached(p, [p, p.with_name(p.name + "-wal")], self._sqlite)
+        return self._cached(p, [p], self._bytes)
+
+    def _cached(self, p: Path, parts: List[Path], compute) -> str:
+        stamp = [[q.stat().st_size, q.stat().st_mtime_ns] if q.exists() else None for q in parts]
+        key = str(p)
+        hit = self.cache.get(key)
+        if hit and hit[0] == stamp:
+            return hit[1]
+        digest = compute(p)
+        self.cache[key] = [stamp, digest]
+        return digest
+
+    @staticmethod
+    def _bytes(p: Path) -> str:
+        h = hashlib.sha256()
+        with open(p, "rb") as f:
+            while chunk := f.read(HASH_CHUNK):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def _sqlite(p: Path) -> str:
+        h = hashlib.sha256()
+        conn = sqlite3.connect(f"file:{p}?mode=ro", uri=True)
+        try:
+            tables = [t for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+            for table in tables:
+                cols = [c for (_, c, *_) in conn.execute(f'PRAGMA table_info("{table}")') if c not in VOLATILE_COLUMNS]
+                h.update(f"\0{table}\0{','.join(cols)}\0".encode())
+                select = ", ".join(f'"{c}"' for c in cols)
+                for row in conn.execute(f'SELECT {select} FROM "{table}" ORDER BY rowid'):
+                    h.update(repr(row).encode())
+        finally:
+            conn.close()
+        return h.hexdigest()
+
+    @staticmethod
+    def _listing(p: Path) -> str:
+        h = hashlib.sha256()
+        for q in sorted(p.rglob("*")):
+            if q.is_file():
+                st = q.stat()
+                h.update(f"{q.relative_to(p)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        return h.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> Dict[str, str]:
+        paths = [f"1. scripts/{stage.script}", *stage.inputs]
+        out = {rel: self.path(rel) for rel in paths}
+        out["args"] = hashlib.sha256("\0".join(stage.args).encode()).hexdigest()
+        return out
+
+
+# ---------------- PLAN ----------------
+
+
+def dependencies(stages: Sequence[Stage]) -> Dict[str, Set[str]]:
+    """A stage depends on every earlier stage that writes one of its inputs or outputs."""
+    deps: Dict[str, Set[str]] = {}
+    for i, stage in enumerate(stages):
+        touched = set(stage.inputs) | set(stage.outputs)
+        deps[stage.name] = {
+            earlier.name
+            for earlier in stages[:i]
+            if any(_overlaps(out, path) for out in earlier.outputs for path in touched)
+        }
+    return deps
+
+
+def _overlaps(output: str, path: str) -> bool:
+    if any(c in path for c in "*?["):
+        return Path(output).match(path)
+    return output == path
+
+
+def with_upstream(names: Sequence[str], deps: Dict[str, Set[str]]) -> Set[str]:
+    selected, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(deps[name])
+    return selected
+
+
+def up_to_date(stage: Stage, state: dict, hasher: Hasher) -> bool:
+    stamp = state["stages"].get(stage.name)
+    if stamp is None or not all((BASE_DIR / out).exists() for out in stage.outputs):
+        return False
+    return stamp["inputs"] == hasher.fingerprint(stage)
+
+
+# ---------------- RUN ----------------
+
+
+def run_stage(stage: Stage) -> Tuple[int, float]:
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    started = time.monotonic()
+    with open(LOG_DIR / f"{stage.name}.log", "w") as log_file:
+        proc = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / stage.script), *stage.args],
+            cwd=SCRIPTS_DIR,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+        )
+    return proc.returncode, time.monotonic() - started
+
+
+def load_state() -> dict:
+    if STATE_PATH.exists():
+        return json.loads(STATE_PATH.read_text())
+    return {"stages": {}, "hashes": {}}
+
+
+def save_state(state: dict) -> None:
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+    tmp.replace(STATE_PATH)
+
+
+def log(msg: str) -> None:
+    print(f"[{time.strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def run(stages: Sequence[Stage], targets: Sequence[str], force: Set[str], jobs: int, dry_run: bool) -> int:
+    deps = dependencies(stages)
+    by_name = {s.name: s for s in stages}
+    selected = with_upstream(targets, deps) if targets else set(by_name)
+    state = load_state()
+    hasher = Hasher(state["hashes"])
+
+    pending = [s.name for s in stages if s.name in selected]
+    done: Set[str] = set()
+    ran: Set[str] = set()
+    failed: Set[str] = set()
+    running: Dict = {}
+
+    if dry_run:
+        for name in pending:
+            stale = name in force or any(d in ran for d in deps[name]) or not up_to_date(by_name[name], state, hasher)
+            if stale:
+                ran.add(name)
+            log(f"{name:<11} {'run' if stale else 'up to date'}")
+        return 0
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                if len(running) >= jobs:
+                    break
+                blockers = deps[name] & selected
+                if blockers & failed:
+                    pending.remove(name)
+                    failed.add(name)
+                    log(f"{name:<11} skipped: {', '.join(sorted(blockers & failed))} failed")
+                    continue
+                if not blockers <= done:
+                    continue
+                pending.remove(name)
+                stage = by_name[name]
+                if name not in force and up_to_date(stage, state, hasher):
+                    done.add(name)
+                    log(f"{name:<11} up to date")
+                    continue
+                log(f"{name:<11} running {stage.script}")
+                running[pool.submit(run_stage, stage)] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                code, elapsed = future.result()
+                if code != 0:
+                    failed.add(name)
+                    log(f"{name:<11} FAILED (exit {code}) after {elapsed:.0f}s, see {LOG_DIR / (name + '.log')}")
+                    continue
+                stage = by_name[name]
+                state["stages"][name] = {"inputs": hasher.fingerprint(stage), "finished_at": time.time()}
+                save_state(state)
+                done.add(name)
+                ran.add(name)
+                log(f"{name:<11} done in {elapsed:.0f}s")
+
+    save_state(state)
+    log(f"Ran {len(ran)}, up to date {len(done - ran)}, failed {len(failed)}")
+    return 1 if failed else 0
+
+
+# ---------------- MAIN ----------------
+
+
+def main() -> None:
+    names = [s.name for s in STAGES]
+    parser = argparse.ArgumentParser(description="Run the pipeline stages that are out of date")
+    parser.add_argument("stages", nargs="*", metavar="STAGE", help=f"only these stages and what they need ({', '.join(names)})")
+    parser.add_argument("--force", nargs="*", choices=names, default=[], metavar="STAGE", help="rerun even if up to date")
+    parser.add_argument("--force-all", action="store_true")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="stages to run at once")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would run")
+    parser.add_argument("--list", action="store_true", help="print the stages and their dependencies")
+    args = parser.parse_args()
+
+    if args.list:
+        deps = dependencies(STAGES)
+        for stage in STAGES:
+            after = ", ".join(sorted(deps[stage.name])) or "-"
+            print(f"{stage.name:<11} {stage.script:<28} after: {after}")
+        return
+
+    unknown = [name for name in args.stages if name not in names]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    force = set(names) if args.force_all else set(args.force)
+    sys.exit(run(STAGES, args.stages, force, args.jobs, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Dublin City Council PublicAccess site config and async Playwright helpers.
+
+Shared by the async scraping scripts. Behaviour matches the sync helpers in
+0.scrape.py / 2a.rerun_failed_observations.py:
+- pagination via the "Next" button
+- matches both "3rd Party Observation" and "Third Party Observation"
+- counts observations even if the download fails (DOWNLOAD_FAILED placeholder)
+
+Instead of the fixed sleeps in those scripts, the helpers wait for the
+DataTables redraw itself: the "Showing x to y of z" info text or the first
+row changing after a length change or a "Next" click.
+
+open_scrape_context() builds the lightweight browser profile: images,
+stylesheets, fonts and media are aborted, as is anything from a host other
+than the PublicAccess site (documents excepted, so popups still resolve,
+and scripts from the usual jQuery/DataTables CDNs).
+Cookies are kept in a storage-state file between runs, and pages are
+recycled when their JS heap grows rather than after a fixed count.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import urllib.parse
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from playwright.async_api import TimeoutError
+
+from downloader import make_session, stream_download
+
+# ---------------- SITE CONFIG ----------------
+
+# PUBLICACCESS_BASE_URL points the scraper at another host, e.g. mock_publicaccess.py
+SITE_ROOT = os.environ.get(
+    "PUBLICACCESS_BASE_URL", "https://webapps.dublincity.ie/PublicAccess_Live"
+).rstrip("/")
+BASE_URL = SITE_ROOT + "/SearchResult/RunThirdPartySearch"
+
+RESULTS_LENGTH_SELECT = 'select[name="searchResult_length"]'
+OBS_ICON_SELECTOR = (
+    'span[aria-label*="3rd Party Observation"], '
+    'span[aria-label*="Third Party Observation"]'
+)
+NEXT_BUTTON_SELECTOR = "#searchResult_next"
+NO_RECORD_SELECTOR = "#searchResult_info"
+RESULT_ROWS_SELECTOR = "#searchResult tbody tr"
+
+DOWNLOAD_FAILED = "DOWNLOAD_FAILED"
+
+# ---------------- TIMEOUTS ----------------
+
+GOTO_TIMEOUT_MS = 45_000
+POPUP_TIMEOUT_MS = 10_000
+DOWNLOAD_TIMEOUT_MS = 10_000
+DRAW_TIMEOUT_MS = 10_000
+HTTP_TIMEOUT_S = 60
+
+# ---------------- BROWSER PROFILE ----------------
+
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "stylesheet", "font", "media", "texttrack", "manifest", "other"})
+# third-party hosts that may serve the jQuery/DataTables scripts the results table needs
+SCRIPT_CDN_HOSTS = frozenset({
+    "code.jquery.com",
+    "ajax.googleapis.com",
+    "cdn.datatables.net",
+    "cdnjs.cloudflare.com",
+    "cdn.jsdelivr.net",
+})
+PAGE_HEAP_LIMIT_MB = 150
+MAX_PAGE_USES = 1_000
+
+_SESSION = make_session()
+
+
+def build_search_url(app_number: str) -> str:
+    params = {"FileSystemId": "PL", "Folder1_Ref": app_number.strip()}
+    return BASE_URL + "?" + urllib.parse.urlencode(params)
+
+
+def safe_app_name(app_no: str) -> str:
+    return app_no.replace("/", "_")
+
+
+def download_from_url(url: str, out_path: Path) -> None:
+    stream_download(_SESSION, url, out_path, timeout_s=HTTP_TIMEOUT_S)
+
+
+_TABLE_STATE_JS = f"""
+() => {{
+    const info = document.querySelector("{NO_RECORD_SELECTOR}");
+    const row = document.querySelector("{RESULT_ROWS_SELECTOR}");
+    return (info ? info.innerText : "") + "|" + (row ? row.innerText : "");
+}}
+"""
+
+_REDRAWN_JS = f"""
+(before) => {{
+    const info = document.querySelector("{NO_RECORD_SELECTOR}");
+    const row = document.querySelector("{RESULT_ROWS_SELECTOR}");
+    return ((info ? info.innerText : "") + "|" + (row ? row.innerText : "")) !== before;
+}}
+"""
+
+_INFO_COUNTS = re.compile(r"(\d[\d,]*)\s+to\s+(\d[\d,]*)\s+of\s+(\d[\d,]*)", re.IGNORECASE)
+
+
+async def _table_state(page) -> str:
+    return await page.evaluate(_TABLE_STATE_JS)
+
+
+async def _wait_for_redraw(page, before: str) -> None:
+    """Wait until the table's info text or first row differs from `before`."""
+    try:
+        await page.wait_for_function(_REDRAWN_JS, arg=before, timeout=DRAW_TIMEOUT_MS)
+    except TimeoutError:
+        pass
+
+
+async def _info_counts(page):
+    """(first, last, total) from the "Showing x to y of z" text, or None."""
+    try:
+        text = await page.locator(NO_RECORD_SELECTOR).first.inner_text(timeout=1_000)
+    except Exception:
+        return None
+    m = _INFO_COUNTS.search(text)
+    return tuple(int(g.replace(",", "")) for g in m.groups()) if m else None
+
+
+def _site_host() -> str:
+    return urllib.parse.urlsplit(SITE_ROOT).netloc
+
+
+async def _route_essential_only(route) -> None:
+    request = route.request
+    if request.resource_type == "document":
+        await route.continue_()
+    elif request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    elif urllib.parse.urlsplit(request.url).netloc != _site_host():
+        host = urllib.parse.urlsplit(request.url).hostname or ""
+        if request.resource_type == "script" and host in SCRIPT_CDN_HOSTS:
+            await route.continue_()
+        else:
+            await route.abort()
+    else:
+        await route.continue_()
+
+
+async def open_scrape_context(browser, storage_state: Path | None = None, block: bool = True):
+    """New context with the scraping profile, warmed with cookies from `storage_state` when it exists."""
+    kwargs = {"viewport": {"width": 1280, "height": 800}, "service_workers": "block"}
+    if storage_state is not None and storage_state.exists():
+        kwargs["storage_state"] = str(storage_state)
+    context = await browser.new_context(**kwargs)
+    if block:
+        await context.route("**/*", _route_essential_only)
+    return context
+
+
+async def save_storage_state(context, storage_state: Path | None) -> None:
+    if storage_state is None:
+        return
+    try:
+        storage_state.parent.mkdir(parents=True, exist_ok=True)
+        await context.storage_state(path=str(storage_state))
+    except Exception:
+        pass
+
+
+async def page_heap_mb(page) -> float:
+    """Used JS heap of the page in MB (Chromium only; 0 when unavailable)."""
+    try:
+        used = await page.evaluate("() => (performance.memory ? performance.memory.usedJSHeapSize : 0)")
+    except Exception:
+        return 0.0
+    return used / 1e6
+
+
+async def recycle_if_heavy(context, page, uses: int):
+    """Swap in a fresh page when the heap is over PAGE_HEAP_LIMIT_MB (or after MAX_PAGE_USES); returns (page, uses)."""
+    if uses < MAX_PAGE_USES and await page_heap_mb(page) < PAGE_HEAP_LIMIT_MB:
+        return page, uses
+    await page.close()
+    return await context.new_page(), 0
+
+
+async def open_search(page, app_no: str) -> None:
+    await page.goto(build_search_url(app_no), wait_until="domcontentloaded", timeout=GOTO_TIMEOUT_MS)
+    # DataTables writes the info line once its first draw is done
+    try:
+        await page.wait_for_selector(NO_RECORD_SELECTOR, state="attached", timeout=DRAW_TIMEOUT_MS)
+    except TimeoutError:
+        pass
+    await set_results_to_100(page)
+
+
+async def set_results_to_100(page) -> None:
+    try:
+        sel = page.locator(RESULTS_LENGTH_SELECT)
+        if await sel.count() == 0:
+            return
+        counts = await _info_counts(page)
+        if counts is not None and counts[1] >= counts[2]:
+            # everything is already on the first page; a redraw would not change anything
+            return
+        before = await _table_state(page)
+        await sel.select_option("100")
+        await _wait_for_redraw(page, before)
+    except Exception:
+        pass
+
+
+async def page_has_no_records(page) -> bool:
+    try:
+        info = page.locator(NO_RECORD_SELECTOR)
+        if await info.count() == 0:
+            return False
+        return "0 to 0 of 0" in await info.first.inner_text(timeout=5_000)
+    except Exception:
+        return False
+
+
+async def next_is_disabled(page) -> bool:
+    btn = page.locator(NEXT_BUTTON_SELECTOR)
+    if await btn.count() == 0:
+        return True
+    cls = await btn.first.get_attribute("class") or ""
+    return "disabled" in cls
+
+
+async def go_to_next_page(page) -> bool:
+    """Click "Next"; returns False when there is no further page."""
+    if await next_is_disabled(page):
+        return False
+    btn = page.locator(NEXT_BUTTON_SELECTOR).first
+    try:
+        await btn.scroll_into_view_if_needed(timeout=5_000)
+    except Exception:
+        pass
+    before = await _table_state(page)
+    await btn.click(timeout=10_000)
+    await _wait_for_redraw(page, before)
+    return True
+
+
+async def resolve_document_url(page, icon) -> str:
+    """Click an observation icon and return the document URL it opens or downloads."""
+    try:
+        async with page.expect_popup(timeout=POPUP_TIMEOUT_MS) as pop:
+            await icon.click(timeout=5_000)
+        popup = await pop.value
+        await popup.wait_for_load_state()
+        doc_url = popup.url
+        await popup.close()
+    except TimeoutError:
+        async with page.expect_download(timeout=DOWNLOAD_TIMEOUT_MS) as dl:
+            await icon.click(timeout=5_000)
+        doc_url = (await dl.value).url
+    return doc_url
+
+
+async def extract_all_pages_observations(page, app_no: str, out_dir: Path, download: bool = True) -> List[str]:
+    """With download=False only the document URLs are resolved; the download stage fetches them."""
+    urls: List[str] = []
+    safe_app = safe_app_name(app_no)
+
+    while True:
+        icons = page.locator(OBS_ICON_SELECTOR)
+        n = await icons.count()
+
+        for i in range(n):
+            out_file = out_dir / f"{safe_app}_obs_{len(urls)+1}.pdf"
+            icon = icons.nth(i)
+
+            try:
+                await icon.scroll_into_view_if_needed(timeout=5_000)
+                doc_url = await resolve_document_url(page, icon)
+                if download:
+                    # requests is blocking; keep the event loop free for the other pages
+                    await asyncio.to_thread(download_from_url, doc_url, out_file)
+                urls.append(doc_url)
+            except Exception:
+                # count it anyway, but mark failure
+                urls.append(DOWNLOAD_FAILED)
+
+        if not await go_to_next_page(page):
+            break
+
+    return urls
+
+
+async def redownload_positions(page, app_no: str, positions: Iterable[int], out_dir: Path) -> Dict[int, str]:
+    """
+    Re-fetch only the given 0-based observation positions, crawling pages as needed.
+    Returns position -> document URL, or DOWNLOAD_FAILED when that slot failed again.
+    """
+    wanted = set(positions)
+    results: Dict[int, str] = {}
+    safe_app = safe_app_name(app_no)
+    obs_index = 0
+
+    while wanted - results.keys():
+        icons = page.locator(OBS_ICON_SELECTOR)
+        n = await icons.count()
+
+        for i in range(n):
+            if obs_index in wanted:
+                out_file = out_dir / f"{safe_app}_obs_{obs_index+1}.pdf"
+                icon = icons.nth(i)
+                try:
+                    await icon.scroll_into_view_if_needed(timeout=5_000)
+                    doc_url = await resolve_document_url(page, icon)
+                    await asyncio.to_thread(download_from_url, doc_url, out_file)
+                    results[obs_index] = doc_url
+                except Exception:
+                    results[obs_index] = DOWNLOAD_FAILED
+            obs_index += 1
+
+        if not await go_to_next_page(page):
+            break
+
+    # positions past the end of the listing could not be found at all
+    for pos in wanted - results.keys():
+        results[pos] = DOWNLOAD_FAILED
+    return results
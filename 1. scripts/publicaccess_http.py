@@ -0,0 +1,163 @@
+"""
+HTTP-first client for the PublicAccess third-party search listing.
+
+Fetches the RunThirdPartySearch page with a pooled `requests` session and
+parses the results table directly, resolving each observation icon to its
+document URL from the surrounding markup. No browser is involved.
+
+Anything the parser cannot account for raises ListingParseError, and
+callers fall back to the Playwright path in publicaccess.py. That covers
+icons without a resolvable link, a missing results table, or rows that are
+loaded by script after the page renders.
+"""
+
+from __future__ import annotations
+
+import re
+import urllib.parse
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from downloader import stream_download
+from publicaccess import HTTP_TIMEOUT_S, build_search_url
+
+RESULTS_TABLE_ID = "searchResult"
+OBS_LABELS = ("3rd party observation", "third party observation")
+EMPTY_MARKERS = ("0 to 0 of 0", "no data available", "no matching records")
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+_URL_IN_SCRIPT = re.compile(r"""['"]((?:https?://|/)[^'"]+)['"]""")
+
+
+class ListingParseError(Exception):
+    """The listing could not be parsed with confidence; use the browser instead."""
+
+
+@dataclass
+class SearchListing:
+    no_record: bool
+    document_urls: List[str] = field(default_factory=list)
+
+
+class _ListingParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.found_table = False
+        self.in_table = False
+        self.table_depth = 0
+        self.in_tbody = False
+        self.data_rows = 0
+        self.anchor_stack: List[str | None] = []
+        self.icon_urls: List[str | None] = []
+        self.text_chunks: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs_list) -> None:
+        attrs = {k: (v or "") for k, v in attrs_list}
+
+        if tag == "table":
+            if self.in_table:
+                self.table_depth += 1
+            elif attrs.get("id") == RESULTS_TABLE_ID:
+                self.found_table = True
+                self.in_table = True
+                self.table_depth = 1
+            return
+
+        if not self.in_table:
+            return
+
+        if tag == "tbody":
+            self.in_tbody = True
+        elif tag == "tr" and self.in_tbody:
+            self.data_rows += 1
+        elif tag == "td" and "dataTables_empty" in attrs.get("class", ""):
+            self.data_rows -= 1
+        elif tag == "a":
+            self.anchor_stack.append(_url_from_attrs(attrs))
+        elif tag == "span" and any(lbl in attrs.get("aria-label", "").lower() for lbl in OBS_LABELS):
+            url = _url_from_attrs(attrs)
+            if url is None:
+                url = next((u for u in reversed(self.anchor_stack) if u), None)
+            self.icon_urls.append(url)
+
+    def handle_endtag(self, tag: str) -> None:
+        if not self.in_table:
+            return
+        if tag == "table":
+            self.table_depth -= 1
+            if self.table_depth == 0:
+                self.in_table = False
+        elif tag == "tbody":
+            self.in_tbody = False
+        elif tag == "a" and self.anchor_stack:
+            self.anchor_stack.pop()
+
+    def handle_data(self, data: str) -> None:
+        text = data.strip()
+        if text:
+            self.text_chunks.append(text.lower())
+
+
+def _url_from_attrs(attrs: dict) -> str | None:
+    for key in ("href", "data-url", "data-href"):
+        value = attrs.get(key, "").strip()
+        if value and not value.lower().startswith(("javascript:", "#")):
+            return value
+    match = _URL_IN_SCRIPT.search(attrs.get("onclick", ""))
+    return match.group(1) if match else None
+
+
+def parse_search_listing(html: str, page_url: str) -> SearchListing:
+    parser = _ListingParser()
+    parser.feed(html)
+    parser.close()
+
+    text = " ".join(parser.text_chunks)
+
+    if not parser.found_table:
+        raise ListingParseError("results table not found")
+
+    if not parser.icon_urls:
+        if parser.data_rows > 0:
+            return SearchListing(no_record=False)
+        if any(marker in text for marker in EMPTY_MARKERS):
+            return SearchListing(no_record=True)
+        # An empty table without an explicit marker is usually filled by script.
+        raise ListingParseError("results table is empty without a no-records marker")
+
+    if any(u is None for u in parser.icon_urls):
+        raise ListingParseError("observation icon without a resolvable document link")
+
+    urls = [urllib.parse.urljoin(page_url, u) for u in parser.icon_urls]
+    return SearchListing(no_record=False, document_urls=urls)
+
+
+class HttpListingClient:
+    """Connection-pooled fetcher for search listings and observation documents."""
+
+    def __init__(self, pool_size: int = 10, timeout_s: float = HTTP_TIMEOUT_S) -> None:
+        self.timeout_s = timeout_s
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch_listing(self, app_no: str) -> SearchListing:
+        url = build_search_url(app_no)
+        r = self.session.get(url, timeout=self.timeout_s)
+        r.raise_for_status()
+        return parse_search_listing(r.text, r.url)
+
+    def download(self, url: str, out_path) -> None:
+        stream_download(self.session, url, out_path, timeout_s=self.timeout_s)
+
+    def close(self) -> None:
+        self.session.close()
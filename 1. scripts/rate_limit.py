@@ -0,0 +1,89 @@
+"""
+Rate limiting shared by the async scraping and geocoding scripts.
+
+One limiter instance is shared by every coroutine in the process, so the
+request budget is global rather than per worker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket: `rate_per_s` sustained, up to `burst` at once."""
+
+    def __init__(self, rate_per_s: float, burst: int = 1) -> None:
+        if rate_per_s <= 0:
+            raise ValueError("rate_per_s must be positive")
+        self.rate = float(rate_per_s)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # Waiters queue on the lock, so tokens are handed out first come, first served.
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate follows the server (AIMD).
+
+    Callers report each request with `record(latency_s, ok)`. While responses
+    are healthy and the smoothed latency stays under `target_latency_s`, the rate
+    grows by `increase` req/s per success up to `max_rate`; an error or a slow
+    response multiplies it by `decrease`, down to `min_rate`.
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        burst: int = 1,
+        min_rate: float = 0.2,
+        max_rate: float | None = None,
+        target_latency_s: float = 3.0,
+        increase: float = 0.05,
+        decrease: float = 0.7,
+        smoothing: float = 0.2,
+    ) -> None:
+        super().__init__(rate_per_s, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate_per_s * 4
+        self.target_latency_s = target_latency_s
+        self.increase = increase
+        self.decrease = decrease
+        self.smoothing = smoothing
+        self.latency_ewma: float | None = None
+        self._last_cut = 0.0
+
+    def record(self, latency_s: float | None, ok: bool = True) -> None:
+        if latency_s is not None:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency_s
+            else:
+                self.latency_ewma += self.smoothing * (latency_s - self.latency_ewma)
+
+        self._refill()
+        slow = self.latency_ewma is not None and self.latency_ewma > self.target_latency_s
+        if not ok or slow:
+            # one cut per latency window, so a burst of failures does not collapse the rate
+            now = time.monotonic()
+            if now - self._last_cut >= (self.latency_ewma or 1.0):
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_cut = now
+        else:
+            self.rate = min(self.max_rate, self.rate + self.increase)
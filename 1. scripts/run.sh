@@ -5,6 +5,9 @@ N_WORKERS=10
 # FULL ABSOLUTE PATH (quoted)
 SCRIPT="/Users/mikemcrae/Documents/GitHub/Planning applications/1. scripts/5d.run_parrallel.py"
 
+# seed the shared geocode store once, before the workers read it
+python3 "${SCRIPT}" seed || exit 1
+
 for ((i=0; i<${N_WORKERS}; i++)); do
     SESSION="geo_worker_${i}"
 
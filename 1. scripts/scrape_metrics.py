@@ -0,0 +1,255 @@
+"""
+Live throughput and health metrics for the async scraper.
+
+ScrapeMetrics is fed one event per application by the workers. It keeps
+rolling windows, so rates reflect the last few minutes rather than the
+whole run, and publishes a snapshot:
+
+- to a JSON file (written atomically every few seconds)
+- over HTTP: /metrics returns the JSON, / is a small self-refreshing page
+
+BufferedLog replaces the open-append-close-per-line log helper: the file
+stays open and is flushed every `flush_every` lines or `flush_s` seconds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Deque, Dict, Tuple
+
+WINDOW_S = 300
+LATENCY_SAMPLES = 500
+STALL_S = 120
+
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Scrape progress</title>
+<style>
+body { font: 14px system-ui, sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; margin-top: 1em; }
+td, th { padding: 4px 10px; border-bottom: 1px solid #ddd; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+.stalled { background: #fde2e2; }
+.big { font-size: 28px; font-weight: 600; }
+.kpis div { display: inline-block; margin-right: 2.5em; }
+</style></head>
+<body>
+<h2>Scrape progress</h2>
+<div class="kpis" id="kpis"></div>
+<table id="workers"></table>
+<p id="updated"></p>
+<script>
+function fmt(x, d) { return x === null || x === undefined ? "–" : Number(x).toFixed(d); }
+function eta(s) {
+  if (s === null || s === undefined) return "–";
+  var h = Math.floor(s / 3600), m = Math.round((s % 3600) / 60);
+  return h + "h " + m + "m";
+}
+async function refresh() {
+  try {
+    var m = await (await fetch("metrics")).json();
+    var k = [
+      ["apps/min", fmt(m.apps_per_min, 1)],
+      ["done", m.processed],
+      ["queue", m.queue_depth],
+      ["ETA", eta(m.eta_s)],
+      ["page fail %", fmt(100 * m.page_failure_rate, 1)],
+      ["download fail %", fmt(100 * m.download_failure_rate, 1)],
+      ["p95 page load s", fmt(m.p95_page_load_s, 2)],
+    ];
+    document.getElementById("kpis").innerHTML = k.map(function (x) {
+      return "<div><div>" + x[0] + "</div><div class='big'>" + x[1] + "</div></div>";
+    }).join("");
+    var rows = ["<tr><th>worker</th><th>done</th><th>apps/min</th><th>ETA</th><th>page fails</th><th>last app</th><th>idle s</th></tr>"];
+    m.workers.forEach(function (w) {
+      rows.push("<tr class='" + (w.stalled ? "stalled" : "") + "'><td>" + w.worker + "</td><td>" + w.processed +
+        "</td><td>" + fmt(w.apps_per_min, 1) + "</td><td>" + eta(w.eta_s) + "</td><td>" + w.page_failures + "</td><td>" + (w.last_app || "") +
+        "</td><td>" + fmt(w.idle_s, 0) + "</td></tr>");
+    });
+    document.getElementById("workers").innerHTML = rows.join("");
+    document.getElementById("updated").textContent = "updated " + new Date(m.ts * 1000).toLocaleTimeString();
+  } catch (e) {
+    document.getElementById("updated").textContent = "metrics unavailable";
+  }
+}
+refresh();
+setInterval(refresh, 2000);
+</script>
+</body></html>
+"""
+
+
+def _percentile(values, pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+class BufferedLog:
+    def __init__(self, path: Path, flush_every: int = 50, flush_s: float = 2.0, echo: bool = True) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = path.open("a", encoding="utf-8")
+        self.flush_every = flush_every
+        self.flush_s = flush_s
+        self.echo = echo
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def __call__(self, msg: str) -> None:
+        ts = time.strftime("%Y-%m-%d %H:%M:%S")
+        line = f"[{ts}] {msg}"
+        if self.echo:
+            print(line, flush=True)
+        self._f.write(line + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_s:
+            self.flush()
+
+    def flush(self) -> None:
+        self._f.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self._f.close()
+
+
+class ScrapeMetrics:
+    """Fed from the event loop thread; the HTTP server only reads the published snapshot."""
+
+    def __init__(self, queue_depth: Callable[[], int], window_s: float = WINDOW_S) -> None:
+        self.queue_depth = queue_depth
+        self.window_s = window_s
+        self.started = time.time()
+        # (ts, slot, page_ok, n_docs, n_doc_failed)
+        self.events: Deque[Tuple[float, int, bool, int, int]] = deque()
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.workers: Dict[int, dict] = {}
+        self.totals = {"processed": 0, "page_failures": 0, "documents": 0, "download_failures": 0}
+        self._published = b"{}"
+
+    def worker_started(self, slot: int) -> None:
+        self.workers.setdefault(slot, {"processed": 0, "page_failures": 0, "last_app": None, "last_seen": time.time()})
+
+    def record(self, slot: int, app_no: str, page_ok: bool, n_docs: int = 0, n_doc_failed: int = 0,
+               page_load_s: float | None = None) -> None:
+        now = time.time()
+        self.events.append((now, slot, page_ok, n_docs, n_doc_failed))
+        if page_load_s is not None:
+            self.latencies.append(page_load_s)
+
+        w = self.workers.setdefault(slot, {"processed": 0, "page_failures": 0, "last_app": None, "last_seen": now})
+        w["processed"] += 1
+        w["page_failures"] += 0 if page_ok else 1
+        w["last_app"] = app_no
+        w["last_seen"] = now
+
+        self.totals["processed"] += 1
+        self.totals["page_failures"] += 0 if page_ok else 1
+        self.totals["documents"] += n_docs
+        self.totals["download_failures"] += n_doc_failed
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        while self.events and self.events[0][0] < now - self.window_s:
+            self.events.popleft()
+
+        span_min = min(self.window_s, now - self.started) / 60 or 1e-9
+        n = len(self.events)
+        page_fails = sum(1 for e in self.events if not e[2])
+        docs = sum(e[3] for e in self.events)
+        doc_fails = sum(e[4] for e in self.events)
+        apps_per_min = n / span_min
+
+        per_slot: Dict[int, int] = {}
+        for e in self.events:
+            per_slot[e[1]] = per_slot.get(e[1], 0) + 1
+
+        queue = self.queue_depth()
+        # Workers share one queue, so they finish together at the global eta_s.
+        # Per worker: time to clear an even share of the queue at its own rate,
+        # which shows which workers hold the total back.
+        share = queue / (len(per_slot) or len(self.workers) or 1)
+        return {
+            "ts": now,
+            "uptime_s": round(now - self.started, 1),
+            "window_s": self.window_s,
+            "processed": self.totals["processed"],
+            "totals": dict(self.totals),
+            "apps_per_min": round(apps_per_min, 2),
+            "page_failure_rate": round(page_fails / n, 4) if n else 0.0,
+            "download_failure_rate": round(doc_fails / docs, 4) if docs else 0.0,
+            "p95_page_load_s": _percentile(self.latencies, 95),
+            "p50_page_load_s": _percentile(self.latencies, 50),
+            "queue_depth": queue,
+            "eta_s": round(queue / apps_per_min * 60) if apps_per_min else None,
+            "workers": [
+                {
+                    "worker": slot,
+                    "processed": w["processed"],
+                    "page_failures": w["page_failures"],
+                    "apps_per_min": round(per_slot.get(slot, 0) / span_min, 2),
+                    "eta_s": round(share / per_slot[slot] * span_min * 60) if per_slot.get(slot) else None,
+                    "last_app": w["last_app"],
+                    "idle_s": round(now - w["last_seen"], 1),
+                    "stalled": now - w["last_seen"] > STALL_S,
+                }
+                for slot, w in sorted(self.workers.items())
+            ],
+        }
+
+    def publish(self, path: Path | None = None) -> dict:
+        snap = self.snapshot()
+        body = json.dumps(snap, indent=2).encode()
+        self._published = body
+        if path is not None:
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(body)
+            tmp.replace(path)
+        return snap
+
+    async def run_publisher(
+        self, path: Path | None, interval_s: float = 5.0, on_publish: Callable[[], None] | None = None
+    ) -> None:
+        """Publish every `interval_s` until cancelled; `on_publish` runs after each (e.g. a log flush)."""
+        while True:
+            self.publish(path)
+            if on_publish is not None:
+                on_publish()
+            await asyncio.sleep(interval_s)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8790) -> ThreadingHTTPServer:
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path.startswith("/metrics"):
+                    body, ctype = metrics._published, "application/json"
+                elif self.path in ("/", "/index.html"):
+                    body, ctype = DASHBOARD_HTML.encode(), "text/html; charset=utf-8"
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,692 @@
+"""
+SQLite-backed work queue for observation scraping.
+
+One row per application number with its state, lease and latest result:
+
+    pending -> claimed -> done | page_failed | download_failed
+
+Workers (any number, in any process) claim small batches atomically. A claim
+is a lease, so rows held by a crashed worker become claimable again once the
+lease expires. Every failure is also appended to job_errors, which keeps the
+history the per-worker CSVs used to lose.
+
+Each observation slot of a finished job is a row in `documents` (position is
+0-based, as in the legacy failed_positions column), so retries only touch the
+slots that failed. Failed jobs and documents carry `next_attempt_at`, set with
+exponential backoff and jitter, and stop being retried after `max_attempts`.
+
+When the crawl defers downloads, resolved documents are stored as `queued`
+and 0c.download_documents.py claims them, recording file path, size and
+sha256 (used to skip content that is already on disk).
+
+documents is also the normalized form of the legacy `observation_urls`
+strings: explode_documents() splits them into one row per slot,
+import_results() loads a finished legacy crawl into the store, and
+documents_frame() gives the per-document table
+(application, position, url, status, file path, size, hash) to consumers.
+
+Jobs also keep the application's received/decision dates and when they were
+last scraped, so a delta run can re-queue just the applications still likely
+to receive observations (see requeue_delta).
+"""
+
+from __future__ import annotations
+
+import random
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+PAGE_FAILED = "page_failed"
+DOWNLOAD_FAILED_STATE = "download_failed"
+STATES = (PENDING, CLAIMED, DONE, PAGE_FAILED, DOWNLOAD_FAILED_STATE)
+
+DOC_OK = "ok"
+DOC_FAILED = "failed"
+DOC_QUEUED = "queued"
+DOC_DOWNLOADING = "downloading"
+DOC_STATUSES = (DOC_OK, DOC_FAILED, DOC_QUEUED, DOC_DOWNLOADING)
+
+# legacy slot markers inside observation_urls
+FAILED_MARKER = "DOWNLOAD_FAILED"
+EXISTS_MARKER = "EXISTS"
+
+DEFAULT_LEASE_S = 600
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_S = 30
+BACKOFF_CAP_S = 30 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    application_number TEXT PRIMARY KEY,
+    row_index INTEGER,
+    state TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    no_record_found INTEGER,
+    n_observation_letters INTEGER,
+    observation_urls TEXT,
+    source TEXT,
+    last_error TEXT,
+    next_attempt_at REAL,
+    updated_at REAL,
+    received_date TEXT,
+    decision_date TEXT,
+    last_scraped_at REAL,
+    priority INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+CREATE TABLE IF NOT EXISTS documents (
+    application_number TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    url TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    next_attempt_at REAL,
+    last_error TEXT,
+    updated_at REAL,
+    file_path TEXT,
+    size INTEGER,
+    sha256 TEXT,
+    lease_expires REAL,
+    PRIMARY KEY (application_number, position)
+);
+CREATE INDEX IF NOT EXISTS documents_status ON documents (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS job_errors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_number TEXT NOT NULL,
+    attempt INTEGER,
+    state TEXT,
+    error TEXT,
+    at REAL
+);
+CREATE INDEX IF NOT EXISTS job_errors_app ON job_errors (application_number);
+"""
+
+
+def backoff_delay(attempt: int, base_s: float = BACKOFF_BASE_S, cap_s: float = BACKOFF_CAP_S) -> float:
+    """Exponential backoff with jitter: roughly base * 2^(attempt-1), capped."""
+    delay = min(cap_s, base_s * 2 ** max(0, attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def explode_documents(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per observation slot of each `observation_urls` string:
+    (row_index, application_number, position, url, status). Positions are
+    0-based; DOWNLOAD_FAILED slots are `failed`, EXISTS slots are `ok` with
+    no URL.
+    """
+    frame = df[["row_index", "application_number", "observation_urls"]].reset_index(drop=True)
+    urls = frame["observation_urls"].fillna("").astype(str).str.strip()
+    slots = urls[urls != ""].str.split(";").explode()
+
+    docs = frame.loc[slots.index, ["row_index", "application_number"]]
+    docs["position"] = slots.groupby(level=0).cumcount().astype("int32")
+    failed = (slots == FAILED_MARKER).to_numpy()
+    docs["url"] = slots.where(~slots.isin([FAILED_MARKER, EXISTS_MARKER])).astype("string")
+    docs["status"] = pd.Categorical(np.where(failed, DOC_FAILED, DOC_OK), categories=DOC_STATUSES)
+    return docs.reset_index(drop=True)
+
+
+class ScrapeStore:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        cols = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in (
+            ("next_attempt_at", "REAL"),
+            ("received_date", "TEXT"),
+            ("decision_date", "TEXT"),
+            ("last_scraped_at", "REAL"),
+            ("priority", "INTEGER NOT NULL DEFAULT 0"),
+        ):
+            if name not in cols:
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        doc_cols = {row[1] for row in self.conn.execute("PRAGMA table_info(documents)")}
+        for name, kind in (("file_path", "TEXT"), ("size", "INTEGER"), ("sha256", "TEXT"), ("lease_expires", "REAL")):
+            if name not in doc_cols:
+                self.conn.execute(f"ALTER TABLE documents ADD COLUMN {name} {kind}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (sha256)")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ---------------- SEEDING ----------------
+
+    def seed(self, rows: Iterable[Tuple[int, str, str | None, str | None]]) -> int:
+        """
+        Add (row_index, application_number, received_date, decision_date) rows.
+        Existing jobs keep their state and results; only their dates are refreshed.
+        Returns the number of new jobs.
+        """
+        (before,) = self.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                """
+                INSERT INTO jobs (application_number, row_index, received_date, decision_date, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (application_number) DO UPDATE SET
+                    received_date = excluded.received_date,
+                    decision_date = excluded.decision_date
+                """,
+                ((app_no, int(row_index), received, decided, now) for row_index, app_no, received, decided in rows),
+            )
+        (after,) = self.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()
+        return after - before
+
+    def requeue_delta(self, since: str | None, ttl_s: float | None) -> Dict[str, int]:
+        """
+        Re-queue finished jobs for a delta run: applications received or decided on or
+        after `since` (ISO date) first, then any whose last scrape is older than `ttl_s`.
+        Jobs that were never scraped are pending already and keep normal priority.
+        """
+        now = time.time()
+        out = {"recent": 0, "stale": 0}
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("UPDATE jobs SET priority = 0 WHERE priority != 0")
+            finished = (DONE, DOWNLOAD_FAILED_STATE, PAGE_FAILED)
+            if since is not None:
+                out["recent"] = self.conn.execute(
+                    f"""
+                    UPDATE jobs SET state = ?, priority = 2, attempts = 0, next_attempt_at = NULL, updated_at = ?
+                    WHERE state IN ({",".join("?" * len(finished))})
+                      AND (received_date >= ? OR decision_date >= ?)
+                    """,
+                    (PENDING, now, *finished, since, since),
+                ).rowcount
+            if ttl_s is not None:
+                out["stale"] = self.conn.execute(
+                    f"""
+                    UPDATE jobs SET state = ?, priority = 1, attempts = 0, next_attempt_at = NULL, updated_at = ?
+                    WHERE state IN ({",".join("?" * len(finished))})
+                      AND COALESCE(last_scraped_at, 0) < ?
+                    """,
+                    (PENDING, now, *finished, now - ttl_s),
+                ).rowcount
+        return out
+
+    # ---------------- CLAIM / COMPLETE ----------------
+
+    def claim(self, owner: str, limit: int, lease_s: float = DEFAULT_LEASE_S) -> List[Tuple[int, str]]:
+        """Atomically lease up to `limit` pending (or lease-expired) jobs to `owner`."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                """
+                SELECT application_number, row_index FROM jobs
+                WHERE state = ? OR (state = ? AND lease_expires < ?)
+                ORDER BY priority DESC, row_index
+                LIMIT ?
+                """,
+                (PENDING, CLAIMED, now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                """
+                UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE application_number = ?
+                """,
+                ((CLAIMED, owner, now + lease_s, now, app_no) for app_no, _ in rows),
+            )
+        return [(row_index, app_no) for app_no, row_index in rows]
+
+    def complete(self, app_no: str, record: dict, failed_marker: str = "DOWNLOAD_FAILED", queued: bool = False) -> str:
+        """Store a scraped application. queued=True means its documents still need downloading."""
+        ok_status = DOC_QUEUED if queued else DOC_OK
+        urls = record.get("observation_urls", "") or ""
+        slots = urls.split(";") if urls else []
+        state = DOWNLOAD_FAILED_STATE if failed_marker in slots else DONE
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # A re-scrape keeps slots whose URL is unchanged and already downloaded.
+            self.conn.execute(
+                "DELETE FROM documents WHERE application_number = ? AND position >= ?", (app_no, len(slots))
+            )
+            self.conn.executemany(
+                """
+                INSERT INTO documents (application_number, position, url, status, next_attempt_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (application_number, position) DO UPDATE SET
+                    status = CASE WHEN documents.url = excluded.url AND documents.status = 'ok'
+                                  THEN documents.status ELSE excluded.status END,
+                    file_path = CASE WHEN documents.url = excluded.url THEN documents.file_path END,
+                    size = CASE WHEN documents.url = excluded.url THEN documents.size END,
+                    sha256 = CASE WHEN documents.url = excluded.url THEN documents.sha256 END,
+                    url = excluded.url,
+                    attempts = 1,
+                    next_attempt_at = excluded.next_attempt_at,
+                    last_error = NULL,
+                    lease_expires = NULL,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    (
+                        app_no,
+                        pos,
+                        None if url == failed_marker else url,
+                        DOC_FAILED if url == failed_marker else ok_status,
+                        now + backoff_delay(1) if url == failed_marker else None,
+                        now,
+                    )
+                    for pos, url in enumerate(slots)
+                ),
+            )
+            self.conn.execute(
+                """
+                UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL,
+                    no_record_found = ?, n_observation_letters = ?, observation_urls = ?,
+                    source = ?, last_error = NULL, next_attempt_at = NULL, priority = 0,
+                    last_scraped_at = ?, updated_at = ?
+                WHERE application_number = ?
+                """,
+                (
+                    state,
+                    int(record.get("no_record_found", 0)),
+                    int(record.get("n_observation_letters", 0)),
+                    urls,
+                    record.get("source", ""),
+                    now,
+                    now,
+                    app_no,
+                ),
+            )
+            if state == DOWNLOAD_FAILED_STATE:
+                self._record_error(app_no, state, "one or more documents failed to download")
+        return state
+
+    def fail(self, app_no: str, error: str, state: str = PAGE_FAILED) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            (attempts,) = self.conn.execute(
+                "SELECT attempts FROM jobs WHERE application_number = ?", (app_no,)
+            ).fetchone()
+            self.conn.execute(
+                """
+                UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL,
+                    last_error = ?, next_attempt_at = ?, updated_at = ?
+                WHERE application_number = ?
+                """,
+                (state, error, now + backoff_delay(attempts), now, app_no),
+            )
+            self._record_error(app_no, state, error)
+
+    # ---------------- RETRIES ----------------
+
+    def claim_page_retries(
+        self, owner: str, limit: int, max_attempts: int = MAX_ATTEMPTS, lease_s: float = DEFAULT_LEASE_S
+    ) -> List[Tuple[int, str]]:
+        """Lease page-failed jobs whose backoff has elapsed and that are under the attempt cap."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                """
+                SELECT application_number, row_index FROM jobs
+                WHERE state = ? AND attempts < ? AND COALESCE(next_attempt_at, 0) <= ?
+                ORDER BY next_attempt_at
+                LIMIT ?
+                """,
+                (PAGE_FAILED, max_attempts, now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                """
+                UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE application_number = ?
+                """,
+                ((CLAIMED, owner, now + lease_s, now, app_no) for app_no, _ in rows),
+            )
+        return [(row_index, app_no) for app_no, row_index in rows]
+
+    def claim_document_retries(
+        self, owner: str, limit: int, max_attempts: int = MAX_ATTEMPTS, lease_s: float = DEFAULT_LEASE_S
+    ) -> List[Tuple[str, List[int]]]:
+        """Lease download-failed jobs and return the failed positions that are due for a retry."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            apps = [
+                app_no
+                for (app_no,) in self.conn.execute(
+                    """
+                    SELECT DISTINCT d.application_number FROM documents d
+                    JOIN jobs j ON j.application_number = d.application_number
+                    WHERE j.state = ? AND d.status = ? AND d.attempts < ?
+                      AND COALESCE(d.next_attempt_at, 0) <= ?
+                    LIMIT ?
+                    """,
+                    (DOWNLOAD_FAILED_STATE, DOC_FAILED, max_attempts, now, limit),
+                )
+            ]
+            out = []
+            for app_no in apps:
+                positions = [
+                    pos
+                    for (pos,) in self.conn.execute(
+                        """
+                        SELECT position FROM documents
+                        WHERE application_number = ? AND status = ? AND attempts < ?
+                          AND COALESCE(next_attempt_at, 0) <= ?
+                        ORDER BY position
+                        """,
+                        (app_no, DOC_FAILED, max_attempts, now),
+                    )
+                ]
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?, updated_at = ? WHERE application_number = ?",
+                    (CLAIMED, owner, now + lease_s, now, app_no),
+                )
+                out.append((app_no, positions))
+        return out
+
+    def complete_documents(self, app_no: str, results: Dict[int, str | None], errors: Dict[int, str] | None = None) -> str:
+        """Record per-position retry outcomes (url, or None for another failure) and rebuild the job's URL list."""
+        errors = errors or {}
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for pos, url in results.items():
+                if url is not None:
+                    self.conn.execute(
+                        """
+                        UPDATE documents SET url = ?, status = ?, attempts = attempts + 1,
+                            next_attempt_at = NULL, last_error = NULL, updated_at = ?
+                        WHERE application_number = ? AND position = ?
+                        """,
+                        (url, DOC_OK, now, app_no, pos),
+                    )
+                    continue
+                (attempts,) = self.conn.execute(
+                    "SELECT attempts FROM documents WHERE application_number = ? AND position = ?", (app_no, pos)
+                ).fetchone()
+                error = errors.get(pos, "download failed")
+                self.conn.execute(
+                    """
+                    UPDATE documents SET attempts = attempts + 1, next_attempt_at = ?,
+                        last_error = ?, updated_at = ?
+                    WHERE application_number = ? AND position = ?
+                    """,
+                    (now + backoff_delay(attempts + 1), error, now, app_no, pos),
+                )
+                self.conn.execute(
+                    "INSERT INTO job_errors (application_number, attempt, state, error, at) VALUES (?, ?, ?, ?, ?)",
+                    (app_no, attempts + 1, DOWNLOAD_FAILED_STATE, f"position {pos}: {error}", now),
+                )
+            return self._refresh_urls(app_no, now)
+
+    def _refresh_urls(self, app_no: str, now: float, failed_marker: str = "DOWNLOAD_FAILED") -> str:
+        docs = self.conn.execute(
+            "SELECT url, status FROM documents WHERE application_number = ? ORDER BY position", (app_no,)
+        ).fetchall()
+        urls = [failed_marker if status == DOC_FAILED else (url or EXISTS_MARKER) for url, status in docs]
+        state = DOWNLOAD_FAILED_STATE if failed_marker in urls else DONE
+        self.conn.execute(
+            """
+            UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL,
+                observation_urls = ?, updated_at = ?
+            WHERE application_number = ?
+            """,
+            (state, ";".join(urls), now, app_no),
+        )
+        return state
+
+    def next_retry_at(self, max_attempts: int = MAX_ATTEMPTS) -> float | None:
+        """Earliest time any page or document retry becomes due, or None if nothing is retryable."""
+        (jobs_at,) = self.conn.execute(
+            "SELECT MIN(COALESCE(next_attempt_at, 0)) FROM jobs WHERE state = ? AND attempts < ?",
+            (PAGE_FAILED, max_attempts),
+        ).fetchone()
+        (docs_at,) = self.conn.execute(
+            """
+            SELECT MIN(COALESCE(d.next_attempt_at, 0)) FROM documents d
+            JOIN jobs j ON j.application_number = d.application_number
+            WHERE j.state = ? AND d.status = ? AND d.attempts < ?
+            """,
+            (DOWNLOAD_FAILED_STATE, DOC_FAILED, max_attempts),
+        ).fetchone()
+        due = [t for t in (jobs_at, docs_at) if t is not None]
+        return min(due) if due else None
+
+    # ---------------- DOWNLOADS ----------------
+
+    def claim_downloads(self, limit: int, lease_s: float = DEFAULT_LEASE_S) -> List[Tuple[str, int, str]]:
+        """Lease queued documents (or ones whose download lease expired) as (app, position, url)."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                """
+                SELECT application_number, position, url FROM documents
+                WHERE status = ? OR (status = ? AND lease_expires < ?)
+                LIMIT ?
+                """,
+                (DOC_QUEUED, DOC_DOWNLOADING, now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                """
+                UPDATE documents SET status = ?, lease_expires = ?, updated_at = ?
+                WHERE application_number = ? AND position = ?
+                """,
+                ((DOC_DOWNLOADING, now + lease_s, now, app_no, pos) for app_no, pos, _ in rows),
+            )
+        return rows
+
+    def downloaded_file(self, url: str | None = None, sha256: str | None = None) -> Tuple[str, int, str] | None:
+        """(file_path, size, sha256) of a finished download of this URL or content, if any."""
+        if url is not None:
+            row = self.conn.execute(
+                "SELECT file_path, size, sha256 FROM documents WHERE url = ? AND status = ? AND file_path IS NOT NULL LIMIT 1",
+                (url, DOC_OK),
+            ).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT file_path, size, sha256 FROM documents WHERE sha256 = ? AND status = ? AND file_path IS NOT NULL LIMIT 1",
+                (sha256, DOC_OK),
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def finish_download(self, app_no: str, position: int, file_path: str, size: int | None, sha256: str | None) -> None:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                """
+                UPDATE documents SET status = ?, file_path = ?, size = ?, sha256 = ?,
+                    lease_expires = NULL, last_error = NULL, updated_at = ?
+                WHERE application_number = ? AND position = ?
+                """,
+                (DOC_OK, file_path, size, sha256, time.time(), app_no, position),
+            )
+
+    def fail_download(self, app_no: str, position: int, error: str) -> str:
+        """The job drops to download_failed, so the retry engine re-resolves the slot later."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            (attempts,) = self.conn.execute(
+                "SELECT attempts FROM documents WHERE application_number = ? AND position = ?", (app_no, position)
+            ).fetchone()
+            self.conn.execute(
+                """
+                UPDATE documents SET status = ?, lease_expires = NULL, next_attempt_at = ?,
+                    last_error = ?, updated_at = ?
+                WHERE application_number = ? AND position = ?
+                """,
+                (DOC_FAILED, now + backoff_delay(attempts), error, now, app_no, position),
+            )
+            self.conn.execute(
+                "INSERT INTO job_errors (application_number, attempt, state, error, at) VALUES (?, ?, ?, ?, ?)",
+                (app_no, attempts, DOWNLOAD_FAILED_STATE, f"position {position}: {error}", now),
+            )
+            return self._refresh_urls(app_no, now)
+
+    def download_counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM documents GROUP BY status").fetchall())
+
+    def release(self, owner: str) -> None:
+        """Hand back anything still leased to `owner` (clean shutdown)."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL WHERE state = ? AND lease_owner = ?",
+                (PENDING, CLAIMED, owner),
+            )
+
+    def _record_error(self, app_no: str, state: str, error: str) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO job_errors (application_number, attempt, state, error, at)
+            SELECT application_number, attempts, ?, ?, ? FROM jobs WHERE application_number = ?
+            """,
+            (state, error, time.time(), app_no),
+        )
+
+    # ---------------- LEGACY IMPORT ----------------
+
+    def import_results(self, df: pd.DataFrame) -> int:
+        """
+        Load finished rows from the legacy per-worker/merged CSVs (row_index,
+        application_number, no_record_found, observation_urls, error). Jobs the
+        store has already scraped are left alone. Returns the number imported.
+        """
+        df = df.drop_duplicates("application_number", keep="last")
+        urls = df["observation_urls"].fillna("").astype(str).str.strip()
+        error = df["error"].fillna("").astype(str).str.strip() if "error" in df else pd.Series("", index=df.index)
+        page_failed = error.str.contains("Page.goto", regex=False)
+        state = np.select(
+            [page_failed, urls.str.contains(FAILED_MARKER, regex=False)], [PAGE_FAILED, DOWNLOAD_FAILED_STATE], DONE
+        )
+        n_letters = urls.str.count(";").add(1).where(urls != "", 0)
+        no_record = pd.to_numeric(df["no_record_found"], errors="coerce").fillna(0)
+
+        now = time.time()
+        jobs = pd.DataFrame(
+            {
+                "application_number": df["application_number"].astype(str),
+                "row_index": df["row_index"].astype(int),
+                "state": state,
+                "no_record_found": no_record.astype(int),
+                "n_observation_letters": n_letters.astype(int),
+                "observation_urls": urls,
+                "last_error": error.where(page_failed),
+            }
+        )
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            scraped = {
+                app_no
+                for (app_no,) in self.conn.execute(
+                    "SELECT application_number FROM jobs WHERE state != ? OR observation_urls IS NOT NULL", (PENDING,)
+                )
+            }
+            jobs = jobs[~jobs["application_number"].isin(scraped)]
+            self.conn.executemany(
+                """
+                INSERT INTO jobs (application_number, row_index, state, attempts, no_record_found,
+                    n_observation_letters, observation_urls, source, last_error, next_attempt_at,
+                    last_scraped_at, updated_at)
+                VALUES (?, ?, ?, 1, ?, ?, ?, 'legacy', ?, ?, ?, ?)
+                ON CONFLICT (application_number) DO UPDATE SET
+                    row_index = excluded.row_index, state = excluded.state, attempts = 1,
+                    no_record_found = excluded.no_record_found,
+                    n_observation_letters = excluded.n_observation_letters,
+                    observation_urls = excluded.observation_urls, source = excluded.source,
+                    last_error = excluded.last_error, next_attempt_at = excluded.next_attempt_at,
+                    last_scraped_at = excluded.last_scraped_at, updated_at = excluded.updated_at
+                """,
+                (
+                    (app_no, row_index, st, nr, n, u, None if pd.isna(err) else err,
+                     now if st == PAGE_FAILED else None, now, now)
+                    for app_no, row_index, st, nr, n, u, err in jobs.itertuples(index=False)
+                ),
+            )
+            docs = explode_documents(jobs)
+            self.conn.executemany(
+                """
+                INSERT OR REPLACE INTO documents (application_number, position, url, status, next_attempt_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    (app_no, int(pos), None if pd.isna(url) else url, status, now if status == DOC_FAILED else None, now)
+                    for app_no, pos, url, status in docs[
+                        ["application_number", "position", "url", "status"]
+                    ].itertuples(index=False)
+                ),
+            )
+        return len(jobs)
+
+    # ---------------- REPORTING ----------------
+
+    def counts(self) -> Dict[str, int]:
+        out = {state: 0 for state in STATES}
+        for state, n in self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            out[state] = n
+        return out
+
+    def export_csv(self, path: Path) -> int:
+        """Write finished jobs in the per-worker CSV layout used by the merge/failure scripts."""
+        df = pd.read_sql_query(
+            """
+            SELECT row_index, application_number,
+                   COALESCE(no_record_found, 0) AS no_record_found,
+                   COALESCE(n_observation_letters, 0) > 0 AS has_third_party_observation,
+                   COALESCE(n_observation_letters, 0) AS n_observation_letters,
+                   COALESCE(observation_urls, '') AS observation_urls,
+                   COALESCE(CASE WHEN state = 'page_failed' THEN last_error END, '') AS error,
+                   source, state, attempts
+            FROM jobs
+            WHERE state IN ('done', 'page_failed', 'download_failed')
+            ORDER BY row_index
+            """,
+            self.conn,
+        )
+        df["has_third_party_observation"] = df["has_third_party_observation"].astype(bool)
+        df.to_csv(path, index=False)
+        return len(df)
+
+    def documents_frame(self) -> pd.DataFrame:
+        """The documents table with each job's row_index, typed for vectorized use."""
+        df = pd.read_sql_query(
+            """
+            SELECT j.row_index, d.application_number, d.position, d.url, d.status, d.attempts,
+                   d.file_path, d.size, d.sha256, d.last_error
+            FROM documents d JOIN jobs j ON j.application_number = d.application_number
+            ORDER BY j.row_index, d.position
+            """,
+            self.conn,
+        )
+        return df.astype(
+            {
+                "row_index": "int64",
+                "position": "int32",
+                "attempts": "int32",
+                "size": "Int64",
+                "status": pd.CategoricalDtype(DOC_STATUSES),
+                "application_number": "string",
+                "url": "string",
+                "file_path": "string",
+                "sha256": "string",
+                "last_error": "string",
+            }
+        )
@@ -0,0 +1,112 @@
+"""
+fetch_listing against a stub PublicAccess server serving saved listing pages
+(tests/fixtures): a listing with observations, a no-record page, and a page
+whose observation icon only resolves through script.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import publicaccess_http  # noqa: E402
+from publicaccess_http import HttpListingClient, ListingParseError  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+SEARCH_PATH = "/PublicAccess_Live/SearchResult/RunThirdPartySearch"
+
+PAGES = {
+    "2451/24": (FIXTURES / "listing.html").read_text(encoding="utf-8"),
+    "9999/99": (FIXTURES / "no_record.html").read_text(encoding="utf-8"),
+    "3107/23": (FIXTURES / "script_icon.html").read_text(encoding="utf-8"),
+    # rows filled in by script after load: an empty table with no marker
+    "4400/22": '<table id="searchResult"><thead><tr><th>Document</th></tr></thead><tbody></tbody></table>',
+    # not the results page at all (login wall, error page)
+    "5000/21": "<html><body><p>Session expired</p></body></html>",
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        app_no = dict(urllib.parse.parse_qsl(url.query)).get("Folder1_Ref", "")
+        if url.path != SEARCH_PATH or app_no not in PAGES:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = PAGES[app_no].encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope="module")
+def site_root():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(site_root, monkeypatch):
+    def build_search_url(app_no: str) -> str:
+        params = {"FileSystemId": "PL", "Folder1_Ref": app_no.strip()}
+        return site_root + SEARCH_PATH + "?" + urllib.parse.urlencode(params)
+
+    monkeypatch.setattr(publicaccess_http, "build_search_url", build_search_url)
+    client = HttpListingClient(pool_size=2, timeout_s=5)
+    yield client
+    client.close()
+
+
+def test_listing_resolves_observation_links(client, site_root):
+    listing = client.fetch_listing("2451/24")
+
+    assert not listing.no_record
+    assert listing.document_urls == [
+        site_root + "/PublicAccess_Live/Document/ViewDocument?id=2451_24-1",
+        site_root + "/PublicAccess_Live/Document/Download?id=2451_24-3",
+        site_root + "/PublicAccess_Live/Document/ViewDocument?id=2451_24-4",
+    ]
+
+
+def test_no_record_page(client):
+    listing = client.fetch_listing("9999/99")
+
+    assert listing.no_record
+    assert listing.document_urls == []
+
+
+def test_script_only_icon_falls_back_to_browser(client):
+    with pytest.raises(ListingParseError, match="resolvable document link"):
+        client.fetch_listing("3107/23")
+
+
+def test_empty_table_without_marker_falls_back_to_browser(client):
+    with pytest.raises(ListingParseError, match="no-records marker"):
+        client.fetch_listing("4400/22")
+
+
+def test_missing_results_table_falls_back_to_browser(client):
+    with pytest.raises(ListingParseError, match="results table not found"):
+        client.fetch_listing("5000/21")
+
+
+def test_server_error_is_not_a_parse_error(client):
+    with pytest.raises(requests.HTTPError):
+        client.fetch_listing("0001/20")
@@ -3,6 +3,10 @@ from __future__ import annotations
 import json
 import logging
 import os
+import sqlite3
+import threading
+import time
+import urllib.parse
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
@@ -11,18 +15,18 @@ from typing import Any
 import geopandas as gpd
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
-from shapely.geometry import box
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 LEGACY_DATA_DIR = BASE_DIR / "0. data"
 LEGACY_SCRIPTS_DIR = BASE_DIR / "1. scripts"
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", "").strip()
 
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger("planning_explorer")
@@ -41,10 +45,22 @@ PLANNING_CSV = _pick_path(
     DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.csv",
     LEGACY_DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.csv",
 )
+# typed columnar copy written by 1. scripts/4a.filter_dublin.py; preferred over the CSV
+PLANNING_PARQUET = _pick_path(
+    DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.parquet",
+    LEGACY_DATA_DIR / "IrishPlanningApplications_DublinCityCouncil.parquet",
+)
 GEOCODED_CSV = _pick_path(
     DATA_DIR / "DCC_all_applications_geocoded.csv",
     LEGACY_DATA_DIR / "DCC_all_applications_geocoded.csv",
 )
+# geocode store written by the scripts (1. scripts/geocode_store.py); preferred over the CSV export
+GEOCODE_STORE = _pick_path(
+    DATA_DIR / "geocodes.sqlite",
+    LEGACY_SCRIPTS_DIR / "outputs" / "geocodes.sqlite",
+)
+# points in the slivers between small-area polygons (roads, the river) snap to the nearest one
+SA_SNAP_DEGREES = 0.0005
 MASTER_OBS_CSV = _pick_path(
     DATA_DIR / "applications_master_with_obs.csv",
     LEGACY_SCRIPTS_DIR / "outputs" / "applications_master_with_obs.csv",
@@ -70,6 +86,47 @@ ED_POP_CSV = _pick_path(
 )
 
 
+APPLICATION_FLAGS = (
+    "has_observation",
+    "is_residential",
+    "is_multi_unit",
+    "is_one_off",
+    "is_commercial",
+    "is_extension",
+    "is_granted",
+    "is_refused",
+    "is_appealed",
+    "is_overturned",
+)
+FLAG_BITS = {name: np.uint16(1 << bit) for bit, name in enumerate(APPLICATION_FLAGS)}
+APPLICATION_COLUMNS = [
+    "application_number",
+    "development_address",
+    "development_description",
+    "received_date",
+    "decision_date",
+    "number_of_units",
+    "site_area",
+    "floor_area",
+    "n_observation_letters",
+    "decision",
+    "appeal_status",
+    "portal_link",
+    "latitude",
+    "longitude",
+    "SA_GUID_21",
+    "ED_GUID",
+    "ED_ENGLISH",
+    "sa_idx",
+    "flags",
+    "geometry",
+]
+# Letter counts 0..LETTER_HIST_BINS-1 get exact histogram bins; larger counts
+# share an overflow bin and are also kept individually so quantiles stay exact.
+LETTER_HIST_BINS = 64
+CATEGORICAL_COLUMNS = ("decision", "appeal_status", "SA_GUID_21", "ED_GUID", "ED_ENGLISH")
+
+
 @dataclass(frozen=True)
 class FilterSignature:
     date_from: str | None
@@ -138,6 +195,64 @@ def _is_nonempty(value: Any) -> bool:
     return str(value).strip() != ""
 
 
+def _flag(df: pd.DataFrame, name: str) -> np.ndarray:
+    return (df["flags"].to_numpy() & FLAG_BITS[name]) != 0
+
+
+def _pack_flags(df: pd.DataFrame) -> np.ndarray:
+    flags = np.zeros(len(df), dtype=np.uint16)
+    for name in APPLICATION_FLAGS:
+        flags[df[name].fillna(False).to_numpy(dtype=bool)] |= FLAG_BITS[name]
+    return flags
+
+
+def _downcast_count(series: pd.Series) -> pd.Series:
+    values = pd.to_numeric(series, errors="coerce")
+    finite = values.dropna()
+    if not finite.empty and not np.array_equal(finite.to_numpy(), np.round(finite.to_numpy())):
+        return values.astype(np.float32)
+    upper = finite.abs().max() if not finite.empty else 0
+    int_type = "Int16" if upper < np.iinfo(np.int16).max else "Int32"
+    return values.astype(int_type) if values.isna().any() else values.astype(int_type.lower())
+
+
+def _compact_applications(joined: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Keep only served/filtered columns, as categoricals, downcast numbers and one flag word."""
+    before = int(joined.memory_usage(deep=True).sum())
+
+    out = joined.reset_index(drop=True)
+    out["flags"] = _pack_flags(out)
+    out = out[[c for c in APPLICATION_COLUMNS if c in out.columns]]
+    out = out.loc[:, ~out.columns.duplicated()]
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in out.columns:
+            out[col] = out[col].astype("category")
+    out["n_observation_letters"] = _downcast_count(out["n_observation_letters"].fillna(0))
+    out["number_of_units"] = _downcast_count(out["number_of_units"])
+    for col in ["site_area", "floor_area"]:
+        out[col] = out[col].astype(np.float32)
+
+    after = int(out.memory_usage(deep=True).sum())
+    LOGGER.info(
+        "Applications table: %.1f MB -> %.1f MB (%.1fx smaller, %s rows)",
+        before / 1e6,
+        after / 1e6,
+        before / after if after else 0.0,
+        len(out),
+    )
+    return out
+
+
+def _region_index(keys: pd.Series, base_keys: pd.Series) -> np.ndarray:
+    """Position of each key in the base polygon order, -1 when unmatched."""
+    return pd.Index(base_keys).get_indexer(keys.astype(object)).astype(np.int32)
+
+
+def _feature_templates(base_gdf: gpd.GeoDataFrame) -> list[dict[str, Any]]:
+    return json.loads(base_gdf.to_json())["features"]
+
+
 def _resolve_year_window(year: int | None, year_min: int | None, year_max: int | None) -> tuple[int | None, int | None]:
     if year is not None:
         return year, year
@@ -256,9 +371,82 @@ def _load_geometries() -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame, str]:
     return sa_gdf, ed_gdf, source
 
 
+def _read_geocoded() -> pd.DataFrame:
+    if not GEOCODE_STORE.exists():
+        return pd.read_csv(GEOCODED_CSV).assign(quality=None)
+    conn = sqlite3.connect(f"file:{GEOCODE_STORE}?mode=ro", uri=True)
+    try:
+        # SELECT * so stores from before the quality column still load
+        geocoded = pd.read_sql_query("SELECT * FROM geocodes WHERE status IN ('ok', 'approximate')", conn)
+    finally:
+        conn.close()
+    if "quality" not in geocoded.columns:
+        geocoded["quality"] = None
+    LOGGER.info("Loaded %s geocodes from %s", len(geocoded), GEOCODE_STORE)
+    return geocoded
+
+
+def _trusted_points(point_df: pd.DataFrame, sa_gdf: gpd.GeoDataFrame) -> tuple[gpd.GeoDataFrame, dict[str, int]]:
+    """
+    Keep points the validation pass (5g.validate_geocodes.py) did not flag and
+    that fall in a small area, snapping sliver points to the nearest one.
+    Returns the joined points and the number dropped per reason.
+    """
+    flagged = point_df["quality"].notna() & (point_df["quality"] != "trusted")
+    dropped = {"flagged": int(flagged.sum())}
+    point_df = point_df.loc[~flagged]
+
+    min_lon, min_lat, max_lon, max_lat = sa_gdf.total_bounds
+    lon = point_df["longitude"].to_numpy(dtype=float)
+    lat = point_df["latitude"].to_numpy(dtype=float)
+    in_box = (
+        (lon >= min_lon - SA_SNAP_DEGREES)
+        & (lon <= max_lon + SA_SNAP_DEGREES)
+        & (lat >= min_lat - SA_SNAP_DEGREES)
+        & (lat <= max_lat + SA_SNAP_DEGREES)
+    )
+    dropped["outside_bbox"] = int((~in_box).sum())
+    point_df = point_df.loc[in_box]
+
+    sa_cols = ["SA_GUID_21", "SA_PUB2022", "ED_GUID", "ED_ENGLISH"]
+    points_gdf = gpd.GeoDataFrame(
+        point_df,
+        geometry=gpd.points_from_xy(point_df["longitude"], point_df["latitude"]),
+        crs="EPSG:4326",
+    )
+    joined = gpd.sjoin(
+        points_gdf,
+        sa_gdf[sa_cols + ["geometry"]],
+        how="left",
+        predicate="within",
+    ).drop(columns=["index_right"], errors="ignore")
+
+    unmatched = np.flatnonzero(joined["SA_GUID_21"].isna().to_numpy())
+    if len(unmatched):
+        point_idx, sa_idx = sa_gdf.sindex.nearest(
+            joined.geometry.iloc[unmatched], max_distance=SA_SNAP_DEGREES, return_all=False
+        )
+        joined.iloc[unmatched[point_idx], joined.columns.get_indexer(sa_cols)] = sa_gdf[sa_cols].iloc[sa_idx].to_numpy()
+        LOGGER.info("Snapped %s points to the nearest small area", len(point_idx))
+
+    outside = joined["SA_GUID_21"].isna()
+    dropped["outside_boundary"] = int(outside.sum())
+    return joined.loc[~outside], dropped
+
+
+def _read_planning() -> pd.DataFrame:
+    if not PLANNING_PARQUET.exists():
+        return pd.read_csv(PLANNING_CSV)
+    planning = pd.read_parquet(PLANNING_PARQUET).drop(columns="row_index")
+    # categoricals would reject the fillna("") calls below
+    categorical = planning.select_dtypes("category").columns
+    planning[categorical] = planning[categorical].astype(object)
+    return planning
+
+
 def _load_data() -> dict[str, Any]:
-    planning = pd.read_csv(PLANNING_CSV)
-    geocoded = pd.read_csv(GEOCODED_CSV)
+    planning = _read_planning()
+    geocoded = _read_geocoded()
     obs = _load_observations()
 
     planning = planning.rename(
@@ -291,7 +479,7 @@ def _load_data() -> dict[str, Any]:
     merged = (
         planning.drop_duplicates(subset=["application_number_key"])
         .merge(
-            geocoded[["application_number_key", "latitude", "longitude"]].drop_duplicates(
+            geocoded[["application_number_key", "latitude", "longitude", "quality"]].drop_duplicates(
                 subset=["application_number_key"]
             ),
             on="application_number_key",
@@ -342,40 +530,58 @@ def _load_data() -> dict[str, Any]:
     )
 
     point_df = merged.dropna(subset=["latitude", "longitude"]).copy()
-    points_gdf = gpd.GeoDataFrame(
-        point_df,
-        geometry=gpd.points_from_xy(point_df["longitude"], point_df["latitude"]),
-        crs="EPSG:4326",
-    )
 
     sa_gdf, ed_gdf, geometry_source = _load_geometries()
 
-    points_joined = gpd.sjoin(
-        points_gdf,
-        sa_gdf[["SA_GUID_21", "SA_PUB2022", "ED_GUID", "ED_ENGLISH", "geometry"]],
-        how="left",
-        predicate="within",
-    ).drop(columns=["index_right"], errors="ignore")
+    points_joined, dropped_points = _trusted_points(point_df, sa_gdf)
 
     sa_pop = _read_sa_population()
     ed_pop = _read_ed_population()
 
-    sa_base = sa_gdf.merge(sa_pop, on="SA_GUID_21", how="left")
-    ed_base = ed_gdf.merge(ed_pop, on="ED_GUID", how="left")
+    sa_base = (
+        sa_gdf.merge(sa_pop, on="SA_GUID_21", how="left")
+        .drop_duplicates(subset=["SA_GUID_21"])
+        .reset_index(drop=True)
+    )
+    ed_base = (
+        ed_gdf.merge(ed_pop, on="ED_GUID", how="left")
+        .drop_duplicates(subset=["ED_GUID"])
+        .reset_index(drop=True)
+    )
     if "ed_name" not in ed_base.columns and "ED_ENGLISH" in ed_base.columns:
         ed_base = ed_base.rename(columns={"ED_ENGLISH": "ed_name"})
 
+    points_joined["sa_idx"] = _region_index(points_joined["SA_GUID_21"], sa_base["SA_GUID_21"])
+
     LOGGER.info("Environment mode: %s", ENVIRONMENT)
     LOGGER.info("Geometry source: %s", geometry_source)
     LOGGER.info("Loaded SA polygons: %s", len(sa_gdf))
     LOGGER.info("Loaded ED polygons: %s", len(ed_base))
-
-    years = points_joined["received_date"].dt.year.dropna().astype(int)
+    LOGGER.info("Geocoded points kept: %s, dropped: %s", len(points_joined), dropped_points)
+
+    applications = _compact_applications(points_joined)
+    years = applications["received_date"].dt.year.dropna().astype(int)
+
+    # Plain arrays for the aggregation hot path, indexed by row position.
+    columns = {
+        "sa_idx": applications["sa_idx"].to_numpy(),
+        "letters": np.clip(applications["n_observation_letters"].to_numpy(dtype=np.int64), 0, None),
+        "flags": applications["flags"].to_numpy(),
+        "longitude": applications["longitude"].to_numpy(dtype=float),
+        "latitude": applications["latitude"].to_numpy(dtype=float),
+    }
 
     return {
-        "applications": points_joined,
+        "applications": applications,
+        "columns": columns,
         "sa_base": sa_base,
         "ed_base": ed_base,
+        "sa_to_ed": _region_index(sa_base["ED_GUID"], ed_base["ED_GUID"]),
+        "sa_population": pd.to_numeric(sa_base["population"], errors="coerce").to_numpy(dtype=float),
+        "ed_population": pd.to_numeric(ed_base["population"], errors="coerce").to_numpy(dtype=float),
+        "sa_features": _feature_templates(sa_base),
+        "ed_features": _feature_templates(ed_base),
+        "dropped_points": dropped_points,
         "year_min": int(years.min()) if not years.empty else 2000,
         "year_max": int(years.max()) if not years.empty else 2030,
     }
@@ -406,15 +612,15 @@ def _apply_filters(df: gpd.GeoDataFrame, sig: FilterSignature) -> gpd.GeoDataFra
         masks = []
         for item in sig.development:
             if item == "residential":
-                masks.append(out["is_residential"])
+                masks.append(_flag(out, "is_residential"))
             elif item == "multi_unit":
-                masks.append(out["is_multi_unit"])
+                masks.append(_flag(out, "is_multi_unit"))
             elif item == "one_off":
-                masks.append(out["is_one_off"])
+                masks.append(_flag(out, "is_one_off"))
             elif item == "commercial":
-                masks.append(out["is_commercial"])
+                masks.append(_flag(out, "is_commercial"))
             elif item == "extension":
-                masks.append(out["is_extension"])
+                masks.append(_flag(out, "is_extension"))
         if masks:
             combined = masks[0]
             for m in masks[1:]:
@@ -433,23 +639,24 @@ def _apply_filters(df: gpd.GeoDataFrame, sig: FilterSignature) -> gpd.GeoDataFra
     if sig.min_letters is not None:
         out = out.loc[out["n_observation_letters"] >= sig.min_letters]
     if sig.top_decile:
-        positive_letters = df.loc[df["n_observation_letters"] > 0, "n_observation_letters"]
-        if positive_letters.empty:
+        letters = df["n_observation_letters"].to_numpy(dtype=np.int64)
+        positive_letters = letters[letters > 0]
+        if positive_letters.size == 0:
             return out.iloc[0:0]
-        threshold = int(np.ceil(np.nanpercentile(positive_letters, 90)))
+        threshold = int(np.ceil(_letters_percentile(positive_letters, 90)))
         out = out.loc[out["n_observation_letters"] >= threshold]
 
     if sig.outcomes:
         outcome_masks = []
         for item in sig.outcomes:
             if item == "granted":
-                outcome_masks.append(out["is_granted"])
+                outcome_masks.append(_flag(out, "is_granted"))
             elif item == "refused":
-                outcome_masks.append(out["is_refused"])
+                outcome_masks.append(_flag(out, "is_refused"))
             elif item == "appealed":
-                outcome_masks.append(out["is_appealed"])
+                outcome_masks.append(_flag(out, "is_appealed"))
             elif item == "overturned":
-                outcome_masks.append(out["is_overturned"])
+                outcome_masks.append(_flag(out, "is_overturned"))
         if outcome_masks:
             combined = outcome_masks[0]
             for m in outcome_masks[1:]:
@@ -457,11 +664,12 @@ def _apply_filters(df: gpd.GeoDataFrame, sig: FilterSignature) -> gpd.GeoDataFra
             out = out.loc[combined]
 
     if sig.decisions:
-        decision_text = out["decision"].fillna("").astype(str).str.lower()
-        decision_mask = pd.Series(False, index=out.index)
+        # Match terms against the (few) categories once, then map back through the codes.
+        categories = out["decision"].cat.categories.astype(str).str.lower()
+        matched = np.zeros(len(categories) + 1, dtype=bool)
         for term in sig.decisions:
-            decision_mask = decision_mask | decision_text.str.contains(term.lower(), regex=False)
-        out = out.loc[decision_mask]
+            matched[:-1] |= categories.str.contains(term.lower(), regex=False)
+        out = out.loc[matched[out["decision"].cat.codes.to_numpy()]]
 
     return out
 
@@ -498,66 +706,144 @@ def _signature(
     )
 
 
-def _aggregate(
-    filtered: gpd.GeoDataFrame, base_gdf: gpd.GeoDataFrame, group_col: str, pop_col: str = "population"
-) -> gpd.GeoDataFrame:
-    if filtered.empty:
-        empty = base_gdf.copy()
-        empty["total_applications"] = 0
-        empty["total_letters"] = 0
-        empty["pct_with_objection"] = 0.0
-        empty["median_letters"] = 0.0
-        empty["refusal_rate"] = 0.0
-        empty["appeal_rate"] = 0.0
-        empty["letters_per_1000"] = 0.0
-        return empty
-
-    grouped = (
-        filtered.groupby(group_col)
-        .agg(
-            total_applications=("application_number_key", "count"),
-            total_letters=("n_observation_letters", "sum"),
-            with_objection=("has_observation", "sum"),
-            median_letters=("n_observation_letters", "median"),
-            refusal_rate=("is_refused", "mean"),
-            appeal_rate=("is_appealed", "mean"),
-        )
-        .reset_index()
-    )
-    grouped["pct_with_objection"] = np.where(
-        grouped["total_applications"] > 0,
-        grouped["with_objection"] / grouped["total_applications"] * 100,
-        0,
-    )
+def _ratio(num: np.ndarray, den: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    out = np.zeros(len(num), dtype=float)
+    np.divide(num * scale, den, out=out, where=den > 0)
+    return out
 
-    merged = base_gdf.merge(grouped, on=group_col, how="left")
-    fill_cols = [
-        "total_applications",
-        "total_letters",
-        "with_objection",
-        "pct_with_objection",
-        "median_letters",
-        "refusal_rate",
-        "appeal_rate",
-    ]
-    for col in fill_cols:
-        merged[col] = merged[col].fillna(0)
 
-    merged["letters_per_1000"] = np.where(
-        merged[pop_col].fillna(0) > 0,
-        merged["total_letters"] / merged[pop_col] * 1000,
-        0.0,
+def _letter_histograms(
+    region_idx: np.ndarray, letters: np.ndarray, n_regions: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-region letter-count histograms plus the (region, value) pairs in the overflow bin."""
+    width = LETTER_HIST_BINS + 1
+    binned = np.minimum(letters, LETTER_HIST_BINS)
+    hist = np.bincount(region_idx * width + binned, minlength=n_regions * width).reshape(n_regions, width)
+    over = letters >= LETTER_HIST_BINS
+    return hist, region_idx[over], letters[over]
+
+
+def _rollup_histograms(
+    hist: np.ndarray, overflow_region: np.ndarray, overflow_values: np.ndarray, n_ed: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    sa_to_ed = DATA["sa_to_ed"]
+    mapped = sa_to_ed >= 0
+    ed_hist = np.zeros((n_ed, hist.shape[1]), dtype=hist.dtype)
+    np.add.at(ed_hist, sa_to_ed[mapped], hist[mapped])
+    ed_region = sa_to_ed[overflow_region]
+    keep = ed_region >= 0
+    return ed_hist, ed_region[keep], overflow_values[keep]
+
+
+def _hist_order_stat(
+    hist: np.ndarray, overflow_region: np.ndarray, overflow_values: np.ndarray, which: np.ndarray, k: np.ndarray
+) -> np.ndarray:
+    """Exact k-th smallest (0-based) letter count for each region in `which`."""
+    cum = np.cumsum(hist[which, :LETTER_HIST_BINS], axis=1)
+    below = cum[:, -1]
+    out = (cum <= k[:, None]).sum(axis=1).astype(float)
+    spill = k >= below
+    if spill.any():
+        order = np.lexsort((overflow_values, overflow_region))
+        regions, values = overflow_region[order], overflow_values[order]
+        starts = np.searchsorted(regions, which[spill])
+        out[spill] = values[starts + k[spill] - below[spill]]
+    return out
+
+
+def _hist_medians(hist: np.ndarray, overflow_region: np.ndarray, overflow_values: np.ndarray) -> np.ndarray:
+    counts = hist.sum(axis=1)
+    which = np.flatnonzero(counts > 0)
+    n = counts[which]
+    lo = _hist_order_stat(hist, overflow_region, overflow_values, which, (n - 1) // 2)
+    hi = _hist_order_stat(hist, overflow_region, overflow_values, which, n // 2)
+    medians = np.zeros(len(counts), dtype=float)
+    medians[which] = (lo + hi) / 2
+    return medians
+
+
+def _letters_median(letters: np.ndarray) -> float:
+    if letters.size == 0:
+        return 0.0
+    hist, overflow_region, overflow_values = _letter_histograms(np.zeros(letters.size, dtype=np.int64), letters, 1)
+    return float(_hist_medians(hist, overflow_region, overflow_values)[0])
+
+
+def _letters_percentile(letters: np.ndarray, pct: float) -> float:
+    """Same result as np.percentile (linear interpolation), read off a histogram instead of a sort."""
+    hist, overflow_region, overflow_values = _letter_histograms(np.zeros(letters.size, dtype=np.int64), letters, 1)
+    pos = (letters.size - 1) * pct / 100
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, letters.size - 1)
+    v_lo, v_hi = _hist_order_stat(hist, overflow_region, overflow_values, np.array([0, 0]), np.array([lo, hi]))
+    return float(v_lo + (v_hi - v_lo) * (pos - lo))
+
+
+def _rollup(sa_values: np.ndarray, n_ed: int) -> np.ndarray:
+    """Sum SA-level additive values into their EDs via the precomputed SA->ED mapping."""
+    sa_to_ed = DATA["sa_to_ed"]
+    mapped = sa_to_ed >= 0
+    return np.bincount(sa_to_ed[mapped], weights=sa_values[mapped], minlength=n_ed).astype(sa_values.dtype)
+
+
+def _region_metrics(sums: dict[str, np.ndarray], medians: np.ndarray, population: np.ndarray) -> dict[str, np.ndarray]:
+    total = sums["total_applications"]
+    return {
+        "population": population,
+        "total_applications": total,
+        "total_letters": sums["total_letters"],
+        "with_objection": sums["with_objection"],
+        "pct_with_objection": _ratio(sums["with_objection"], total, 100.0),
+        "median_letters": medians,
+        "refusal_rate": _ratio(sums["refused"], total),
+        "appeal_rate": _ratio(sums["appealed"], total),
+        "letters_per_1000": _ratio(sums["total_letters"], np.nan_to_num(population), 1000.0),
+    }
+
+
+def _aggregate(rows: np.ndarray) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """SA and ED metrics for the given rows, each aligned with its base polygon order.
+
+    Points are binned once at SA level; ED sums and letter histograms are rolled
+    up from the SA ones, and medians are read off the histograms.
+    """
+    cols = DATA["columns"]
+    sa_population = DATA["sa_population"]
+    ed_population = DATA["ed_population"]
+    n_sa, n_ed = len(sa_population), len(ed_population)
+
+    sa_idx = cols["sa_idx"][rows]
+    valid = sa_idx >= 0
+    sa_idx = sa_idx[valid]
+    letters = cols["letters"][rows][valid]
+    flags = cols["flags"][rows][valid]
+
+    sa_sums = {
+        "total_applications": np.bincount(sa_idx, minlength=n_sa),
+        "total_letters": np.bincount(sa_idx, weights=letters, minlength=n_sa).astype(np.int64),
+    }
+    for name, flag in [("with_objection", "has_observation"), ("refused", "is_refused"), ("appealed", "is_appealed")]:
+        sa_sums[name] = np.bincount(sa_idx, weights=(flags & FLAG_BITS[flag]) != 0, minlength=n_sa).astype(np.int64)
+    ed_sums = {name: _rollup(values, n_ed) for name, values in sa_sums.items()}
+
+    sa_hist = _letter_histograms(sa_idx, letters, n_sa)
+    ed_hist = _rollup_histograms(*sa_hist, n_ed)
+    sa_medians = _hist_medians(*sa_hist)
+    ed_medians = _hist_medians(*ed_hist)
+
+    return (
+        _region_metrics(sa_sums, sa_medians, sa_population),
+        _region_metrics(ed_sums, ed_medians, ed_population),
     )
-    return merged
 
 
 def _summary_from_filtered(filtered: gpd.GeoDataFrame, sa_pop_lookup: pd.DataFrame) -> dict[str, Any]:
     total = int(len(filtered))
     with_obs = int((filtered["n_observation_letters"] > 0).sum())
     total_letters = float(filtered["n_observation_letters"].sum())
-    median_letters = float(filtered["n_observation_letters"].median()) if total else 0.0
-    refusal_rate = float(filtered["is_refused"].mean() * 100) if total else 0.0
-    appeal_rate = float(filtered["is_appealed"].mean() * 100) if total else 0.0
+    median_letters = _letters_median(np.clip(filtered["n_observation_letters"].to_numpy(dtype=np.int64), 0, None))
+    refusal_rate = float(_flag(filtered, "is_refused").mean() * 100) if total else 0.0
+    appeal_rate = float(_flag(filtered, "is_appealed").mean() * 100) if total else 0.0
 
     pop = (
         filtered[["SA_GUID_21"]]
@@ -569,24 +855,24 @@ def _summary_from_filtered(filtered: gpd.GeoDataFrame, sa_pop_lookup: pd.DataFra
     )
     letters_per_1000 = float(total_letters / pop * 1000) if pop > 0 else 0.0
 
-    def _count_pct(mask: pd.Series) -> dict[str, float]:
+    def _count_pct(mask: np.ndarray) -> dict[str, float]:
         count = int(mask.sum())
         pct = float(count / total * 100) if total else 0.0
         return {"count": count, "pct": pct}
 
     development_breakdown = {
-        "residential": _count_pct(filtered["is_residential"]) if total else {"count": 0, "pct": 0.0},
-        "multi_unit": _count_pct(filtered["is_multi_unit"]) if total else {"count": 0, "pct": 0.0},
-        "one_off": _count_pct(filtered["is_one_off"]) if total else {"count": 0, "pct": 0.0},
-        "commercial": _count_pct(filtered["is_commercial"]) if total else {"count": 0, "pct": 0.0},
-        "extension": _count_pct(filtered["is_extension"]) if total else {"count": 0, "pct": 0.0},
+        "residential": _count_pct(_flag(filtered, "is_residential")) if total else {"count": 0, "pct": 0.0},
+        "multi_unit": _count_pct(_flag(filtered, "is_multi_unit")) if total else {"count": 0, "pct": 0.0},
+        "one_off": _count_pct(_flag(filtered, "is_one_off")) if total else {"count": 0, "pct": 0.0},
+        "commercial": _count_pct(_flag(filtered, "is_commercial")) if total else {"count": 0, "pct": 0.0},
+        "extension": _count_pct(_flag(filtered, "is_extension")) if total else {"count": 0, "pct": 0.0},
     }
 
     outcomes_breakdown = {
-        "granted": _count_pct(filtered["is_granted"]) if total else {"count": 0, "pct": 0.0},
-        "refused": _count_pct(filtered["is_refused"]) if total else {"count": 0, "pct": 0.0},
-        "appealed": _count_pct(filtered["is_appealed"]) if total else {"count": 0, "pct": 0.0},
-        "overturned": _count_pct(filtered["is_overturned"]) if total else {"count": 0, "pct": 0.0},
+        "granted": _count_pct(_flag(filtered, "is_granted")) if total else {"count": 0, "pct": 0.0},
+        "refused": _count_pct(_flag(filtered, "is_refused")) if total else {"count": 0, "pct": 0.0},
+        "appealed": _count_pct(_flag(filtered, "is_appealed")) if total else {"count": 0, "pct": 0.0},
+        "overturned": _count_pct(_flag(filtered, "is_overturned")) if total else {"count": 0, "pct": 0.0},
     }
 
     return {
@@ -603,43 +889,78 @@ def _summary_from_filtered(filtered: gpd.GeoDataFrame, sa_pop_lookup: pd.DataFra
 
 @lru_cache(maxsize=128)
 def _aggregate_bundle(sig: FilterSignature) -> dict[str, Any]:
-    filtered = _apply_filters(DATA["applications"], sig)
-    sa = _aggregate(filtered, DATA["sa_base"], "SA_GUID_21")
-    ed = _aggregate(filtered, DATA["ed_base"], "ED_GUID")
-    return {"filtered": filtered, "sa": sa, "ed": ed}
+    rows = _apply_filters(DATA["applications"], sig).index.to_numpy(dtype=np.int64)
+    sa, ed = _aggregate(rows)
+    return {"rows": rows, "sa": sa, "ed": ed}
 
 
-def _apply_scale(sa: gpd.GeoDataFrame, ed: gpd.GeoDataFrame, metric: str) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame, float]:
-    valid_metric = metric if metric in sa.columns else "letters_per_1000"
-    combined = pd.concat([sa[valid_metric], ed[valid_metric]], ignore_index=True).fillna(0)
+def _apply_scale(
+    sa: dict[str, np.ndarray], ed: dict[str, np.ndarray], metric: str
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray], float]:
+    valid_metric = metric if metric in sa else "letters_per_1000"
+    combined = np.nan_to_num(np.concatenate([sa[valid_metric], ed[valid_metric]]).astype(float))
     positive = combined[combined > 0]
-    cap = float(np.nanpercentile(positive, 95)) if not positive.empty else 0.0
+    cap = float(np.nanpercentile(positive, 95)) if positive.size else 0.0
 
-    def _decorate(frame: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
-        out = frame.copy()
-        raw = out[valid_metric].fillna(0).astype(float)
-        out["choropleth_metric"] = valid_metric
+    def _decorate(values: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        raw = np.nan_to_num(values[valid_metric].astype(float))
+        out = dict(values)
+        out["choropleth_metric"] = np.full(len(raw), valid_metric, dtype=object)
         out["choropleth_raw"] = raw
-        out["choropleth_cap"] = cap
+        out["choropleth_cap"] = np.full(len(raw), cap)
         out["choropleth_value"] = np.where(raw == 0, 0, np.minimum(raw, cap if cap > 0 else raw))
-        out["choropleth_bucket"] = np.where(raw == 0, "zero", "positive")
+        out["choropleth_bucket"] = np.where(raw == 0, "zero", "positive").astype(object)
         return out
 
     return _decorate(sa), _decorate(ed), cap
 
 
-def _filter_bbox(df: gpd.GeoDataFrame, min_lng: float | None, min_lat: float | None, max_lng: float | None, max_lat: float | None) -> gpd.GeoDataFrame:
+def _filter_bbox(
+    rows: np.ndarray, min_lng: float | None, min_lat: float | None, max_lng: float | None, max_lat: float | None
+) -> np.ndarray:
     if None in {min_lng, min_lat, max_lng, max_lat}:
-        return df
-    if {"longitude", "latitude"}.issubset(df.columns):
-        return df.loc[
-            (df["longitude"] >= min_lng)
-            & (df["longitude"] <= max_lng)
-            & (df["latitude"] >= min_lat)
-            & (df["latitude"] <= max_lat)
-        ]
-    bbox_geom = box(min_lng, min_lat, max_lng, max_lat)
-    return df.loc[df.geometry.intersects(bbox_geom)]
+        return rows
+    lng = DATA["columns"]["longitude"][rows]
+    lat = DATA["columns"]["latitude"][rows]
+    return rows[(lng >= min_lng) & (lng <= max_lng) & (lat >= min_lat) & (lat <= max_lat)]
+
+
+def _has_bbox(min_lng: float | None, min_lat: float | None, max_lng: float | None, max_lat: float | None) -> bool:
+    return None not in {min_lng, min_lat, max_lng, max_lat}
+
+
+def _filtered_frame(rows: np.ndarray) -> gpd.GeoDataFrame:
+    return DATA["applications"].iloc[rows]
+
+
+def _region_aggregates(
+    sig: FilterSignature, min_lng: float | None, min_lat: float | None, max_lng: float | None, max_lat: float | None
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    bundle = _aggregate_bundle(sig)
+    if not _has_bbox(min_lng, min_lat, max_lng, max_lat):
+        return bundle["sa"], bundle["ed"]
+    rows = _filter_bbox(bundle["rows"], min_lng, min_lat, max_lng, max_lat)
+    return _aggregate(rows)
+
+
+def _json_values(values: np.ndarray) -> list[Any]:
+    if values.dtype.kind == "f":
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+def _region_geojson(level: str, values: dict[str, np.ndarray]) -> dict[str, Any]:
+    """Attach per-region values to the precomputed feature templates without touching the GeoDataFrame."""
+    columns = {name: _json_values(array) for name, array in values.items()}
+    features = []
+    for i, template in enumerate(DATA[f"{level}_features"]):
+        properties = dict(template["properties"])
+        for name, column in columns.items():
+            properties[name] = column[i]
+        features.append(
+            {"id": template.get("id"), "type": "Feature", "properties": properties, "geometry": template["geometry"]}
+        )
+    return {"type": "FeatureCollection", "features": features}
 
 
 def _to_geojson(gdf: gpd.GeoDataFrame, drop_cols: set[str] | None = None) -> dict[str, Any]:
@@ -661,6 +982,87 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+REQUEST_LOG_PATHS = {
+    "/applications",
+    "/small_areas",
+    "/electoral_divisions",
+    "/summary",
+    "/region_summary",
+    "/meta",
+}
+REQUEST_LOG_PARAMS = {
+    "metric",
+    "year",
+    "date_from",
+    "date_to",
+    "year_min",
+    "year_max",
+    "development",
+    "min_site_area",
+    "min_units",
+    "high_density",
+    "has_objection",
+    "min_letters",
+    "top_decile",
+    "outcomes",
+    "decision",
+    "min_lng",
+    "min_lat",
+    "max_lng",
+    "max_lat",
+    "region_type",
+    "region_id",
+}
+REQUEST_LOG_MAX_VALUE_LEN = 64
+_request_log_lock = threading.Lock()
+_request_log_handle = None
+
+
+def _sanitize_query(request: Request) -> str:
+    # Only known filter params are kept so free-text or tokens never reach the log.
+    kept = [
+        (key, value[:REQUEST_LOG_MAX_VALUE_LEN])
+        for key, value in request.query_params.multi_items()
+        if key in REQUEST_LOG_PARAMS
+    ]
+    return urllib.parse.urlencode(kept)
+
+
+def _write_request_log(record: dict[str, Any]) -> None:
+    global _request_log_handle
+    line = json.dumps(record, separators=(",", ":"))
+    with _request_log_lock:
+        if _request_log_handle is None:
+            Path(REQUEST_LOG_PATH).parent.mkdir(parents=True, exist_ok=True)
+            _request_log_handle = open(REQUEST_LOG_PATH, "a", encoding="utf-8", buffering=1)
+        _request_log_handle.write(line + "\n")
+
+
+if REQUEST_LOG_PATH:
+    LOGGER.info("Recording API request stream to %s", REQUEST_LOG_PATH)
+
+    @app.middleware("http")
+    async def capture_request_log(request: Request, call_next):
+        if request.url.path not in REQUEST_LOG_PATHS:
+            return await call_next(request)
+        started = time.time()
+        started_perf = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            _write_request_log(
+                {
+                    "ts": round(started, 4),
+                    "path": request.url.path,
+                    "query": _sanitize_query(request),
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - started_perf) * 1000, 2),
+                }
+            )
+
 
 @app.get("/healthz")
 def healthz() -> dict[str, str]:
@@ -673,6 +1075,7 @@ def meta() -> dict[str, Any]:
         "year_min": DATA["year_min"],
         "year_max": DATA["year_max"],
         "total_applications": int(len(DATA["applications"])),
+        "dropped_points": DATA["dropped_points"],
     }
 
 
@@ -713,8 +1116,8 @@ def applications(
         outcomes,
         decision,
     )
-    filtered = _aggregate_bundle(sig)["filtered"]
-    filtered = _filter_bbox(filtered, min_lng, min_lat, max_lng, max_lat)
+    rows = _filter_bbox(_aggregate_bundle(sig)["rows"], min_lng, min_lat, max_lng, max_lat)
+    filtered = _filtered_frame(rows)
 
     keep_cols = {
         "application_number",
@@ -737,6 +1140,11 @@ def applications(
     out = filtered[[c for c in filtered.columns if c in keep_cols]].copy()
     out["received_date"] = out["received_date"].dt.strftime("%Y-%m-%d")
     out["decision_date"] = out["decision_date"].dt.strftime("%Y-%m-%d")
+    for col in out.columns:
+        if isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object)
+        elif isinstance(out[col].dtype, pd.api.extensions.ExtensionDtype) and col != "geometry":
+            out[col] = out[col].astype("float64")
     return _to_geojson(out)
 
 
@@ -778,11 +1186,9 @@ def small_areas(
         outcomes,
         decision,
     )
-    filtered = _filter_bbox(_aggregate_bundle(sig)["filtered"], min_lng, min_lat, max_lng, max_lat)
-    sa_agg = _aggregate(filtered, DATA["sa_base"], "SA_GUID_21")
-    ed_agg = _aggregate(filtered, DATA["ed_base"], "ED_GUID")
+    sa_agg, ed_agg = _region_aggregates(sig, min_lng, min_lat, max_lng, max_lat)
     sa, _, cap = _apply_scale(sa_agg, ed_agg, metric)
-    payload = _to_geojson(sa)
+    payload = _region_geojson("sa", sa)
     payload["metadata"] = {"metric": metric, "cap_95": cap}
     return payload
 
@@ -825,11 +1231,9 @@ def electoral_divisions(
         outcomes,
         decision,
     )
-    filtered = _filter_bbox(_aggregate_bundle(sig)["filtered"], min_lng, min_lat, max_lng, max_lat)
-    sa_agg = _aggregate(filtered, DATA["sa_base"], "SA_GUID_21")
-    ed_agg = _aggregate(filtered, DATA["ed_base"], "ED_GUID")
+    sa_agg, ed_agg = _region_aggregates(sig, min_lng, min_lat, max_lng, max_lat)
     _, ed, cap = _apply_scale(sa_agg, ed_agg, metric)
-    payload = _to_geojson(ed)
+    payload = _region_geojson("ed", ed)
     payload["metadata"] = {"metric": metric, "cap_95": cap}
     return payload
 
@@ -871,7 +1275,8 @@ def summary(
         outcomes,
         decision,
     )
-    filtered = _filter_bbox(_aggregate_bundle(sig)["filtered"], min_lng, min_lat, max_lng, max_lat)
+    rows = _filter_bbox(_aggregate_bundle(sig)["rows"], min_lng, min_lat, max_lng, max_lat)
+    filtered = _filtered_frame(rows)
 
     sa_pop_lookup = DATA["sa_base"][["SA_GUID_21", "population"]].drop_duplicates()
     return _summary_from_filtered(filtered, sa_pop_lookup)
@@ -912,7 +1317,7 @@ def region_summary(
         outcomes,
         decision,
     )
-    filtered = _aggregate_bundle(sig)["filtered"]
+    filtered = _filtered_frame(_aggregate_bundle(sig)["rows"])
 
     if region_type == "sa":
         region_filtered = filtered.loc[filtered["SA_GUID_21"] == region_id]
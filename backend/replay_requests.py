@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded API request stream against a running backend.
+
+Record a stream by starting the backend with REQUEST_LOG_PATH set, then use
+the frontend as normal (drag the year slider, pan, toggle filters). Replay it
+with N parallel copies of the stream, keeping the original inter-arrival
+timing (optionally sped up):
+
+    python backend/replay_requests.py requests.jsonl \\
+        --base-url http://localhost:8000 --concurrency 8 --speed 2
+
+Only the standard library is used so the tool runs anywhere the log does.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+
+def load_stream(path: Path, paths: set[str] | None = None) -> list[dict[str, Any]]:
+    records: list[dict[str, Any]] = []
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if paths is None or record.get("path") in paths:
+                records.append(record)
+    records.sort(key=lambda r: r.get("ts", 0.0))
+    if records:
+        t0 = records[0].get("ts", 0.0)
+        for record in records:
+            record["offset_s"] = record.get("ts", t0) - t0
+    return records
+
+
+def fire(base_url: str, record: dict[str, Any], timeout_s: float) -> dict[str, Any]:
+    query = record.get("query", "")
+    url = base_url.rstrip("/") + record["path"] + (f"?{query}" if query else "")
+    started = time.perf_counter()
+    status = 0
+    n_bytes = 0
+    try:
+        with urllib.request.urlopen(url, timeout=timeout_s) as response:
+            n_bytes = len(response.read())
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = -1
+    return {
+        "path": record["path"],
+        "status": status,
+        "bytes": n_bytes,
+        "latency_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(results: list[dict[str, Any]], wall_s: float) -> None:
+    by_path: dict[str, list[dict[str, Any]]] = {}
+    for r in results:
+        by_path.setdefault(r["path"], []).append(r)
+
+    print(f"\nRequests: {len(results)} in {wall_s:.1f}s ({len(results) / wall_s if wall_s else 0:.1f} req/s)")
+    print(f"{'path':<22}{'n':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for path in sorted(by_path):
+        rows = by_path[path]
+        lat = [r["latency_ms"] for r in rows]
+        errors = sum(1 for r in rows if not 200 <= r["status"] < 400)
+        print(
+            f"{path:<22}{len(rows):>7}{errors:>6}"
+            f"{_percentile(lat, 50):>10.1f}{_percentile(lat, 95):>10.1f}"
+            f"{_percentile(lat, 99):>10.1f}{max(lat):>10.1f}"
+        )
+
+
+def replay(
+    records: list[dict[str, Any]],
+    base_url: str,
+    concurrency: int,
+    speed: float,
+    timeout_s: float,
+    max_workers: int,
+) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def _run(record: dict[str, Any]) -> None:
+        out = fire(base_url, record, timeout_s)
+        with lock:
+            results.append(out)
+
+    # Each request is fired `concurrency` times at its recorded offset, so the
+    # server sees N users producing the same overlapping bursts at once.
+    schedule = sorted(
+        (
+            (record["offset_s"] / speed if speed > 0 else 0.0, copy, record)
+            for copy in range(concurrency)
+            for record in records
+        ),
+        key=lambda item: (item[0], item[1]),
+    )
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for due, _, record in schedule:
+            delay = due - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_run, record)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded API request stream.")
+    parser.add_argument("log", type=Path, help="JSONL file written via REQUEST_LOG_PATH")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel copies of the stream")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression; 0 fires everything at once")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-workers", type=int, default=64)
+    parser.add_argument("--path", action="append", help="only replay these endpoints (repeatable)")
+    args = parser.parse_args()
+
+    records = load_stream(args.log, set(args.path) if args.path else None)
+    if not records:
+        print(f"No requests to replay in {args.log}")
+        return
+
+    print(
+        f"Replaying {len(records)} requests x{args.concurrency} against {args.base_url} "
+        f"(speed {args.speed}, span {records[-1]['offset_s']:.1f}s)"
+    )
+    started = time.perf_counter()
+    results = replay(records, args.base_url, args.concurrency, args.speed, args.timeout, args.max_workers)
+    summarize(results, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()